@@ -0,0 +1,51 @@
+"""add content-addressed blob table and file.content_sha256
+
+Revision ID: add_blob_store
+Revises: add_upload_sessions
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "add_blob_store"
+down_revision: Union[str, Sequence[str], None] = "add_upload_sessions"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the blob table and link files to it by content digest."""
+
+    op.create_table(
+        "blob",
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("s3_key", sa.String(length=500), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False,
+                  server_default="1"),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("sha256"),
+    )
+
+    # Existing files keep their own objects and stay un-deduplicated
+    op.add_column('file', sa.Column(
+        'content_sha256', sa.String(length=64), nullable=True))
+    op.create_foreign_key(
+        "fk_file_content_sha256_blob", "file", "blob",
+        ["content_sha256"], ["sha256"])
+    op.create_index(op.f("ix_file_content_sha256"), "file",
+                    ["content_sha256"], unique=False)
+
+
+def downgrade() -> None:
+    """Drop the blob table and file.content_sha256."""
+
+    op.drop_index(op.f("ix_file_content_sha256"), table_name="file")
+    op.drop_constraint("fk_file_content_sha256_blob", "file",
+                       type_="foreignkey")
+    op.drop_column('file', 'content_sha256')
+    op.drop_table("blob")
@@ -0,0 +1,37 @@
+"""add worker lease columns to conversion_job
+
+Revision ID: add_conversion_job_lease
+Revises: add_storage_outbox
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "add_conversion_job_lease"
+down_revision: Union[str, Sequence[str], None] = "add_storage_outbox"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Record which process holds a conversion job and until when."""
+
+    op.add_column("conversion_job", sa.Column(
+        "worker_id", sa.String(length=100), nullable=True))
+    op.add_column("conversion_job", sa.Column(
+        "lease_expires_at", sa.DateTime(), nullable=True))
+    op.create_index(op.f("ix_conversion_job_worker_id"), "conversion_job",
+                    ["worker_id"], unique=False)
+
+
+def downgrade() -> None:
+    """Drop the conversion_job lease columns."""
+
+    op.drop_index(op.f("ix_conversion_job_worker_id"),
+                  table_name="conversion_job")
+    op.drop_column("conversion_job", "lease_expires_at")
+    op.drop_column("conversion_job", "worker_id")
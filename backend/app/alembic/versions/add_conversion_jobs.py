@@ -0,0 +1,53 @@
+"""add conversion_job table for background document conversions
+
+Revision ID: add_conversion_jobs
+Revises: add_blob_store
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "add_conversion_jobs"
+down_revision: Union[str, Sequence[str], None] = "add_blob_store"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the conversion_job table."""
+
+    op.create_table(
+        "conversion_job",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("file_id", sa.Uuid(), nullable=False),
+        sa.Column("owner_id", sa.Uuid(), nullable=False),
+        sa.Column("kind", sa.String(length=20), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("result_file_id", sa.Uuid(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["file_id"], ["file.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(
+            ["owner_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_conversion_job_file_id"),
+                    "conversion_job", ["file_id"], unique=False)
+    op.create_index(op.f("ix_conversion_job_owner_id"),
+                    "conversion_job", ["owner_id"], unique=False)
+
+
+def downgrade() -> None:
+    """Drop the conversion_job table."""
+
+    op.drop_index(op.f("ix_conversion_job_owner_id"),
+                  table_name="conversion_job")
+    op.drop_index(op.f("ix_conversion_job_file_id"),
+                  table_name="conversion_job")
+    op.drop_table("conversion_job")
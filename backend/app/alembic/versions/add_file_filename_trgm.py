@@ -0,0 +1,31 @@
+"""add trigram index on file.filename for substring search
+
+Revision ID: add_file_filename_trgm
+Revises: add_file_search_vector
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "add_file_filename_trgm"
+down_revision: Union[str, Sequence[str], None] = "add_file_search_vector"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Enable pg_trgm and index filenames for ILIKE '%...%' lookups."""
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index("ix_file_filename_trgm", "file", ["filename"],
+                    unique=False, postgresql_using="gin",
+                    postgresql_ops={"filename": "gin_trgm_ops"})
+
+
+def downgrade() -> None:
+    """Drop the trigram index (the extension is left installed)."""
+
+    op.drop_index("ix_file_filename_trgm", table_name="file")
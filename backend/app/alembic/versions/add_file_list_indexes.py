@@ -0,0 +1,32 @@
+"""add composite indexes for keyset pagination of file lists
+
+Revision ID: add_file_list_indexes
+Revises: add_file_version
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "add_file_list_indexes"
+down_revision: Union[str, Sequence[str], None] = "add_file_version"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index each list sort order per owner, with id as the tie-breaker."""
+
+    op.create_index("ix_file_owner_id_updated_at_id", "file",
+                    ["owner_id", "updated_at", "id"], unique=False)
+    op.create_index("ix_file_owner_id_filename_id", "file",
+                    ["owner_id", "filename", "id"], unique=False)
+
+
+def downgrade() -> None:
+    """Drop the keyset pagination indexes."""
+
+    op.drop_index("ix_file_owner_id_filename_id", table_name="file")
+    op.drop_index("ix_file_owner_id_updated_at_id", table_name="file")
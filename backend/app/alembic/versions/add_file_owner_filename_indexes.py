@@ -0,0 +1,41 @@
+"""scope filename suggestion indexes to the owner
+
+Revision ID: add_file_owner_filename_indexes
+Revises: add_file_s3_key_unique
+Create Date: 2026-10-17 21:30:00.000000
+
+"""
+
+from typing import Sequence, Union
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "add_file_owner_filename_indexes"
+down_revision: Union[str, Sequence[str], None] = "add_file_s3_key_unique"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Lead the trigram index with owner_id and add an owner prefix index."""
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    op.create_index("ix_file_owner_id_filename_trgm", "file",
+                    ["owner_id", "filename"],
+                    unique=False, postgresql_using="gin",
+                    postgresql_ops={"filename": "gin_trgm_ops"})
+    op.drop_index("ix_file_filename_trgm", table_name="file")
+    op.create_index("ix_file_owner_id_lower_filename", "file",
+                    ["owner_id", sa.text("lower(filename) text_pattern_ops")],
+                    unique=False)
+
+
+def downgrade() -> None:
+    """Restore the trigram index over all owners (btree_gin is left installed)."""
+
+    op.drop_index("ix_file_owner_id_lower_filename", table_name="file")
+    op.create_index("ix_file_filename_trgm", "file", ["filename"],
+                    unique=False, postgresql_using="gin",
+                    postgresql_ops={"filename": "gin_trgm_ops"})
+    op.drop_index("ix_file_owner_id_filename_trgm", table_name="file")
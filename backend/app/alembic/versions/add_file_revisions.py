@@ -0,0 +1,48 @@
+"""add file_revision table for document history
+
+Revision ID: add_file_revisions
+Revises: add_file_filename_trgm
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "add_file_revisions"
+down_revision: Union[str, Sequence[str], None] = "add_file_filename_trgm"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the file_revision table."""
+
+    op.create_table(
+        "file_revision",
+        sa.Column("file_id", sa.Uuid(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("author_id", sa.Uuid(), nullable=True),
+        sa.Column("snapshot", sa.Text(), nullable=True),
+        sa.Column("delta", sa.Text(), nullable=True),
+        sa.Column("chain_length", sa.Integer(), nullable=False,
+                  server_default="0"),
+        sa.Column("chain_bytes", sa.Integer(), nullable=False,
+                  server_default="0"),
+        sa.Column("content_sha256", sa.String(length=64), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["file_id"], ["file.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(
+            ["author_id"], ["user.id"], ondelete="SET NULL"),
+        sa.ForeignKeyConstraint(["content_sha256"], ["blob.sha256"]),
+        sa.PrimaryKeyConstraint("file_id", "version"),
+    )
+
+
+def downgrade() -> None:
+    """Drop the file_revision table."""
+
+    op.drop_table("file_revision")
@@ -0,0 +1,30 @@
+"""add a unique index on the keys of files not deduplicated
+
+Revision ID: add_file_s3_key_unique
+Revises: add_conversion_job_lease
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "add_file_s3_key_unique"
+down_revision: Union[str, Sequence[str], None] = "add_conversion_job_lease"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Allow one file per object outside the blob store."""
+
+    op.create_index("ix_file_s3_key_unshared", "file", ["s3_key"], unique=True,
+                    postgresql_where=sa.text("content_sha256 IS NULL"))
+
+
+def downgrade() -> None:
+    """Drop the unique s3_key index."""
+
+    op.drop_index("ix_file_s3_key_unshared", table_name="file")
@@ -0,0 +1,42 @@
+"""add generated full-text search column on file.quill_content
+
+Revision ID: add_file_search_vector
+Revises: add_file_list_indexes
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "add_file_search_vector"
+down_revision: Union[str, Sequence[str], None] = "add_file_list_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add the tsvector of the tag-stripped Quill HTML and its GIN index."""
+
+    op.add_column('file', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(
+            "to_tsvector('english', regexp_replace("
+            "coalesce(quill_content, ''), '<[^>]*>', ' ', 'g'))",
+            persisted=True
+        ),
+        nullable=True
+    ))
+    op.create_index("ix_file_search_vector", "file", ["search_vector"],
+                    unique=False, postgresql_using="gin")
+
+
+def downgrade() -> None:
+    """Drop the full-text search column and its index."""
+
+    op.drop_index("ix_file_search_vector", table_name="file")
+    op.drop_column('file', 'search_vector')
@@ -0,0 +1,30 @@
+"""add file.version for HTTP conditional requests
+
+Revision ID: add_file_version
+Revises: add_conversion_jobs
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "add_file_version"
+down_revision: Union[str, Sequence[str], None] = "add_conversion_jobs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add the per-file write counter used in ETags."""
+
+    op.add_column('file', sa.Column(
+        'version', sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade() -> None:
+    """Remove the per-file write counter."""
+
+    op.drop_column('file', 'version')
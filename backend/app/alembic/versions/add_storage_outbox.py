@@ -0,0 +1,47 @@
+"""add storage_outbox table for deferred S3 deletes
+
+Revision ID: add_storage_outbox
+Revises: add_file_revisions
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "add_storage_outbox"
+down_revision: Union[str, Sequence[str], None] = "add_file_revisions"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the storage_outbox table."""
+
+    op.create_table(
+        "storage_outbox",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("s3_key", sa.String(length=500), nullable=False),
+        sa.Column("not_before", sa.DateTime(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False,
+                  server_default="0"),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_storage_outbox_s3_key"), "storage_outbox",
+                    ["s3_key"], unique=False)
+    op.create_index(op.f("ix_storage_outbox_not_before"), "storage_outbox",
+                    ["not_before"], unique=False)
+
+
+def downgrade() -> None:
+    """Drop the storage_outbox table."""
+
+    op.drop_index(op.f("ix_storage_outbox_not_before"),
+                  table_name="storage_outbox")
+    op.drop_index(op.f("ix_storage_outbox_s3_key"),
+                  table_name="storage_outbox")
+    op.drop_table("storage_outbox")
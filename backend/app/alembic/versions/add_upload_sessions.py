@@ -0,0 +1,59 @@
+"""add upload session tables for resumable chunked uploads
+
+Revision ID: add_upload_sessions
+Revises: add_doc_conv_fields
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "add_upload_sessions"
+down_revision: Union[str, Sequence[str], None] = "add_doc_conv_fields"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create upload_session and upload_session_part tables."""
+
+    op.create_table(
+        "upload_session",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("owner_id", sa.Uuid(), nullable=False),
+        sa.Column("filename", sa.String(length=255), nullable=False),
+        sa.Column("mime_type", sa.String(length=100), nullable=True),
+        sa.Column("s3_key", sa.String(length=500), nullable=False),
+        sa.Column("upload_id", sa.String(length=1024), nullable=False),
+        sa.Column("part_size", sa.Integer(), nullable=False),
+        sa.Column("total_size", sa.BigInteger(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["owner_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_upload_session_owner_id"),
+                    "upload_session", ["owner_id"], unique=False)
+
+    op.create_table(
+        "upload_session_part",
+        sa.Column("session_id", sa.Uuid(), nullable=False),
+        sa.Column("part_number", sa.Integer(), nullable=False),
+        sa.Column("etag", sa.String(length=255), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["session_id"], ["upload_session.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("session_id", "part_number"),
+    )
+
+
+def downgrade() -> None:
+    """Drop upload session tables."""
+
+    op.drop_table("upload_session_part")
+    op.drop_index(op.f("ix_upload_session_owner_id"),
+                  table_name="upload_session")
+    op.drop_table("upload_session")
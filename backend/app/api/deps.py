@@ -1,6 +1,8 @@
 """Dependencies for the API"""
 
-from collections.abc import Generator
+import time
+import uuid
+from collections.abc import AsyncGenerator
 
 from typing import Annotated, Any, cast
 
@@ -8,51 +10,65 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from pydantic import ValidationError
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core import security
 from app.core.config import settings
-from app.core.db import engine
+from app.core.db import async_session
 from app.models import TokenPayload, User
-from app.services.websocket_manager import FileConnectionManager
+from app.services.user_cache import user_cache
+from app.services.websocket_manager import FileConnectionManager, file_connection_manager
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
 )
 
 
-def get_db() -> Generator[Session, None, None]:
-    """Dependency to get SQLModel session"""
-    with Session(engine) as session:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency to get an async SQLModel session"""
+    async with async_session() as session:
         yield session
 
 
 def get_file_manager() -> FileConnectionManager:
-    """Dependency to get FileConnectionManager instance"""
-    return FileConnectionManager()
+    """Dependency to get the process-wide FileConnectionManager"""
+    return file_connection_manager
 
 
-SessionDep = Annotated[Session, Depends(get_db)]
+SessionDep = Annotated[AsyncSession, Depends(get_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 FileManagerDep = Annotated[FileConnectionManager, Depends(get_file_manager)]
 
 
-def get_current_user(session: SessionDep, token: TokenDep) -> User:
-    """Dependency to get current user"""
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
-    except (JWTError, ValidationError) as exc:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials",
-        ) from exc
-
-    user = session.get(User, token_data.sub)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+async def get_current_user(session: SessionDep, token: TokenDep) -> User:
+    """Dependency to get current user (served from user_cache when possible)"""
+    user_id = user_cache.get_token_subject(token)
+    if user_id is None:
+        try:
+            payload = jwt.decode(
+                token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
+            )
+            if payload.get("type") is not None:
+                raise ValueError("Not an access token")  # e.g. an upload token
+            token_data = TokenPayload(**payload)
+            user_id = uuid.UUID(token_data.sub)
+        except (JWTError, ValidationError, TypeError, ValueError) as exc:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Could not validate credentials",
+            ) from exc
+        user_cache.set_token_subject(
+            token, user_id, payload.get("exp", time.time() + user_cache.ttl_seconds))
+
+    user = user_cache.get_user(user_id)
+    if user is None:
+        user = await session.get(User, user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        # Detach it: a rollback later in this request would otherwise expire
+        # the instance other requests get from the cache
+        session.expunge(user)
+        user_cache.set_user(user)
 
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
@@ -78,9 +94,33 @@ def decode_access_token(token: str) -> dict[str, Any]:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
         )
+        if payload.get("type") is not None:
+            raise ValueError("Not an access token")  # e.g. an upload token
         return cast(dict[str, Any], payload)
-    except (JWTError, ValidationError) as exc:
+    except (JWTError, ValidationError, ValueError) as exc:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         ) from exc
+
+
+def decode_share_token(token: str) -> str | None:
+    """File id a share token grants access to, None if the token is invalid"""
+    try:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
+        )
+    except JWTError:
+        return None
+
+    # Accept either explicit file_id claim (new tokens) or legacy sub JSON
+    file_id_claim = payload.get("file_id")
+    if not file_id_claim and isinstance(payload.get("sub"), str):
+        try:
+            import json as _json
+            if payload["sub"].startswith("{"):
+                sub_obj = _json.loads(payload["sub"])  # legacy encoded
+                file_id_claim = sub_obj.get("file_id")
+        except Exception:
+            file_id_claim = None
+    return file_id_claim if isinstance(file_id_claim, str) else None
@@ -0,0 +1,165 @@
+"""HTTP helpers shared by the file routes"""
+
+import base64
+import hashlib
+import json
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Iterable
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.models import File
+
+_BYTE_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a Range header lies entirely outside the resource"""
+
+
+class InvalidCursor(Exception):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def parse_byte_range(range_header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Parse a single-range ``Range: bytes=...`` header against a resource size.
+
+    Returns:
+        Inclusive (start, end) offsets, or None when the whole resource should
+        be sent (no header, unsupported unit, malformed or multi-range value)
+
+    Raises:
+        RangeNotSatisfiable: the range starts past the end of the resource,
+            or selects no bytes (a zero-length suffix, or any suffix of an
+            empty resource)
+    """
+    if not range_header:
+        return None
+
+    match = _BYTE_RANGE_RE.match(range_header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # Suffix range: the last N bytes
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(size - suffix, 0), size - 1
+
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    end = int(last) if last else size - 1
+    return start, min(end, size - 1)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Timestamps are stored as naive UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def http_date(value: datetime) -> str:
+    """Format a timestamp for Last-Modified"""
+    return format_datetime(_as_utc(value), usegmt=True)
+
+
+def file_etag(file: File | Any) -> str:
+    """
+    Strong ETag of a file's metadata and Quill content; ``file`` may also be
+    a summary row with id, version and updated_at.
+    """
+    updated_at = int(_as_utc(file.updated_at).timestamp() * 1_000_000)
+    return f'"{file.id.hex}-{file.version}-{updated_at:x}"'
+
+
+def file_list_etag(files: Iterable[File | Any], *params: object) -> str:
+    """Strong ETag of a page of files; ``params`` are the query parameters"""
+    hasher = hashlib.sha256(repr(params).encode())
+    for file in files:
+        hasher.update(file_etag(file).encode())
+    return f'"{hasher.hexdigest()}"'
+
+
+def validator_headers(etag: str | None, last_modified: datetime | None) -> dict[str, str]:
+    """ETag/Last-Modified headers, asking clients to revalidate every use"""
+    headers = {"Cache-Control": "private, no-cache"}
+    if etag:
+        headers["ETag"] = etag
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison (RFC 9110 13.1.2)
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in header.split(",")
+    )
+
+
+def is_not_modified(
+    request: Request, etag: str | None, last_modified: datetime | None
+) -> bool:
+    """
+    Evaluate If-None-Match / If-Modified-Since against the current validators.
+
+    If-Modified-Since is ignored whenever If-None-Match is present.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag is not None and _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if not if_modified_since or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have one-second resolution
+    return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+
+
+def not_modified_response(headers: dict[str, str]) -> Response:
+    """304 carrying the same validators a 200 would have"""
+    return Response(status_code=304, headers=headers)
+
+
+def encode_cursor(*values: object) -> str:
+    """Opaque, URL-safe pagination cursor for a row's sort key"""
+    raw = json.dumps(values, default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    """
+    Inverse of encode_cursor.
+
+    Raises:
+        InvalidCursor: the cursor was not produced by encode_cursor
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor()
+    if not isinstance(values, list):
+        raise InvalidCursor()
+    return values
@@ -1,58 +1,62 @@
-from app.core.security import ALGORITHM
-from app.core.config import settings
 import uuid
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException
-from jose import JWTError, jwt
-from sqlmodel import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app import crud
-from app.api.deps import get_db
+from app.api.deps import decode_share_token, get_db
+from app.api.http_utils import (
+    file_etag,
+    is_not_modified,
+    not_modified_response,
+    validator_headers,
+)
 from app.api.routes import login, users, websocket
-from app.api.routes import files
+from app.api.routes import files, metrics, revisions, uploads
 
 api_router = APIRouter()
 api_router.include_router(login.router)
 api_router.include_router(users.router)
+api_router.include_router(uploads.router, prefix="/files/uploads")
 api_router.include_router(files.router, prefix="/files")
+api_router.include_router(revisions.router, prefix="/files")
 api_router.include_router(websocket.router)
+api_router.include_router(metrics.router)
 
 
 @api_router.get("/public/files/{file_id}")
-def get_public_file(file_id: uuid.UUID, token: str, session: Session = Depends(get_db)) -> dict[str, Any]:
+async def get_public_file(
+    file_id: uuid.UUID,
+    token: str,
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_db)
+) -> Any:
     """Read-only public access via short-lived share token bound to file_id."""
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY,
-                             algorithms=[ALGORITHM])
-    except JWTError:
+    file_id_claim = decode_share_token(token)
+    if file_id_claim is None:
         raise HTTPException(status_code=403, detail="Invalid or expired token")
 
-    # Accept either explicit file_id claim (new tokens) or legacy sub JSON
-    file_id_claim = payload.get("file_id")
-    if not file_id_claim and isinstance(payload.get("sub"), str):
-        try:
-            import json as _json
-            if payload["sub"].startswith("{"):
-                sub_obj = _json.loads(payload["sub"])  # legacy encoded
-                file_id_claim = sub_obj.get("file_id")
-        except Exception:
-            file_id_claim = None
-
     if file_id_claim != str(file_id):
         raise HTTPException(
             status_code=403, detail="Token does not grant access to this file"
         )
 
-    file = crud.get_file_by_id(session, file_id=file_id)
+    file = await crud.get_file_by_id(session, file_id=file_id)
     if not file:
         raise HTTPException(status_code=404, detail="File not found")
 
+    etag = file_etag(file)
+    headers = validator_headers(etag, file.updated_at)
+    if is_not_modified(request, etag, file.updated_at):
+        return not_modified_response(headers)
+    response.headers.update(headers)
+
     # Return file data including content for editing
     return {
         "id": str(file.id),
         "filename": file.filename,
-        "s3_key": file.s3_key,
         "file_size": file.file_size,
         "mime_type": file.mime_type,
         "original_format": file.original_format,
@@ -1,179 +1,496 @@
+import asyncio
 import uuid
 import os
-from typing import List
-from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from fastapi.responses import FileResponse
-from sqlmodel import Session
-
-from app.api.deps import get_db, CurrentUser
-from app.models import File as FileModel, FileCreate, FileUpdate, FilePublic
+from typing import Literal
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Form
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from jose import JWTError, jwt
+from sqlalchemy.exc import IntegrityError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api.deps import get_db, CurrentUser, FileManagerDep
+from app.api.http_utils import (
+    InvalidCursor,
+    RangeNotSatisfiable,
+    decode_cursor,
+    encode_cursor,
+    file_etag,
+    file_list_etag,
+    is_not_modified,
+    not_modified_response,
+    parse_byte_range,
+    validator_headers
+)
+from app.models import (
+    ConversionJob,
+    ConversionJobPublic,
+    DirectUploadComplete,
+    DirectUploadCreate,
+    DirectUploadPublic,
+    File as FileModel,
+    FileBulkDelete,
+    FileBulkDeletePublic,
+    FileBulkDeleteResult,
+    FileCreate,
+    FileUpdate,
+    FilePublic,
+    FileSearchHit,
+    FileSearchResults,
+    FilesPublic,
+    FileSuggestions,
+    FileSummary
+)
 from app.crud import (
-    create_file_for_user,
+    create_conversion_job,
+    get_file_by_s3_key_for_user,
+    get_latest_conversion_job,
     get_files_for_user,
     get_file_by_id_for_user,
-    update_file_for_user,
-    delete_file_for_user
+    search_files_for_user,
+    cancel_storage_deletes,
+    delete_files_for_user,
+    enqueue_storage_deletes
+)
+from app.services.s3_service import async_s3_service
+from app.services.blob_store import BlobStoreError, blob_store
+from app.services.conversion_worker import conversion_worker
+from app.services.multipart_upload import (
+    MultipartFormError,
+    MultipartUploadError,
+    open_form_file
+)
+from app.services.object_cache import object_cache
+from app.services.revision_history import revision_history
+from app.services.storage_sweeper import storage_sweeper
+from app.services.file_registry import file_registry
+from app.services.filename_autocomplete import filename_autocomplete
+from app.core.config import settings
+from app.core.security import (
+    ALGORITHM,
+    UPLOAD_TOKEN_TYPE,
+    create_share_token,
+    create_upload_token
 )
-from app.services.s3_service import s3_service
-from app.services.document_converter import document_converter
-from app.core.security import create_share_token
 
 router = APIRouter()
 
+# The upload bodies are parsed by hand (see open_form_file), so describe them
+# for the OpenAPI docs explicitly
+FILE_FORM_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"]
+                }
+            }
+        }
+    }
+}
 
-@router.post("/upload", response_model=FilePublic)
+
+@router.post("/upload", response_model=FilePublic, openapi_extra=FILE_FORM_BODY)
 async def upload_file(
-    file: UploadFile,
+    request: Request,
     current_user: CurrentUser,
-    db: Session = Depends(get_db),
+    manager: FileManagerDep,
+    db: AsyncSession = Depends(get_db),
     description: str = None
 ):
     """Upload a file to S3 and save metadata to database"""
 
+    # The body is forwarded to S3 as it arrives rather than spooled first
+    try:
+        file = await open_form_file(request)
+    except MultipartFormError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     # Validate file
     if not file.filename:
         raise HTTPException(status_code=400, detail="No filename provided")
 
-    # Generate unique S3 key
-    file_extension = os.path.splitext(file.filename)[1]
-    s3_key = f"users/{current_user.id}/{uuid.uuid4()}{file_extension}"
+    mime_type = file.content_type or "application/octet-stream"
+
+    # Only documents we convert for Quill need to be kept in memory; every
+    # other upload is streamed to S3 part by part
+    convertible = file_registry.original_format(file.filename) is not None
+    document_buffer = bytearray()
 
     try:
-        # Save file temporarily to get size and content
-        temp_path = f"/tmp/{uuid.uuid4()}{file_extension}"
-        with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-
-        # Get file info
-        file_size = len(content)
-        mime_type = file.content_type or "application/octet-stream"
-
-        # Handle document conversion for Quill editor
-        original_format = None
-        quill_content = None
-
-        print(
-            f"Upload: Processing file {file.filename} with mime_type {mime_type}")
-        print(
-            f"Upload: Document converter available: {document_converter is not None}")
-        print("DEBUG >>> raw filename repr:", repr(file.filename))
-        print("DEBUG >>> lowercased:", file.filename.lower())
-
-        print("DEBUG >>> endswith .docx:",
-              file.filename.lower().endswith(".docx"))
-        if document_converter and document_converter.is_docx_file(file.filename):
-            original_format = "docx"  # Always set for DOCX files
-            try:
-                # Convert DOCX to HTML for Quill editor
-                html_content, plain_text = document_converter.docx_to_html(
-                    content)
-                quill_content = document_converter.get_quill_content(
-                    html_content)
-                print(
-                    f"Converted DOCX to HTML: {len(quill_content)} characters")
-            except Exception as e:
-                print(f"Warning: Failed to convert DOCX to HTML: {e}")
-                # Continue without conversion if it fails
-                quill_content = None
-        elif document_converter and document_converter.is_html_file(file.filename):
-            # HTML files can be used directly in Quill
-            try:
-                quill_content = document_converter.get_quill_content(
-                    content.decode('utf-8'))
-                original_format = "html"
-                print(
-                    f"Processed HTML for Quill: {len(quill_content)} characters")
-            except Exception as e:
-                print(f"Warning: Failed to process HTML: {e}")
-
-        # Upload to S3
-        if not s3_service.upload_file(temp_path, s3_key):
-            raise HTTPException(
-                status_code=500, detail="Failed to upload file to S3")
-
-        # Clean up temp file
-        os.remove(temp_path)
-
-        # Create file record in database
-        print(
-            f"Upload: Creating file record with original_format={original_format}, quill_content={'yes' if quill_content else 'no'}")
-        file_data = FileCreate(
-            filename=file.filename,
-            s3_key=s3_key,
-            file_size=file_size,
-            mime_type=mime_type,
-            original_format=original_format,
-            quill_content=quill_content
+        # Identical content already stored is referenced instead of re-uploaded
+        blob = await blob_store.store_stream(
+            db,
+            file.chunks(),
+            content_type=mime_type,
+            on_chunk=document_buffer.extend if convertible else None
         )
+    except MultipartUploadError as e:
+        if isinstance(e.__cause__, MultipartFormError):
+            raise HTTPException(status_code=400, detail=str(e.__cause__))
+        raise HTTPException(
+            status_code=500, detail=f"Failed to upload file to S3: {str(e)}")
+    except BlobStoreError as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to upload file to S3: {str(e)}")
 
-        db_file = create_file_for_user(
-            session=db,
+    try:
+        # DOCX/HTML files are converted for the Quill editor in the background
+        db_file = await file_registry.register(
+            db,
             owner_id=current_user.id,
-            file_in=file_data
-        )
-
-        return FilePublic(
-            id=db_file.id,
-            filename=db_file.filename,
-            s3_key=db_file.s3_key,
-            file_size=db_file.file_size,
-            mime_type=db_file.mime_type,
-            original_format=db_file.original_format,
-            quill_content=db_file.quill_content,
-            owner_id=db_file.owner_id,
-            created_at=db_file.created_at,
-            updated_at=db_file.updated_at
+            file_in=FileCreate(
+                filename=file.filename,
+                s3_key=blob.s3_key,
+                content_sha256=blob.sha256,
+                file_size=blob.size,
+                mime_type=mime_type
+            ),
+            content=bytes(document_buffer) if convertible else None,
+            manager=manager
         )
 
     except Exception as e:
-        # Clean up temp file if it exists
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        # The content is already stored; drop the reference taken for it
+        # (read the digest first: rolling back expires loaded objects)
+        sha256 = blob.sha256
+        await db.rollback()
+        await blob_store.release(db, sha256)
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+    return FilePublic(
+        id=db_file.id,
+        filename=db_file.filename,
+        file_size=db_file.file_size,
+        mime_type=db_file.mime_type,
+        original_format=db_file.original_format,
+        quill_content=db_file.quill_content,
+        owner_id=db_file.owner_id,
+        created_at=db_file.created_at,
+        updated_at=db_file.updated_at
+    )
+
+
+@router.post("/upload/presign", response_model=DirectUploadPublic)
+async def presign_upload(
+    upload_in: DirectUploadCreate,
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Issue a presigned S3 POST so the client uploads the bytes directly to S3,
+    then records the file through /upload/complete
+    """
+    if upload_in.file_size > settings.DIRECT_UPLOAD_MAX_SIZE:
+        raise HTTPException(status_code=413, detail="File too large")
+
+    file_extension = os.path.splitext(upload_in.filename)[1]
+    s3_key = f"users/{current_user.id}/{uuid.uuid4()}{file_extension}"
+    mime_type = upload_in.mime_type or "application/octet-stream"
+    expires_in = settings.DIRECT_UPLOAD_EXPIRE_SECONDS
+
+    upload_form = await async_s3_service.get_upload_post(
+        s3_key, mime_type, upload_in.file_size, expires_in=expires_in)
+    if not upload_form:
+        raise HTTPException(
+            status_code=500, detail="Failed to generate upload URL")
+
+    # Deleted unless /upload/complete records the object in time
+    enqueue_storage_deletes(
+        db,
+        [s3_key],
+        not_before=datetime.utcnow() + timedelta(
+            seconds=expires_in + settings.STORAGE_UPLOAD_GRACE_SECONDS)
+    )
+    await db.commit()
+
+    upload_token = create_upload_token(
+        str(current_user.id),
+        {
+            "s3_key": s3_key,
+            "filename": upload_in.filename,
+            "mime_type": mime_type,
+            "file_size": upload_in.file_size
+        },
+        expires_delta=timedelta(seconds=expires_in)
+    )
+
+    return DirectUploadPublic(
+        url=upload_form["url"],
+        fields=upload_form["fields"],
+        s3_key=s3_key,
+        upload_token=upload_token,
+        expires_in=expires_in
+    )
+
+
+@router.post("/upload/complete", response_model=FilePublic)
+async def complete_direct_upload(
+    upload_in: DirectUploadComplete,
+    current_user: CurrentUser,
+    manager: FileManagerDep,
+    db: AsyncSession = Depends(get_db)
+):
+    """Record a file uploaded directly to S3 after checking the stored object"""
+    try:
+        payload = jwt.decode(
+            upload_in.upload_token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(
+            status_code=403, detail="Invalid or expired upload token")
+    if payload.get("type") != UPLOAD_TOKEN_TYPE:
+        raise HTTPException(status_code=403, detail="Not an upload token")
+
+    upload = payload.get("upload")
+    if payload.get("sub") != str(current_user.id) or not isinstance(upload, dict):
+        raise HTTPException(
+            status_code=403, detail="Upload token was not issued to this user")
+
+    # Completing twice must not create a second record for the same object
+    db_file = await get_file_by_s3_key_for_user(
+        db, owner_id=current_user.id, s3_key=upload["s3_key"])
+
+    if not db_file:
+        head = await async_s3_service.head_object(upload["s3_key"])
+        if not head:
+            raise HTTPException(
+                status_code=400, detail="Uploaded object not found in S3")
+
+        if head["ContentLength"] != upload["file_size"]:
+            enqueue_storage_deletes(db, [upload["s3_key"]])
+            await db.commit()
+            storage_sweeper.wake()
+            raise HTTPException(
+                status_code=400, detail="Uploaded object size does not match")
+
+        if upload_in.etag and upload_in.etag.strip('"') != head["ETag"].strip('"'):
+            raise HTTPException(
+                status_code=400, detail="Uploaded object ETag does not match")
+
+        # The API never saw the bytes, so the object is not deduplicated.
+        # Recording it cancels its pending delete in the same transaction.
+        await cancel_storage_deletes(db, s3_key=upload["s3_key"])
+        try:
+            db_file = await file_registry.register(
+                db,
+                owner_id=current_user.id,
+                file_in=FileCreate(
+                    filename=upload["filename"],
+                    s3_key=upload["s3_key"],
+                    file_size=head["ContentLength"],
+                    mime_type=upload["mime_type"]
+                ),
+                manager=manager
+            )
+        except IntegrityError:
+            # A concurrent completion recorded the object first (the key of
+            # a file outside the blob store is unique): return its file
+            await db.rollback()
+            db_file = await get_file_by_s3_key_for_user(
+                db, owner_id=current_user.id, s3_key=upload["s3_key"])
+            if not db_file:
+                raise
+
+    return FilePublic(
+        id=db_file.id,
+        filename=db_file.filename,
+        file_size=db_file.file_size,
+        mime_type=db_file.mime_type,
+        original_format=db_file.original_format,
+        quill_content=db_file.quill_content,
+        owner_id=db_file.owner_id,
+        created_at=db_file.created_at,
+        updated_at=db_file.updated_at
+    )
 
-@router.get("/", response_model=List[FilePublic])
-def get_user_files(
+
+@router.get("/", response_model=FilesPublic)
+async def get_user_files(
     current_user: CurrentUser,
-    db: Session = Depends(get_db),
-    skip: int = 0,
-    limit: int = 100
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    sort: Literal["updated_at", "filename"] = "updated_at",
+    order: Literal["asc", "desc"] = "desc",
+    cursor: str | None = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+    include: Literal["content"] | None = None
 ):
-    """Get all files for the current user"""
-    files = get_files_for_user(
+    """
+    Get the current user's files, one page at a time. Pass the returned
+    next_cursor back (with the same sort and order) to get the next page.
+    Entries are metadata summaries; include=content adds each quill_content.
+    """
+    include_content = include == "content"
+    after = None
+    if cursor:
+        try:
+            value, last_id = decode_cursor(cursor)
+            if sort == "updated_at":
+                value = datetime.fromisoformat(value)
+            after = (value, uuid.UUID(last_id))
+        except (InvalidCursor, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # One extra row tells whether there is a next page
+    files = await get_files_for_user(
         session=db,
         owner_id=current_user.id,
-        skip=skip,
-        limit=limit
+        sort=sort,
+        descending=order == "desc",
+        after=after,
+        limit=limit + 1,
+        include_content=include_content
+    )
+    next_cursor = None
+    if len(files) > limit:
+        files = files[:limit]
+        last = files[-1]
+        next_cursor = encode_cursor(getattr(last, sort), last.id)
+
+    headers = validator_headers(
+        file_list_etag(files, sort, order, cursor, limit, include),
+        max((file.updated_at for file in files), default=None)
     )
+    if is_not_modified(request, headers["ETag"], None):
+        return not_modified_response(headers)
+    response.headers.update(headers)
+
+    if include_content:
+        data: list[FilePublic | FileSummary] = [
+            FilePublic(
+                id=file.id,
+                filename=file.filename,
+                file_size=file.file_size,
+                mime_type=file.mime_type,
+                original_format=file.original_format,
+                quill_content=file.quill_content,
+                owner_id=file.owner_id,
+                created_at=file.created_at,
+                updated_at=file.updated_at
+            )
+            for file in files
+        ]
+    else:
+        data = [
+            FileSummary(
+                id=file.id,
+                filename=file.filename,
+                file_size=file.file_size,
+                mime_type=file.mime_type,
+                original_format=file.original_format,
+                has_quill_content=file.has_quill_content,
+                owner_id=file.owner_id,
+                created_at=file.created_at,
+                updated_at=file.updated_at
+            )
+            for file in files
+        ]
+
+    return FilesPublic(data=data, next_cursor=next_cursor)
+
 
-    return [
-        FilePublic(
-            id=file.id,
-            filename=file.filename,
-            s3_key=file.s3_key,
-            file_size=file.file_size,
-            mime_type=file.mime_type,
-            original_format=file.original_format,
-            quill_content=file.quill_content,
-            owner_id=file.owner_id,
-            created_at=file.created_at,
-            updated_at=file.updated_at
+@router.get("/search", response_model=FileSearchResults)
+async def search_files(
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
+    q: str = Query(min_length=1, max_length=500),
+    limit: int = Query(default=20, ge=1, le=100)
+):
+    """
+    Full-text search over the current user's documents. Accepts web search
+    syntax ("quoted phrases", or, -excluded) and returns the best matches
+    with highlighted snippets.
+    """
+    hits = await search_files_for_user(
+        db, owner_id=current_user.id, query=q, limit=limit)
+
+    return FileSearchResults(data=[
+        FileSearchHit(
+            id=hit.id,
+            filename=hit.filename,
+            file_size=hit.file_size,
+            mime_type=hit.mime_type,
+            original_format=hit.original_format,
+            has_quill_content=hit.has_quill_content,
+            owner_id=hit.owner_id,
+            created_at=hit.created_at,
+            updated_at=hit.updated_at,
+            rank=hit.rank,
+            snippet=hit.snippet
         )
-        for file in files
-    ]
+        for hit in hits
+    ])
+
+
+@router.get("/autocomplete", response_model=FileSuggestions)
+async def autocomplete_filenames(
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
+    prefix: str = Query(min_length=1, max_length=255),
+    limit: int = Query(default=10, ge=1)
+):
+    """
+    Suggest the current user's files whose name contains ``prefix``, names
+    starting with it first. At most AUTOCOMPLETE_MAX_RESULTS are returned.
+    """
+    return FileSuggestions(data=await filename_autocomplete.suggest(
+        db, current_user.id, prefix, limit))
+
+
+@router.post("/bulk-delete", response_model=FileBulkDeletePublic)
+async def bulk_delete_files(
+    body: FileBulkDelete,
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Delete many files at once. Rows are deleted with one statement and their
+    S3 objects queued for the storage sweeper, which removes them with
+    batched DeleteObjects requests. Each id gets its own result; ids the user
+    does not own are reported as not found.
+    """
+    file_ids = list(dict.fromkeys(body.ids))
+    if len(file_ids) > settings.BULK_DELETE_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BULK_DELETE_MAX_FILES} files per request"
+        )
+
+    deleted = await delete_files_for_user(
+        db, owner_id=current_user.id, file_ids=file_ids)
+    for row in deleted:
+        if row.s3_key:
+            object_cache.invalidate(row.s3_key)
+    if deleted:
+        storage_sweeper.wake()
+
+    deleted_ids = {row.id for row in deleted}
+    return FileBulkDeletePublic(
+        data=[
+            FileBulkDeleteResult(
+                id=file_id,
+                status="deleted" if file_id in deleted_ids else "not_found"
+            )
+            for file_id in file_ids
+        ],
+        deleted=len(deleted_ids)
+    )
 
 
 @router.get("/{file_id}", response_model=FilePublic)
-def get_file(
+async def get_file(
     file_id: uuid.UUID,
     current_user: CurrentUser,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
 ):
     """Get a specific file by ID"""
-    file = get_file_by_id_for_user(
+    file = await get_file_by_id_for_user(
         session=db,
         owner_id=current_user.id,
         file_id=file_id
@@ -182,10 +499,15 @@ def get_file(
     if not file:
         raise HTTPException(status_code=404, detail="File not found")
 
+    etag = file_etag(file)
+    headers = validator_headers(etag, file.updated_at)
+    if is_not_modified(request, etag, file.updated_at):
+        return not_modified_response(headers)
+    response.headers.update(headers)
+
     return FilePublic(
         id=file.id,
         filename=file.filename,
-        s3_key=file.s3_key,
         file_size=file.file_size,
         mime_type=file.mime_type,
         original_format=file.original_format,
@@ -197,13 +519,13 @@ def get_file(
 
 
 @router.get("/{file_id}/download")
-def download_file(
+async def download_file(
     file_id: uuid.UUID,
     current_user: CurrentUser,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Generate a download URL for a file"""
-    file = get_file_by_id_for_user(
+    file = await get_file_by_id_for_user(
         session=db,
         owner_id=current_user.id,
         file_id=file_id
@@ -213,7 +535,8 @@ def download_file(
         raise HTTPException(status_code=404, detail="File not found")
 
     # Generate presigned URL for S3 download
-    download_url = s3_service.get_file_url(file.s3_key, expires_in=3600)
+    download_url = await async_s3_service.get_file_url(
+        file.s3_key, expires_in=3600)
 
     if not download_url:
         raise HTTPException(
@@ -223,42 +546,37 @@ def download_file(
 
 
 @router.delete("/{file_id}")
-def delete_file(
+async def delete_file(
     file_id: uuid.UUID,
     current_user: CurrentUser,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Delete a file from S3 and database"""
-    file = get_file_by_id_for_user(
-        session=db,
-        owner_id=current_user.id,
-        file_id=file_id
-    )
-
-    if not file:
+    """
+    Delete a file from the database. Its S3 object (shared content only with
+    its last reference) is queued and removed by the storage sweeper.
+    """
+    deleted = await delete_files_for_user(
+        db, owner_id=current_user.id, file_ids=[file_id])
+
+    if not deleted:
         raise HTTPException(status_code=404, detail="File not found")
 
-    # Delete from S3
-    if file.s3_key:
-        s3_service.delete_file(file.s3_key)
-
-    # Delete from database
-    if delete_file_for_user(db, owner_id=current_user.id, file_id=file_id):
-        return {"message": "File deleted successfully"}
-
-    raise HTTPException(status_code=500, detail="Failed to delete file")
+    if deleted[0].s3_key:
+        object_cache.invalidate(deleted[0].s3_key)
+    storage_sweeper.wake()
+    return {"message": "File deleted successfully"}
 
 
 @router.post("/{file_id}/share")
-def create_share_token_for_file(
+async def create_share_token_for_file(
     file_id: uuid.UUID,
     current_user: CurrentUser,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     expires_hours: int = Form(
         4, description="Token expiration in hours (default: 4)")
 ):
     """Create a share token for file collaboration"""
-    file = get_file_by_id_for_user(
+    file = await get_file_by_id_for_user(
         session=db,
         owner_id=current_user.id,
         file_id=file_id
@@ -279,14 +597,43 @@ def create_share_token_for_file(
     }
 
 
+def _parse_range_or_416(range_header: str | None, size: int) -> tuple[int, int] | None:
+    try:
+        return parse_byte_range(range_header, size)
+    except RangeNotSatisfiable:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}", "Accept-Ranges": "bytes"}
+        )
+
+
+def _content_headers(
+    file: FileModel, etag: str, last_modified: datetime | None, length: int
+) -> dict[str, str]:
+    headers = validator_headers(etag, last_modified)
+    headers.update({
+        "Content-Disposition": f"inline; filename={file.filename}",
+        "Content-Length": str(length),
+        "Accept-Ranges": "bytes"
+    })
+    return headers
+
+
 @router.get("/{file_id}/content")
-def get_file_content(
+async def get_file_content(
     file_id: uuid.UUID,
+    request: Request,
     current_user: CurrentUser,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get file content for editing (downloads from S3 temporarily)"""
-    file = get_file_by_id_for_user(
+    """
+    Get file content. Honors single byte ranges (Range/If-Range) with 206
+    Partial Content so media can start playing and seek at once. Small
+    objects are served from the local object cache, larger ones (and ranges
+    of objects not cached yet) streamed straight from S3. Unchanged content is answered with 304 Not Modified.
+    """
+    file = await get_file_by_id_for_user(
         session=db,
         owner_id=current_user.id,
         file_id=file_id
@@ -298,50 +645,107 @@ def get_file_content(
     if not file.s3_key:
         raise HTTPException(status_code=404, detail="File content not found")
 
-    try:
-        # Create temporary file path
-        temp_path = f"/tmp/{uuid.uuid4()}_{file.filename}"
+    media_type = file.mime_type or "application/octet-stream"
+    range_header = request.headers.get("range")
+    # If-Range: only send the range if the client's copy is still current.
+    # Dates and weak validators can't be checked strongly, so they never match.
+    if_range = request.headers.get("if-range")
+
+    # Strong validator: the content digest when known, else S3's own ETag
+    etag = f'"{file.content_sha256}"' if file.content_sha256 else None
+    if etag and is_not_modified(request, etag, None):
+        # Revalidated against the digest alone, without touching S3
+        return not_modified_response(validator_headers(etag, None))
+
+    cached = None
+    if object_cache.cacheable(file.file_size):
+        # A ranged request only uses an entry already cached: filling the
+        # cache would read the whole object from S3 for a few bytes
+        cached = await object_cache.get(file.s3_key, fill=not range_header)
+
+    if cached is not None:
+        etag = etag or cached.etag
+        if is_not_modified(request, etag, cached.last_modified):
+            cached.close()
+            return not_modified_response(
+                validator_headers(etag, cached.last_modified))
 
-        # Download from S3
-        if not s3_service.download_file(file.s3_key, temp_path):
-            raise HTTPException(
-                status_code=500, detail="Failed to download file from S3")
-
-        # Read file content
-        with open(temp_path, 'rb') as f:
-            content = f.read()
-
-        # Clean up temp file
-        os.remove(temp_path)
-
-        # Return file content with proper headers
-        from fastapi.responses import Response
-        return Response(
-            content=content,
-            media_type=file.mime_type or "application/octet-stream",
-            headers={
-                "Content-Disposition": f"inline; filename={file.filename}",
-                "Content-Length": str(file.file_size or len(content))
-            }
+        try:
+            byte_range = _parse_range_or_416(range_header, cached.size)
+        except HTTPException:
+            cached.close()
+            raise
+        if byte_range and if_range and if_range != etag:
+            byte_range = None
+
+        start, end = byte_range or (0, cached.size - 1)
+        headers = _content_headers(
+            file, etag, cached.last_modified, end - start + 1)
+        if byte_range:
+            headers["Content-Range"] = f"bytes {start}-{end}/{cached.size}"
+        # Disk entries are streamed from their file, never read whole
+        return StreamingResponse(
+            object_cache.iter_range(cached, start, end),
+            status_code=206 if byte_range else 200,
+            media_type=media_type,
+            headers=headers
         )
 
-    except Exception as e:
-        # Clean up temp file if it exists
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+    byte_range = None
+    if file.file_size is not None:
+        byte_range = _parse_range_or_416(range_header, file.file_size)
+
+    if byte_range and if_range:
+        if not if_range.startswith('"') or (etag and if_range != etag):
+            byte_range = None
+
+    range_value = f"bytes={byte_range[0]}-{byte_range[1]}" if byte_range else None
+    s3_object = await async_s3_service.get_object(
+        file.s3_key,
+        byte_range=range_value,
+        if_match=if_range if range_value and if_range and not etag else None
+    )
+    if s3_object is None and range_value:
+        # Object changed since the client's If-Range: send it whole
+        range_value = None
+        s3_object = await async_s3_service.get_object(file.s3_key)
+
+    if s3_object is None:
         raise HTTPException(
-            status_code=500, detail=f"Failed to read file: {str(e)}")
+            status_code=500, detail="Failed to read file from S3")
+
+    etag = etag or s3_object["ETag"]
+    last_modified = s3_object.get("LastModified")
+    if is_not_modified(request, etag, last_modified):
+        s3_object["Body"].close()
+        return not_modified_response(validator_headers(etag, last_modified))
+
+    headers = _content_headers(
+        file, etag, last_modified, s3_object["ContentLength"])
+
+    status_code = 200
+    if range_value:
+        status_code = 206
+        headers["Content-Range"] = s3_object.get("ContentRange") or \
+            f"bytes {byte_range[0]}-{byte_range[1]}/{file.file_size}"
+
+    return StreamingResponse(
+        async_s3_service.iter_body(s3_object["Body"]),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers
+    )
 
 
-@router.post("/{file_id}/content")
+@router.post("/{file_id}/content", openapi_extra=FILE_FORM_BODY)
 async def update_file_content(
     file_id: uuid.UUID,
+    request: Request,
     current_user: CurrentUser,
-    db: Session = Depends(get_db),
-    file: UploadFile = File(...)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update file content (replaces existing file in S3)"""
-    existing_file = get_file_by_id_for_user(
+    existing_file = await get_file_by_id_for_user(
         session=db,
         owner_id=current_user.id,
         file_id=file_id
@@ -354,59 +758,89 @@ async def update_file_content(
         raise HTTPException(status_code=404, detail="File not found")
 
     try:
-        # Save new file temporarily
-        temp_path = f"/tmp/{uuid.uuid4()}{os.path.splitext(file.filename)[1]}"
-        with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-
-        # Get new file info
-        new_file_size = len(content)
-        new_mime_type = file.content_type or existing_file.mime_type
-
-        # Upload new content to S3 (overwrites existing)
-        if not s3_service.upload_file(temp_path, existing_file.s3_key):
-            raise HTTPException(
-                status_code=500, detail="Failed to update file in S3")
+        file = await open_form_file(request)
+    except MultipartFormError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        # Clean up temp file
-        os.remove(temp_path)
+    old_s3_key = existing_file.s3_key
+    old_sha256 = existing_file.content_sha256
+    new_mime_type = file.content_type or existing_file.mime_type
 
+    try:
+        # Store the new content as its own blob: the old object may be shared
+        # with other files, so it is never overwritten in place
+        blob = await blob_store.store_stream(
+            db,
+            file.chunks(),
+            content_type=new_mime_type
+        )
+    except MultipartUploadError as e:
+        if isinstance(e.__cause__, MultipartFormError):
+            raise HTTPException(status_code=400, detail=str(e.__cause__))
+        raise HTTPException(
+            status_code=500, detail=f"Failed to update file in S3: {str(e)}")
+    except BlobStoreError as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to update file in S3: {str(e)}")
+
+    try:
         # Update database metadata
         update_data = FileUpdate(
             filename=file.filename or existing_file.filename,
-            mime_type=new_mime_type
+            mime_type=new_mime_type,
+            s3_key=blob.s3_key,
+            content_sha256=blob.sha256,
+            file_size=blob.size
         )
 
-        updated_file = update_file_for_user(
-            session=db,
+        if not old_sha256 and old_s3_key != blob.s3_key:
+            # The file's own object goes when the update commits
+            enqueue_storage_deletes(db, [old_s3_key])
+
+        updated_file = await revision_history.save(
+            db,
             owner_id=current_user.id,
             file_id=file_id,
-            file_in=update_data
+            file_in=update_data,
+            author_id=current_user.id
         )
 
         if not updated_file:
             raise HTTPException(
                 status_code=500, detail="Failed to update file metadata")
 
-        return {"message": "File content updated successfully", "filename": updated_file.filename}
-
     except Exception as e:
-        # Clean up temp file if it exists
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        sha256 = blob.sha256  # Rolling back expires loaded objects
+        await db.rollback()
+        await blob_store.release(db, sha256)
         raise HTTPException(
             status_code=500, detail=f"Failed to update file: {str(e)}")
 
+    # Drop this file's reference on the previous content (the upload took a
+    # new one even when the bytes are the same)
+    object_cache.invalidate(old_s3_key)
+    if old_sha256:
+        await blob_store.release(db, old_sha256)
+    else:
+        storage_sweeper.wake()
+
+    return {"message": "File content updated successfully", "filename": updated_file.filename}
+
 
 @router.post("/{file_id}/convert-to-docx")
 async def convert_to_docx(
     file_id: uuid.UUID,
     current_user: CurrentUser,
-    db: Session = Depends(get_db)
+    manager: FileManagerDep,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    wait: bool = True
 ):
-    """Convert file content back to DOCX format for download"""
-    file = get_file_by_id_for_user(
+    """
+    Convert file content back to DOCX format for download. The conversion
+    runs in the background pool; with wait=false the job is returned at once.
+    """
+    file = await get_file_by_id_for_user(
         session=db,
         owner_id=current_user.id,
         file_id=file_id
@@ -419,119 +853,80 @@ async def convert_to_docx(
         raise HTTPException(
             status_code=400, detail="No Quill content available for conversion")
 
-    try:
-        # Convert HTML content back to DOCX
-        docx_content = document_converter.html_to_docx(
-            file.quill_content,
-            filename=file.filename.replace('.docx', '_converted.docx')
-        )
+    job = await create_conversion_job(
+        db, file_id=file_id, owner_id=current_user.id, kind="to_docx")
+    task = conversion_worker.submit(job, manager=manager)
 
-        # Generate a new S3 key for the converted file
-        new_s3_key = f"users/{current_user.id}/{uuid.uuid4()}_converted.docx"
+    if not wait:
+        response.status_code = 202
+        return _job_public(job)
 
-        # Save DOCX temporarily and upload to S3
-        temp_path = f"/tmp/{uuid.uuid4()}_converted.docx"
-        with open(temp_path, "wb") as buffer:
-            buffer.write(docx_content)
-
-        # Upload converted DOCX to S3
-        if not s3_service.upload_file(temp_path, new_s3_key):
-            raise HTTPException(
-                status_code=500, detail="Failed to upload converted DOCX")
-
-        # Clean up temp file
-        os.remove(temp_path)
-
-        # Create a new file record for the converted version
-        converted_file_data = FileCreate(
-            filename=file.filename.replace('.docx', '_converted.docx'),
-            s3_key=new_s3_key,
-            file_size=len(docx_content),
-            mime_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            original_format="docx",
-            quill_content=file.quill_content  # Keep the original Quill content
-        )
-
-        converted_file = create_file_for_user(
-            session=db,
-            owner_id=current_user.id,
-            file_in=converted_file_data
-        )
+    # Shielded: a client disconnect must not cancel the job itself
+    job = await asyncio.shield(task)
+    if job.status != "succeeded" or not job.result_file_id:
+        raise HTTPException(
+            status_code=500, detail=f"Conversion failed: {job.error}")
 
-        return FilePublic(
-            id=converted_file.id,
-            filename=converted_file.filename,
-            s3_key=converted_file.s3_key,
-            file_size=converted_file.file_size,
-            mime_type=converted_file.mime_type,
-            original_format=converted_file.original_format,
-            quill_content=converted_file.quill_content,
-            owner_id=converted_file.owner_id,
-            created_at=converted_file.created_at,
-            updated_at=converted_file.updated_at
-        )
+    converted_file = await get_file_by_id_for_user(
+        session=db,
+        owner_id=current_user.id,
+        file_id=job.result_file_id
+    )
 
-    except Exception as e:
-        # Clean up temp file if it exists
-        if 'temp_path' in locals() and os.path.exists(temp_path):
-            os.remove(temp_path)
-        raise HTTPException(
-            status_code=500, detail=f"Conversion failed: {str(e)}")
+    return FilePublic(
+        id=converted_file.id,
+        filename=converted_file.filename,
+        file_size=converted_file.file_size,
+        mime_type=converted_file.mime_type,
+        original_format=converted_file.original_format,
+        quill_content=converted_file.quill_content,
+        owner_id=converted_file.owner_id,
+        created_at=converted_file.created_at,
+        updated_at=converted_file.updated_at
+    )
 
 
 @router.post("/{file_id}/update-quill-content")
 async def update_quill_content(
     file_id: uuid.UUID,
     current_user: CurrentUser,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     quill_content: str = Form(...)
 ):
     """Update the Quill editor content for a file (for live collaboration)"""
-    file = get_file_by_id_for_user(
-        session=db,
-        owner_id=current_user.id,
-        file_id=file_id
-    )
-
-    if not file:
-        raise HTTPException(status_code=404, detail="File not found")
-
     try:
-        # Update the Quill content in the database
-        updated_file = update_file_for_user(
+        # One UPDATE ... RETURNING (ownership check, write, version bump)
+        # plus the revision, in a single transaction
+        updated_file = await revision_history.save(
             db,
             owner_id=current_user.id,
             file_id=file_id,
-            file_in=FileUpdate(
-                filename=file.filename,
-                mime_type=file.mime_type
-            )
+            file_in=FileUpdate(quill_content=quill_content),
+            author_id=current_user.id
         )
-
-        if not updated_file:
-            raise HTTPException(
-                status_code=500, detail="Failed to update file")
-
-        # Update the quill_content field directly
-        file.quill_content = quill_content
-        db.add(file)
-        db.commit()
-        db.refresh(file)
-
-        return {"message": "Quill content updated successfully", "file_id": str(file_id)}
-
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Update failed: {str(e)}")
 
+    if not updated_file:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    return {"message": "Quill content updated successfully", "file_id": str(file_id)}
+
 
 @router.post("/{file_id}/convert-existing-to-quill")
 async def convert_existing_to_quill(
     file_id: uuid.UUID,
     current_user: CurrentUser,
-    db: Session = Depends(get_db)
+    manager: FileManagerDep,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    wait: bool = True
 ):
-    """Convert an existing file to Quill format (for files uploaded before conversion was available)"""
-    file = get_file_by_id_for_user(
+    """
+    Convert an existing file to Quill format (for files uploaded before
+    conversion was available). With wait=false the job is returned at once.
+    """
+    file = await get_file_by_id_for_user(
         session=db,
         owner_id=current_user.id,
         file_id=file_id
@@ -544,64 +939,54 @@ async def convert_existing_to_quill(
         raise HTTPException(
             status_code=400, detail="No S3 content available for conversion")
 
-    try:
-        # Download the file from S3
-        temp_path = f"/tmp/{uuid.uuid4()}_{file.filename}"
+    job = await create_conversion_job(
+        db, file_id=file_id, owner_id=current_user.id, kind="to_quill")
+    task = conversion_worker.submit(job, manager=manager)
 
-        if not s3_service.download_file(file.s3_key, temp_path):
-            raise HTTPException(
-                status_code=500, detail="Failed to download file from S3")
+    if not wait:
+        response.status_code = 202
+        return _job_public(job)
 
-        try:
-            # Read the file content
-            with open(temp_path, 'rb') as f:
-                content = f.read()
-
-            # Convert based on file type
-            if document_converter and document_converter.is_docx_file(file.filename):
-                # Convert DOCX to HTML
-                html_content, plain_text = document_converter.docx_to_html(
-                    content)
-                quill_content = document_converter.get_quill_content(
-                    html_content)
-                original_format = "docx"
-                print(
-                    f"Converted existing DOCX to HTML: {len(quill_content)} characters")
-
-            elif document_converter and document_converter.is_html_file(file.filename):
-                # Process HTML for Quill
-                quill_content = document_converter.get_quill_content(
-                    content.decode('utf-8'))
-                original_format = "html"
-                print(
-                    f"Processed existing HTML for Quill: {len(quill_content)} characters")
-
-            else:
-                # For other file types, create a basic Quill content
-                quill_content = f"<p>File: {file.filename}</p><p>Size: {file.file_size} bytes</p>"
-                original_format = "other"
-                print(f"Created basic Quill content for {file.filename}")
-
-            # Update the file record with conversion results
-            file.quill_content = quill_content
-            file.original_format = original_format
-
-            db.add(file)
-            db.commit()
-            db.refresh(file)
-
-            return {
-                "message": "File converted to Quill format successfully",
-                "file_id": str(file_id),
-                "original_format": original_format,
-                "quill_content_length": len(quill_content) if quill_content else 0
-            }
+    # Shielded: a client disconnect must not cancel the job itself
+    job = await asyncio.shield(task)
+    if job.status != "succeeded":
+        raise HTTPException(
+            status_code=500, detail=f"Conversion failed: {job.error}")
 
-        finally:
-            # Clean up temp file
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
+    await db.refresh(file)
+    return {
+        "message": "File converted to Quill format successfully",
+        "file_id": str(file_id),
+        "original_format": file.original_format,
+        "quill_content_length": len(file.quill_content) if file.quill_content else 0
+    }
 
-    except Exception as e:
+
+@router.get("/{file_id}/conversion", response_model=ConversionJobPublic)
+async def get_conversion_status(
+    file_id: uuid.UUID,
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the status of the most recent conversion job for a file"""
+    job = await get_latest_conversion_job(
+        db, owner_id=current_user.id, file_id=file_id)
+
+    if not job:
         raise HTTPException(
-            status_code=500, detail=f"Conversion failed: {str(e)}")
+            status_code=404, detail="No conversion found for this file")
+
+    return _job_public(job)
+
+
+def _job_public(job: ConversionJob) -> ConversionJobPublic:
+    return ConversionJobPublic(
+        id=job.id,
+        file_id=job.file_id,
+        kind=job.kind,
+        status=job.status,
+        error=job.error,
+        result_file_id=job.result_file_id,
+        created_at=job.created_at,
+        finished_at=job.finished_at
+    )
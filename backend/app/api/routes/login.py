@@ -9,6 +9,7 @@ from app.core import security
 from app.core.config import settings
 from app.crud import SessionDep
 from app.models import Token
+from app.services.password_hasher import PasswordHasherBusy
 
 router = APIRouter()
 
@@ -20,15 +21,22 @@ async def options_login():
 
 
 @router.post("/login/access-token")
-def login_access_token(
+async def login_access_token(
     session: SessionDep, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
 ) -> Token:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = crud.authenticate(
-        session=session, email=form_data.username, password=form_data.password
-    )
+    try:
+        user = await crud.authenticate(
+            session=session, email=form_data.username, password=form_data.password
+        )
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many sign-ins at once, retry shortly",
+            headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+        )
     if not user:
         raise HTTPException(
             status_code=400, detail="Incorrect email or password")
@@ -0,0 +1,40 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends
+
+from app.api.deps import get_current_active_superuser
+from app.services.filename_autocomplete import filename_autocomplete
+from app.services.object_cache import object_cache
+from app.services.storage_sweeper import storage_sweeper
+from app.services.user_cache import user_cache
+from app.services.websocket_manager import file_connection_manager
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"],
+    dependencies=[Depends(get_current_active_superuser)],
+)
+
+
+@router.get("/caches")
+def get_cache_metrics() -> dict[str, Any]:
+    """
+    Hit/miss/eviction counters of the in-process caches (per worker process).
+    """
+    return {
+        "object_cache": object_cache.stats(),
+        "filename_autocomplete": filename_autocomplete.stats(),
+        "user_cache": user_cache.stats(),
+    }
+
+
+@router.get("/storage")
+def get_storage_metrics() -> dict[str, Any]:
+    """Objects the storage sweeper deleted or failed to delete (per worker process)."""
+    return {"storage_sweeper": storage_sweeper.stats()}
+
+
+@router.get("/websockets")
+def get_websocket_metrics() -> dict[str, Any]:
+    """Connections, queued and dropped messages of the WebSocket fan-out (per worker process)."""
+    return {"file_connections": file_connection_manager.stats()}
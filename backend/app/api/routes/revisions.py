@@ -0,0 +1,151 @@
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api.deps import get_db, CurrentUser
+from app.models import (
+    File as FileModel,
+    FilePublic,
+    FileRevisionContent,
+    FileRevisionPublic,
+    FileRevisionsPublic,
+    FileUpdate,
+)
+from app.crud import (
+    add_blob_reference,
+    enqueue_storage_deletes,
+    get_file_by_id_for_user,
+    get_file_revisions,
+)
+from app.services.blob_store import blob_store
+from app.services.object_cache import object_cache
+from app.services.revision_history import revision_history
+from app.services.storage_sweeper import storage_sweeper
+
+router = APIRouter()
+
+
+async def _get_file_or_404(
+    db: AsyncSession, owner_id: uuid.UUID, file_id: uuid.UUID
+) -> FileModel:
+    file = await get_file_by_id_for_user(
+        session=db, owner_id=owner_id, file_id=file_id)
+    if not file:
+        raise HTTPException(status_code=404, detail="File not found")
+    return file
+
+
+@router.get("/{file_id}/revisions", response_model=FileRevisionsPublic)
+async def list_revisions(
+    file_id: uuid.UUID,
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
+    before: int | None = None,
+    limit: int = Query(default=50, ge=1, le=500)
+):
+    """List a file's revisions, newest first. Pass before=<version> to page."""
+    await _get_file_or_404(db, current_user.id, file_id)
+    revisions = await get_file_revisions(
+        db, file_id=file_id, before=before, limit=limit)
+    return FileRevisionsPublic(data=[
+        FileRevisionPublic(
+            version=revision.version,
+            author_id=revision.author_id,
+            is_snapshot=revision.is_snapshot,
+            size=revision.size,
+            content_sha256=revision.content_sha256,
+            created_at=revision.created_at
+        )
+        for revision in revisions
+    ])
+
+
+@router.get("/{file_id}/revisions/{version}", response_model=FileRevisionContent)
+async def get_revision(
+    file_id: uuid.UUID,
+    version: int,
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the document as it was at a revision"""
+    await _get_file_or_404(db, current_user.id, file_id)
+    rebuilt = await revision_history.rebuild(db, file_id, version)
+    if rebuilt is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+
+    revision, quill_content, content_sha256 = rebuilt
+    return FileRevisionContent(
+        version=revision.version,
+        author_id=revision.author_id,
+        quill_content=quill_content,
+        content_sha256=content_sha256,
+        created_at=revision.created_at
+    )
+
+
+@router.post("/{file_id}/revisions/{version}/restore", response_model=FilePublic)
+async def restore_revision(
+    file_id: uuid.UUID,
+    version: int,
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Restore a file to a revision. The restore is saved as a new revision, so
+    it can be undone like any other change.
+    """
+    file = await _get_file_or_404(db, current_user.id, file_id)
+    rebuilt = await revision_history.rebuild(db, file_id, version)
+    if rebuilt is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+
+    _, quill_content, content_sha256 = rebuilt
+    old_s3_key = file.s3_key
+    old_sha256 = file.content_sha256
+    file_in = FileUpdate(quill_content=quill_content)
+
+    restored_blob = None
+    if content_sha256 and content_sha256 != old_sha256:
+        # The revision's history reference keeps the blob alive until here
+        restored_blob = await add_blob_reference(db, sha256=content_sha256)
+        if restored_blob is None:
+            raise HTTPException(
+                status_code=409, detail="Content of this revision is no longer stored")
+        file_in.s3_key = restored_blob.s3_key
+        file_in.content_sha256 = restored_blob.sha256
+        file_in.file_size = restored_blob.size
+        if old_s3_key and not old_sha256 and old_s3_key != restored_blob.s3_key:
+            # The file's own object goes when the restore commits
+            enqueue_storage_deletes(db, [old_s3_key])
+
+    updated_file = await revision_history.save(
+        db,
+        owner_id=current_user.id,
+        file_id=file_id,
+        file_in=file_in,
+        author_id=current_user.id
+    )
+    if not updated_file:
+        if restored_blob is not None:
+            await blob_store.release(db, content_sha256)
+        raise HTTPException(status_code=404, detail="File not found")
+
+    if restored_blob is not None and old_s3_key:
+        object_cache.invalidate(old_s3_key)
+        if old_sha256:
+            await blob_store.release(db, old_sha256)
+        else:
+            storage_sweeper.wake()
+
+    return FilePublic(
+        id=updated_file.id,
+        filename=updated_file.filename,
+        file_size=updated_file.file_size,
+        mime_type=updated_file.mime_type,
+        original_format=updated_file.original_format,
+        quill_content=updated_file.quill_content,
+        owner_id=updated_file.owner_id,
+        created_at=updated_file.created_at,
+        updated_at=updated_file.updated_at
+    )
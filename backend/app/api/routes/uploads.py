@@ -0,0 +1,280 @@
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api.deps import get_db, CurrentUser, FileManagerDep
+from app.core.config import settings
+from app.models import (
+    FileCreate,
+    FilePublic,
+    UploadSession,
+    UploadSessionCreate,
+    UploadSessionPublic,
+)
+from app.crud import (
+    claim_upload_session,
+    create_upload_session,
+    delete_upload_session,
+    get_upload_parts,
+    get_upload_session_for_user,
+    record_upload_part,
+)
+from app.services.blob_store import blob_store, new_blob_key
+from app.services.file_registry import file_registry
+from app.services.s3_service import async_s3_service
+
+router = APIRouter()
+
+# S3 allows at most 10,000 parts per multipart upload
+MAX_PART_NUMBER = 10000
+
+
+async def _session_public(db: AsyncSession, upload_session: UploadSession) -> UploadSessionPublic:
+    parts = await get_upload_parts(db, session_id=upload_session.id)
+    return UploadSessionPublic(
+        id=upload_session.id,
+        filename=upload_session.filename,
+        mime_type=upload_session.mime_type,
+        part_size=upload_session.part_size,
+        total_size=upload_session.total_size,
+        received_parts=[part.part_number for part in parts],
+        received_bytes=sum(part.size for part in parts),
+        created_at=upload_session.created_at
+    )
+
+
+async def _get_session_or_404(
+    db: AsyncSession, owner_id: uuid.UUID, session_id: uuid.UUID
+) -> UploadSession:
+    upload_session = await get_upload_session_for_user(
+        db, owner_id=owner_id, session_id=session_id)
+    if not upload_session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    # Expired sessions are aborted by the storage sweeper
+    expires_at = upload_session.created_at + timedelta(
+        seconds=settings.UPLOAD_SESSION_TTL_SECONDS)
+    if expires_at <= datetime.utcnow():
+        raise HTTPException(status_code=404, detail="Upload session expired")
+    return upload_session
+
+
+@router.post("/", response_model=UploadSessionPublic)
+async def create_session(
+    session_in: UploadSessionCreate,
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Start a resumable upload; chunks are then PUT as numbered parts. Sessions
+    not completed within UPLOAD_SESSION_TTL_SECONDS are discarded.
+    """
+    part_size = settings.S3_MULTIPART_PART_SIZE
+    if session_in.total_size is not None and \
+            session_in.total_size > part_size * MAX_PART_NUMBER:
+        raise HTTPException(status_code=413, detail="File too large")
+
+    # Assembled under a blob key, so the object is adopted as the blob as-is
+    s3_key = new_blob_key()
+
+    upload_id = await async_s3_service.create_multipart_upload(
+        s3_key, session_in.mime_type)
+    if not upload_id:
+        raise HTTPException(
+            status_code=500, detail="Failed to start upload session")
+
+    upload_session = await create_upload_session(
+        db,
+        owner_id=current_user.id,
+        filename=session_in.filename,
+        mime_type=session_in.mime_type,
+        s3_key=s3_key,
+        upload_id=upload_id,
+        part_size=part_size,
+        total_size=session_in.total_size
+    )
+    return await _session_public(db, upload_session)
+
+
+@router.get("/{session_id}", response_model=UploadSessionPublic)
+async def get_session(
+    session_id: uuid.UUID,
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get an upload session with the part numbers already received"""
+    upload_session = await _get_session_or_404(db, current_user.id, session_id)
+    return await _session_public(db, upload_session)
+
+
+@router.put("/{session_id}/parts/{part_number}")
+async def upload_session_part(
+    session_id: uuid.UUID,
+    part_number: int,
+    request: Request,
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Store one chunk of an upload session. Parts may arrive in any order and
+    from several workers; re-sending a part replaces it.
+    """
+    if not 1 <= part_number <= MAX_PART_NUMBER:
+        raise HTTPException(status_code=400, detail="Invalid part number")
+
+    upload_session = await _get_session_or_404(db, current_user.id, session_id)
+
+    content_length = request.headers.get("content-length")
+    if content_length:
+        try:
+            declared_size = int(content_length)
+        except ValueError:
+            raise HTTPException(
+                status_code=400, detail="Invalid Content-Length header")
+        if declared_size > upload_session.part_size:
+            raise HTTPException(status_code=413, detail="Part too large")
+
+    data = await request.body()
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty part")
+    if len(data) > upload_session.part_size:
+        raise HTTPException(status_code=413, detail="Part too large")
+
+    etag = await async_s3_service.upload_part(
+        upload_session.s3_key,
+        upload_session.upload_id,
+        part_number,
+        data
+    )
+    if not etag:
+        raise HTTPException(status_code=500, detail="Failed to store part")
+
+    await record_upload_part(
+        db,
+        session_id=session_id,
+        part_number=part_number,
+        etag=etag,
+        size=len(data)
+    )
+    return {"part_number": part_number, "size": len(data), "etag": etag}
+
+
+@router.post("/{session_id}/complete", response_model=FilePublic)
+async def complete_session(
+    session_id: uuid.UUID,
+    current_user: CurrentUser,
+    manager: FileManagerDep,
+    db: AsyncSession = Depends(get_db)
+):
+    """Assemble the received parts into the final object and create the file"""
+    upload_session = await _get_session_or_404(db, current_user.id, session_id)
+    parts = await get_upload_parts(db, session_id=session_id)
+
+    part_numbers = [part.part_number for part in parts]
+    if not parts or part_numbers != list(range(1, len(parts) + 1)):
+        missing = sorted(
+            set(range(1, max(part_numbers, default=0) + 1)) - set(part_numbers))
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload incomplete, missing parts: {missing or [1]}")
+
+    # S3 rejects the completion (EntityTooSmall) unless every part but the
+    # last is full-size
+    short_parts = [
+        part.part_number for part in parts[:-1]
+        if part.size != upload_session.part_size
+    ]
+    if short_parts:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Parts {short_parts} are smaller than the part size "
+                   f"({upload_session.part_size} bytes); only the last part may be")
+
+    file_size = sum(part.size for part in parts)
+    if upload_session.total_size is not None and \
+            file_size != upload_session.total_size:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Received {file_size} of {upload_session.total_size} bytes")
+
+    s3_key = upload_session.s3_key
+    mime_type = upload_session.mime_type or "application/octet-stream"
+    # Ends the read transaction before the S3 round trips
+    await db.commit()
+
+    if not await async_s3_service.complete_multipart_upload(
+        s3_key,
+        upload_session.upload_id,
+        [{"PartNumber": part.part_number, "ETag": part.etag} for part in parts]
+    ):
+        # A retried completion finds the upload already assembled
+        head = await async_s3_service.head_object(s3_key)
+        if not head or head["ContentLength"] != file_size:
+            raise HTTPException(
+                status_code=500, detail="Failed to complete upload")
+
+    # Only documents we convert for Quill are kept in memory while hashing
+    convertible = file_registry.original_format(
+        upload_session.filename) is not None
+    document_buffer = bytearray()
+
+    try:
+        # Identical content already stored is referenced instead; the
+        # assembled object is then queued for deletion
+        blob = await blob_store.adopt(
+            db, s3_key, on_chunk=document_buffer.extend if convertible else None)
+
+        # Consuming the session commits with the file, so a session is
+        # completed exactly once (the loser of a race rolls back its blob
+        # reference with it)
+        if not await claim_upload_session(db, session_id=session_id):
+            await db.rollback()
+            raise HTTPException(
+                status_code=404, detail="Upload session not found")
+
+        db_file = await file_registry.register(
+            db,
+            owner_id=current_user.id,
+            file_in=FileCreate(
+                filename=upload_session.filename,
+                s3_key=blob.s3_key,
+                content_sha256=blob.sha256,
+                file_size=blob.size,
+                mime_type=mime_type
+            ),
+            content=bytes(document_buffer) if convertible else None,
+            manager=manager
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=500, detail=f"Failed to complete upload: {str(e)}")
+
+    return FilePublic(
+        id=db_file.id,
+        filename=db_file.filename,
+        file_size=db_file.file_size,
+        mime_type=db_file.mime_type,
+        original_format=db_file.original_format,
+        quill_content=db_file.quill_content,
+        owner_id=db_file.owner_id,
+        created_at=db_file.created_at,
+        updated_at=db_file.updated_at
+    )
+
+
+@router.delete("/{session_id}")
+async def abort_session(
+    session_id: uuid.UUID,
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db)
+):
+    """Abort an upload session and discard the parts stored so far"""
+    upload_session = await _get_session_or_404(db, current_user.id, session_id)
+    await async_s3_service.abort_multipart_upload(
+        upload_session.s3_key, upload_session.upload_id)
+    await delete_upload_session(db, session_id=session_id)
+    return {"message": "Upload session aborted"}
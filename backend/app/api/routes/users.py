@@ -5,7 +5,9 @@ from fastapi import APIRouter, HTTPException
 
 from app import crud
 from app.api.deps import CurrentUser, SessionDep
+from app.core.config import settings
 from app.models import User, UserCreate, UserPublic, UserRegister
+from app.services.password_hasher import PasswordHasherBusy
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -29,39 +31,45 @@ async def options_user_by_id():
 
 
 @router.post("/signup", response_model=UserPublic)
-def register_user(session: SessionDep, user_in: UserRegister) -> Any:
+async def register_user(session: SessionDep, user_in: UserRegister) -> Any:
     """
     Create new user without the need to be logged in.
     """
-    user = crud.get_user_by_email(session=session, email=user_in.email)
+    user = await crud.get_user_by_email(session=session, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system",
         )
     user_create = UserCreate.model_validate(user_in)
-    user = crud.create_user(session=session, user_create=user_create)
+    try:
+        user = await crud.create_user(session=session, user_create=user_create)
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many sign-ups at once, retry shortly",
+            headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+        )
     return user
 
 
 @router.get("/me", response_model=UserPublic)
-def read_users_me(current_user: CurrentUser) -> Any:
+async def read_users_me(current_user: CurrentUser) -> Any:
     return current_user
 
 
 @router.get("/{user_id}", response_model=UserPublic)
-def read_user_by_id(
+async def read_user_by_id(
     user_id: uuid.UUID, session: SessionDep, current_user: CurrentUser
 ) -> Any:
     """
     Get a specific user by id.
     """
-    user = session.get(User, user_id)
-    if user == current_user:
-        return user
+    if user_id == current_user.id:
+        return current_user
     if not current_user.is_superuser:
         raise HTTPException(
             status_code=403,
             detail="The user doesn't have enough privileges",
         )
-    return user
+    return await session.get(User, user_id)
@@ -1,20 +1,40 @@
 import json
+import uuid
+from typing import Any
 
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
 
-from ..deps import FileManagerDep, decode_access_token
-from typing import Any
+from app.core import json_codec
+from app.core.db import async_session
+from app.crud import get_file_by_id_for_user
+from ..deps import CurrentUser, FileManagerDep, decode_access_token, decode_share_token
 
 router = APIRouter()
 
 
+async def _can_join(file_id: str, user_id: str, share_token: str | None) -> bool:
+    """Whether a user may collaborate on a file: owned, or shared with them"""
+    if share_token is not None and decode_share_token(share_token) == file_id:
+        return True
+    try:
+        file_uuid, owner_id = uuid.UUID(file_id), uuid.UUID(user_id)
+    except ValueError:
+        return False
+    # Short-lived session: the socket must not hold a connection while open
+    async with async_session() as db:
+        file = await get_file_by_id_for_user(
+            session=db, owner_id=owner_id, file_id=file_uuid)
+    return file is not None
+
+
 @router.websocket("/ws/{file_id}")
 async def websocket_endpoint(
     websocket: WebSocket, file_id: str, manager: FileManagerDep
 ) -> None:
     """
     WebSocket endpoint for real-time file collaboration.
-    Users can connect to edit files together in real-time.
+    Users can connect to edit files together in real-time: the file's owner,
+    or anyone holding a share token for it (?share_token=...).
     """
     try:
         # Get token from query parameters
@@ -34,17 +54,28 @@ async def websocket_endpoint(
             await websocket.close(code=4001, reason="Invalid authentication token")
             return
 
+        share_token = websocket.query_params.get("share_token")
+        if not await _can_join(file_id, user_id, share_token):
+            await websocket.close(code=4003, reason="No access to this file")
+            return
+
         # Connect user to file
-        await manager.connect_to_file(websocket, file_id, user_id)
+        if not await manager.connect_to_file(websocket, file_id, user_id):
+            return
 
         try:
             # Handle incoming messages
             while True:
                 data = await websocket.receive_text()
-                message = json.loads(data)
+                try:
+                    message = json_codec.loads(data)
+                except json.JSONDecodeError:
+                    # Malformed, or JSON orjson refuses (NaN, integers over
+                    # 64 bits): drop the frame but keep the connection
+                    continue
 
-                # Process the message
-                await manager.handle_file_message(websocket, message)
+                # Process the message (relayed as the text received)
+                await manager.handle_file_message(websocket, message, raw=data)
 
         except WebSocketDisconnect:
             # User disconnected
@@ -52,6 +83,8 @@ async def websocket_endpoint(
 
     except Exception as e:
         print(f"WebSocket error: {e}")
+        # Leave the shared room before closing
+        manager.disconnect_from_file(websocket)
         try:
             await websocket.close(code=1011, reason="Internal server error")
         except Exception:
@@ -59,12 +92,29 @@ async def websocket_endpoint(
 
 
 @router.get("/file/{file_id}/users")
-async def get_file_users(file_id: str, manager: FileManagerDep) -> dict[str, str | list[str]]:
+async def get_file_users(
+    file_id: str,
+    current_user: CurrentUser,
+    manager: FileManagerDep,
+    share_token: str | None = None
+) -> dict[str, str | list[str]]:
+    """The users editing a file; same access rule as joining it"""
+    if not await _can_join(file_id, str(current_user.id), share_token):
+        raise HTTPException(status_code=404, detail="File not found")
     users = manager.get_file_users(file_id)
     return {"file_id": file_id, "users": users}
 
 
 @router.post("/file/{file_id}/broadcast")
-async def broadcast_to_file(file_id: str, message: dict[str, Any], manager: FileManagerDep) -> dict[str, str]:
+async def broadcast_to_file(
+    file_id: str,
+    message: dict[str, Any],
+    current_user: CurrentUser,
+    manager: FileManagerDep,
+    share_token: str | None = None
+) -> dict[str, str]:
+    """Send a message to everyone editing a file; same access rule as joining it"""
+    if not await _can_join(file_id, str(current_user.id), share_token):
+        raise HTTPException(status_code=404, detail="File not found")
     await manager.broadcast_to_file(file_id, message)
     return {"message": "Broadcast sent", "file_id": file_id}
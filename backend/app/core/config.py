@@ -86,6 +86,24 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    @computed_field
+    def SQLALCHEMY_ASYNC_DATABASE_URI(self) -> PostgresDsn:
+        return MultiHostUrl.build(
+            scheme="postgresql+asyncpg",
+            username=self.POSTGRES_USER,
+            password=self.POSTGRES_PASSWORD,
+            host=self.POSTGRES_SERVER,
+            port=self.POSTGRES_PORT,
+            path=self.POSTGRES_DB,
+        )
+
+    # Database connection pool, per engine and worker process
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0  # Seconds to wait for a free connection
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
@@ -98,6 +116,87 @@ class Settings(BaseSettings):
     AWS_SECRET_ACCESS_KEY: str | None = None
     AWS_REGION: str = "eu-north-1"  # Updated to match your .env
     S3_BUCKET_NAME: str = "awsfilecollab"  # Updated to match your .env
+    # HTTP connections to S3, shared by every request (also the number of
+    # threads running blocking boto3 calls for async routes)
+    S3_MAX_POOL_CONNECTIONS: int = 32
+
+    # Streaming uploads: size of each S3 multipart part (S3 minimum is 5MB)
+    # and parts in flight per upload
+    S3_MULTIPART_PART_SIZE: int = 8 * 1024 * 1024  # 8MB
+    S3_MULTIPART_MAX_CONCURRENCY: int = 4
+
+    # Direct-to-S3 uploads through presigned POST forms
+    DIRECT_UPLOAD_MAX_SIZE: int = 5 * 1024 * 1024 * 1024  # 5GB (S3 POST limit)
+    DIRECT_UPLOAD_EXPIRE_SECONDS: int = 3600
+    # Resumable upload sessions not completed within this long are aborted
+    # (and their stored parts discarded) by the storage sweeper
+    UPLOAD_SESSION_TTL_SECONDS: int = 86400
+
+    # Local read-through cache of S3 objects: small objects stay in memory,
+    # larger ones on local disk; entries are revalidated against the ETag
+    # (except immutable blob keys)
+    OBJECT_CACHE_DIR: str | None = None  # Defaults to the system temp dir
+    OBJECT_CACHE_MAX_BYTES: int = 512 * 1024 * 1024  # Disk tier, 512MB
+    OBJECT_CACHE_MEMORY_MAX_BYTES: int = 64 * 1024 * 1024  # Memory tier, 64MB
+    OBJECT_CACHE_MEMORY_ENTRY_MAX_BYTES: int = 256 * 1024  # 256KB
+    OBJECT_CACHE_MAX_ENTRY_BYTES: int = 32 * 1024 * 1024  # Larger objects stream
+    OBJECT_CACHE_REVALIDATE_SECONDS: float = 5.0
+
+    # Filename autocomplete: most suggestions per request, and how long the
+    # suggestions for a prefix are reused within a process
+    AUTOCOMPLETE_MAX_RESULTS: int = 20
+    AUTOCOMPLETE_CACHE_TTL_SECONDS: float = 10.0
+    AUTOCOMPLETE_CACHE_MAX_ENTRIES: int = 10_000
+
+    # Document history: a full snapshot at least every N revisions, deltas
+    # against the previous revision in between
+    REVISION_SNAPSHOT_INTERVAL: int = 50
+
+    # Verified tokens and active users cached per process (None: unbounded)
+    USER_CACHE_TTL_SECONDS: float = 60.0
+    USER_CACHE_MAX_ENTRIES: int | None = 10_000
+
+    # Password hashing: bcrypt cost, worker processes, hashes allowed to wait
+    # for a worker (more are refused with 503) and the Retry-After sent then
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_MAX_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 2
+
+    # Most files one bulk delete request may name
+    BULK_DELETE_MAX_FILES: int = 5000
+
+    # Storage outbox sweeper: deletes per batch (one DeleteObjects request),
+    # polling interval when idle, how long a claimed batch stays hidden from
+    # other sweepers, and the backoff between retries of a failed delete
+    STORAGE_SWEEP_BATCH_SIZE: int = 1000
+    STORAGE_SWEEP_INTERVAL_SECONDS: float = 5.0
+    STORAGE_SWEEP_LEASE_SECONDS: int = 300
+    STORAGE_SWEEP_RETRY_BASE_SECONDS: int = 30
+    STORAGE_SWEEP_RETRY_MAX_SECONDS: int = 3600
+    # Objects still being uploaded are deleted if no row references them
+    # after this long
+    STORAGE_UPLOAD_GRACE_SECONDS: int = 86400
+
+    # WebSocket fan-out: messages queued per connection, what happens when a
+    # client falls that far behind ("drop_oldest" drops its oldest cursor
+    # updates, "disconnect" closes it), and how long one send may take
+    WS_SEND_QUEUE_SIZE: int = 256
+    WS_FULL_QUEUE_POLICY: Literal["drop_oldest", "disconnect"] = "drop_oldest"
+    WS_SEND_TIMEOUT_SECONDS: float = 10.0
+    # Cursor batches per second in rooms of up to WS_CURSOR_FULL_RATE_USERS
+    # connections; larger rooms get proportionally fewer, down to the minimum
+    WS_CURSOR_TICK_HZ: float = 20.0
+    WS_CURSOR_MIN_TICK_HZ: float = 5.0
+    WS_CURSOR_FULL_RATE_USERS: int = 10
+    # JSON encoder of WebSocket frames: "auto" uses orjson when installed
+    WS_JSON_ENCODER: Literal["auto", "orjson", "json"] = "auto"
+
+    # Worker processes for DOCX/HTML conversions, and how long a job stays
+    # leased to its app process without a renewal before other processes
+    # mark it failed (renewed every third of that)
+    CONVERSION_MAX_WORKERS: int = 2
+    CONVERSION_LEASE_SECONDS: int = 60
 
     def _check_default_secret(self, var_name: str, value: str | None) -> None:
         if value == "changethis":
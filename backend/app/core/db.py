@@ -1,5 +1,24 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlmodel import create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core.config import settings
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+_pool_options = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+}
+
+# Sync engine for scripts and migrations
+engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI), **_pool_options)
+
+# Async engine used by the API
+async_engine = create_async_engine(
+    str(settings.SQLALCHEMY_ASYNC_DATABASE_URI), **_pool_options)
+
+# Objects stay usable after commit: attribute access must never lazy-load
+async_session = async_sessionmaker(
+    async_engine, class_=AsyncSession, expire_on_commit=False)
@@ -0,0 +1,43 @@
+"""JSON encoding of WebSocket frames, with orjson when it is installed"""
+
+import json
+from typing import Any, Callable
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_dumps(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def _orjson_dumps(obj: Any) -> str:
+    try:
+        return orjson.dumps(obj).decode()
+    except TypeError:
+        # Beyond orjson (e.g. integers over 64 bits from a client message)
+        return _json_dumps(obj)
+
+
+def get_encoder(name: str) -> Callable[[Any], str]:
+    """
+    Encoder for ``name``: "orjson", "json" (the standard library), or "auto"
+    for orjson when available and the standard library otherwise.
+    """
+    if name == "json" or (name == "auto" and orjson is None):
+        return _json_dumps
+    if orjson is None:
+        raise RuntimeError("orjson is not installed")
+    return _orjson_dumps
+
+
+def loads(data: str | bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+# Encoder used for every frame sent to WebSocket clients
+dumps = get_encoder(settings.WS_JSON_ENCODER)
@@ -5,10 +5,20 @@ from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes with any other cost are upgraded on the next successful login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 
 
 ALGORITHM = "HS256"
+# "type" claim of upload tokens; access tokens carry no type and every path
+# that accepts them rejects typed tokens
+UPLOAD_TOKEN_TYPE = "upload"
 
 
 def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
@@ -30,9 +40,34 @@ def create_share_token(file_id: str, expires_delta: timedelta) -> str:
     return cast(str, jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM))
 
 
+def create_upload_token(
+    user_id: str, upload: dict[str, Any], expires_delta: timedelta
+) -> str:
+    """Create a token describing a direct-to-S3 upload issued to a user.
+
+    The client hands it back on completion, so the declared key, name, type
+    and size cannot be altered between presigning and recording the file.
+    Its "type" claim keeps it from being used as an access token.
+    """
+    expire = datetime.now(timezone.utc) + expires_delta
+    to_encode = {
+        "exp": expire, "sub": user_id, "type": UPLOAD_TOKEN_TYPE, "upload": upload}
+    return cast(str, jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM))
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return cast(bool, pwd_context.verify(plain_password, hashed_password))
 
 
 def get_password_hash(password: str) -> str:
     return cast(str, pwd_context.hash(password))
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """Verify a password; also return a new hash if the stored one is outdated."""
+    return cast(
+        tuple[bool, str | None],
+        pwd_context.verify_and_update(plain_password, hashed_password),
+    )
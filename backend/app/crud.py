@@ -1,52 +1,102 @@
 import uuid
-from typing import Annotated, Any
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Annotated, Any, cast
 
 from fastapi import Depends
-from sqlmodel import Session, select
+from sqlalchemy import (
+    Integer,
+    String,
+    and_,
+    column,
+    func,
+    literal,
+    literal_column,
+    text,
+    tuple_,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import delete, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.api.deps import get_db
-from app.core.security import get_password_hash, verify_password
-from app.models import FileCreate, FileUpdate, File, User, UserCreate
+from app.models import (
+    QUILL_TEXT_SQL,
+    SEARCH_CONFIG,
+    Blob,
+    ConversionJob,
+    FileCreate,
+    FileRevision,
+    FileUpdate,
+    File,
+    StorageOutbox,
+    UploadSession,
+    UploadSessionPart,
+    User,
+    UserCreate,
+)
+from app.services.password_hasher import password_hasher
 from app.services.s3_service import s3_service
+from app.services.user_cache import user_cache
 
-SessionDep = Annotated[Session, Depends(get_db)]
+SessionDep = Annotated[AsyncSession, Depends(get_db)]
 
 
 # User CRUD helpers
-def get_user_by_email(session: Session, email: str) -> User | None:
-    return session.exec(select(User).where(User.email == email)).first()
+async def get_user_by_email(session: AsyncSession, email: str) -> User | None:
+    return (await session.exec(select(User).where(User.email == email))).first()
 
 
-def create_user(session: Session, user_create: UserCreate) -> User:
+async def create_user(session: AsyncSession, user_create: UserCreate) -> User:
     user = User(
         email=user_create.email,
-        hashed_password=get_password_hash(user_create.password),
+        hashed_password=await password_hasher.hash(user_create.password),
         full_name=user_create.full_name,
         is_active=True,
         is_superuser=getattr(user_create, "is_superuser", False),
     )
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
     return user
 
 
-def authenticate(session: Session, email: str, password: str) -> User | None:
-    user = get_user_by_email(session, email=email)
+async def authenticate(session: AsyncSession, email: str, password: str) -> User | None:
+    user = await get_user_by_email(session, email=email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await password_hasher.verify_and_update(
+        password, user.hashed_password)
+    if not valid:
         return None
+    if new_hash:
+        # Stored with outdated hash settings: upgrade it transparently
+        user.hashed_password = new_hash
+        session.add(user)
+        await session.commit()
+        user_cache.invalidate(user.id)
     return user
 
 
 # File CRUD helpers (File model)
-def create_file_for_user(
-    session: Session, *, owner_id: uuid.UUID, file_in: FileCreate
+async def create_file_for_user(
+    session: AsyncSession, *, owner_id: uuid.UUID, file_in: FileCreate
 ) -> File:
+    file = add_file_for_user(session, owner_id=owner_id, file_in=file_in)
+    await session.commit()
+    await session.refresh(file)
+    return file
+
+
+def add_file_for_user(
+    session: AsyncSession, *, owner_id: uuid.UUID, file_in: FileCreate
+) -> File:
+    """Stage a file in the session's transaction; the caller commits."""
     file = File(
         filename=file_in.filename,
         s3_key=file_in.s3_key,
+        content_sha256=file_in.content_sha256,
         file_size=file_in.file_size,
         mime_type=file_in.mime_type,
         original_format=file_in.original_format,
@@ -54,57 +104,666 @@ def create_file_for_user(
         owner_id=owner_id
     )
     session.add(file)
-    session.commit()
-    session.refresh(file)
     return file
 
 
-def get_files_for_user(
-    session: Session, *, owner_id: uuid.UUID, skip: int = 0, limit: int = 100
-) -> list[File]:
-    statement = select(File).where(
-        File.owner_id == owner_id).offset(skip).limit(limit)
-    return list(session.exec(statement).all())
+FILE_SORT_COLUMNS = {"updated_at": File.updated_at, "filename": File.filename}
+
+# Everything a file list shows; quill_content is only tested for presence
+FILE_SUMMARY_COLUMNS = (
+    File.id,
+    File.filename,
+    File.file_size,
+    File.mime_type,
+    File.original_format,
+    File.owner_id,
+    File.created_at,
+    File.updated_at,
+    File.version,
+    File.quill_content.is_not(None).label("has_quill_content"),  # type: ignore[union-attr]
+)
+
+
+async def get_files_for_user(
+    session: AsyncSession,
+    *,
+    owner_id: uuid.UUID,
+    sort: str = "updated_at",
+    descending: bool = True,
+    after: tuple[Any, uuid.UUID] | None = None,
+    limit: int = 100,
+    include_content: bool = False,
+) -> list[Any]:
+    """
+    Keyset-paginated files of a user, ordered by (sort column, id).
+
+    ``after`` is the (sort value, id) of the last file of the previous page;
+    the (owner_id, <sort column>, id) indexes serve every page in one seek.
+    Unless ``include_content`` is set, only FILE_SUMMARY_COLUMNS are selected
+    so document bodies never leave the database.
+    """
+    column = FILE_SORT_COLUMNS[sort]
+    entities = (File,) if include_content else FILE_SUMMARY_COLUMNS
+    statement = select(*entities).where(File.owner_id == owner_id)
+    if after is not None:
+        key = tuple_(column, File.id)
+        bound = tuple_(literal(after[0]), literal(after[1]))
+        statement = statement.where(key < bound if descending else key > bound)
+    if descending:
+        statement = statement.order_by(column.desc(), File.id.desc())  # type: ignore[attr-defined]
+    else:
+        statement = statement.order_by(column, File.id)
+    return list((await session.exec(statement.limit(limit))).all())
+
+
+async def search_files_for_user(
+    session: AsyncSession, *, owner_id: uuid.UUID, query: str, limit: int = 20
+) -> list[Any]:
+    """
+    Full-text search over a user's documents through the file.search_vector
+    GIN index. Rows carry FILE_SUMMARY_COLUMNS plus ``rank`` and a
+    highlighted ``snippet``, best match first.
+    """
+    config = literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+    ts_query = func.websearch_to_tsquery(config, query)
+    search_vector = column("search_vector")  # Not mapped on File
+    rank = func.ts_rank_cd(search_vector, ts_query)
+    snippet = func.ts_headline(
+        config,
+        text(QUILL_TEXT_SQL),
+        ts_query,
+        literal("StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=25"),
+    )
+    statement = (
+        select(*FILE_SUMMARY_COLUMNS, rank.label("rank"), snippet.label("snippet"))
+        .where(File.owner_id == owner_id, search_vector.op("@@")(ts_query))
+        .order_by(rank.desc(), File.id)
+        .limit(limit)
+    )
+    return list((await session.exec(statement)).all())  # type: ignore[call-overload]
 
 
-def get_file_by_id_for_user(
-    session: Session, *, owner_id: uuid.UUID, file_id: uuid.UUID
+# Shortest fragment matched anywhere in a filename; shorter ones have no
+# trigram to look up and only match at the start
+FILENAME_SUBSTRING_MIN_CHARS = 3
+
+
+async def suggest_filenames_for_user(
+    session: AsyncSession, *, owner_id: uuid.UUID, prefix: str, limit: int = 10
+) -> list[Any]:
+    """
+    Files whose name contains ``prefix`` (case-insensitive), names starting
+    with it first, then shortest. The substring match is served by the
+    ix_file_owner_id_filename_trgm trigram index; fragments shorter than a
+    trigram only match names starting with them, through
+    ix_file_owner_id_lower_filename.
+    """
+    fragment = prefix.lower()
+    escaped = fragment.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    statement = select(File.id, File.filename, File.mime_type)
+    if len(fragment) < FILENAME_SUBSTRING_MIN_CHARS:
+        statement = statement.where(
+            File.owner_id == owner_id,
+            func.lower(File.filename).like(f"{escaped}%", escape="\\"),
+        ).order_by(func.length(File.filename), File.filename)
+    else:
+        starts_with = File.filename.ilike(f"{escaped}%", escape="\\")  # type: ignore[attr-defined]
+        statement = statement.where(
+            File.owner_id == owner_id,
+            File.filename.ilike(f"%{escaped}%", escape="\\"),  # type: ignore[attr-defined]
+        ).order_by(starts_with.desc(), func.length(File.filename), File.filename)
+    return list((await session.exec(statement.limit(limit))).all())  # type: ignore[call-overload]
+
+
+async def get_file_by_id_for_user(
+    session: AsyncSession, *, owner_id: uuid.UUID, file_id: uuid.UUID
 ) -> File | None:
     statement = select(File).where(
         File.owner_id == owner_id, File.id == file_id)
-    return session.exec(statement).first()
+    return (await session.exec(statement)).first()
+
+
+async def get_file_by_s3_key_for_user(
+    session: AsyncSession, *, owner_id: uuid.UUID, s3_key: str
+) -> File | None:
+    statement = select(File).where(
+        File.owner_id == owner_id, File.s3_key == s3_key)
+    return (await session.exec(statement)).first()
 
 
-def get_file_by_id(session: Session, *, file_id: uuid.UUID) -> File | None:
+async def get_file_by_id(session: AsyncSession, *, file_id: uuid.UUID) -> File | None:
     """Fetch a file by id without checking ownership (use only after access checks)."""
-    return session.get(File, file_id)
+    return await session.get(File, file_id)
 
 
-def update_file_for_user(
-    session: Session, *, owner_id: uuid.UUID, file_id: uuid.UUID, file_in: FileUpdate
-) -> File | None:
-    file = get_file_by_id_for_user(session, owner_id=owner_id, file_id=file_id)
-    if not file:
-        return None
-    update_data: dict[str, Any] = {}
-    if file_in.filename is not None:
-        update_data["filename"] = file_in.filename
-    if file_in.mime_type is not None:
-        update_data["mime_type"] = file_in.mime_type
-    for key, value in update_data.items():
-        setattr(file, key, value)
-    session.add(file)
-    session.commit()
-    session.refresh(file)
-    return file
+async def update_file_for_revision(
+    session: AsyncSession, *, owner_id: uuid.UUID, file_id: uuid.UUID, file_in: FileUpdate
+) -> Any | None:
+    """
+    Apply the fields set in ``file_in`` with a single UPDATE ... RETURNING,
+    bumping updated_at and the version. Does not commit, so the caller can
+    record the revision first.
+
+    The row has the updated file's metadata (not its quill_content, which
+    the caller already has) and what recording the revision needs, read
+    under a row lock in the same statement: ``previous_quill_content``,
+    ``previous_sha256``, and the ``base_chain_length``/``base_chain_bytes``
+    of the revision the file was at (NULL when it is not in the history).
+    None if the user has no such file.
+    """
+    previous = (
+        select(
+            File.id,
+            File.quill_content.label("previous_quill_content"),  # type: ignore[union-attr]
+            File.content_sha256.label("previous_sha256"),  # type: ignore[union-attr]
+            FileRevision.chain_length.label("base_chain_length"),  # type: ignore[attr-defined]
+            FileRevision.chain_bytes.label("base_chain_bytes"),  # type: ignore[attr-defined]
+        )
+        .outerjoin(FileRevision, and_(
+            FileRevision.file_id == File.id,
+            FileRevision.version == File.version,
+        ))
+        .where(File.id == file_id, File.owner_id == owner_id)
+        .with_for_update(of=File)
+        .cte("previous")
+    )
+    statement = (
+        update(File)
+        .where(File.id == previous.c.id)  # type: ignore[arg-type]
+        .values(
+            **file_in.model_dump(exclude_none=True),
+            updated_at=datetime.utcnow(),
+            version=File.version + 1,
+        )
+        .returning(
+            File.id,
+            File.filename,
+            File.file_size,
+            File.mime_type,
+            File.original_format,
+            File.owner_id,
+            File.created_at,
+            File.updated_at,
+            File.version,
+            File.content_sha256,
+            previous.c.previous_quill_content,
+            previous.c.previous_sha256,
+            previous.c.base_chain_length,
+            previous.c.base_chain_bytes,
+        )
+    )
+    return (await session.exec(statement)).first()  # type: ignore[call-overload]
+
+
+def mark_file_modified(file: File) -> None:
+    """
+    Bump updated_at and the version so cached copies stop validating. The
+    version is incremented by the UPDATE itself, so concurrent writers never
+    produce the same one; file.version is expired until the row is refreshed.
+    """
+    file.updated_at = datetime.utcnow()
+    file.version = File.version + 1  # type: ignore[assignment]
+
+
+async def delete_files_for_user(
+    session: AsyncSession, *, owner_id: uuid.UUID, file_ids: list[uuid.UUID]
+) -> list[Any]:
+    """
+    Delete the user's files among ``file_ids`` with one statement, in one
+    transaction with dropping the blob references of the files and their
+    revisions and queueing the objects left unreferenced for deletion.
+
+    Returns (id, s3_key, content_sha256) of each deleted file; ids the user
+    does not own are left alone and missing from the result.
+    """
+    # Revisions are written with their file's row locked, so once the rows
+    # are locked here no revision can be added before the delete. Locked in
+    # id order so concurrent bulk deletes cannot deadlock.
+    lock = select(File.id).where(
+        File.owner_id == owner_id, File.id.in_(file_ids)  # type: ignore[attr-defined]
+    ).order_by(File.id).with_for_update()
+    await session.exec(lock)
+    # Read before the delete cascades to the revisions
+    digests = await get_file_revision_digests(
+        session, file_ids=file_ids, owner_id=owner_id)
+    statement = delete(File).where(
+        File.owner_id == owner_id, File.id.in_(file_ids)  # type: ignore[attr-defined]
+    ).returning(File.id, File.s3_key, File.content_sha256)
+    rows = list((await session.exec(statement)).all())  # type: ignore[call-overload]
+
+    legacy_keys = []
+    for row in rows:
+        if row.content_sha256:
+            digests.append(row.content_sha256)
+        elif row.s3_key:
+            # Not deduplicated: the object belongs to this file alone
+            legacy_keys.append(row.s3_key)
+    await release_blobs(session, counts=dict(Counter(digests)))
+    enqueue_storage_deletes(session, legacy_keys)
+    await session.commit()
+    return rows
+
+
+# Blob CRUD helpers (content-addressed, reference-counted S3 objects)
+async def get_blob(session: AsyncSession, *, sha256: str) -> Blob | None:
+    return await session.get(Blob, sha256)
+
+
+async def acquire_blob(
+    session: AsyncSession, *, sha256: str, s3_key: str, size: int, commit: bool = True
+) -> Blob:
+    """
+    Register a newly stored object, or take a reference on the blob another
+    upload registered first. The returned blob's s3_key is authoritative.
+    With ``commit=False`` the reference joins the caller's transaction.
+    """
+    statement = insert(Blob).values(
+        sha256=sha256, s3_key=s3_key, size=size, ref_count=1,
+        created_at=datetime.utcnow()
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=["sha256"],
+        set_={"ref_count": Blob.ref_count + 1},
+    ).returning(Blob).execution_options(populate_existing=True)
+    blob = (await session.exec(statement)).scalar_one()  # type: ignore[call-overload]
+    # The object is referenced now (or redundant, if a concurrent upload
+    # registered the same content first)
+    await cancel_storage_deletes(session, s3_key=s3_key)
+    if blob.s3_key != s3_key:
+        enqueue_storage_deletes(session, [s3_key])
+    if commit:
+        await session.commit()
+    return cast(Blob, blob)
+
+
+async def add_blob_reference(session: AsyncSession, *, sha256: str) -> Blob | None:
+    """Take another reference on an existing blob; None if it is gone."""
+    statement = (
+        update(Blob)
+        .where(Blob.sha256 == sha256)  # type: ignore[arg-type]
+        .values(ref_count=Blob.ref_count + 1)
+        .returning(Blob)
+        .execution_options(populate_existing=True)
+    )
+    blob = (await session.exec(statement)).scalar_one_or_none()  # type: ignore[call-overload]
+    await session.commit()
+    return cast(Blob | None, blob)
+
+
+async def release_blob(session: AsyncSession, *, sha256: str) -> str | None:
+    """
+    Drop a reference on a blob. Once the last reference is gone the blob is
+    deleted and its S3 object queued for deletion; returns its key then,
+    otherwise None.
+    """
+    statement = (
+        update(Blob)
+        .where(Blob.sha256 == sha256)  # type: ignore[arg-type]
+        .values(ref_count=Blob.ref_count - 1)
+        .returning(Blob.ref_count, Blob.s3_key)
+    )
+    row = (await session.exec(statement)).first()  # type: ignore[call-overload]
+    s3_key = None
+    if row is not None and row.ref_count <= 0:
+        # Only delete if nobody took a new reference in the meantime
+        result = await session.exec(  # type: ignore[call-overload]
+            delete(Blob).where(
+                Blob.sha256 == sha256, Blob.ref_count <= 0)  # type: ignore[arg-type]
+        )
+        if result.rowcount:
+            s3_key = row.s3_key
+            enqueue_storage_deletes(session, [s3_key])
+    await session.commit()
+    return s3_key
+
+
+async def release_blobs(session: AsyncSession, *, counts: dict[str, int]) -> list[str]:
+    """
+    Drop ``counts[sha256]`` references on each blob with one UPDATE, then
+    delete the blobs left unreferenced and queue their S3 objects for
+    deletion. Returns their keys. Does not commit.
+    """
+    if not counts:
+        return []
+    released = values(
+        column("sha256", String), column("count", Integer), name="released"
+    ).data(list(counts.items()))
+    await session.exec(  # type: ignore[call-overload]
+        update(Blob)
+        .where(Blob.sha256 == released.c.sha256)  # type: ignore[arg-type]
+        .values(ref_count=Blob.ref_count - released.c.count)
+    )
+    result = await session.exec(  # type: ignore[call-overload]
+        delete(Blob)
+        .where(Blob.sha256.in_(list(counts)), Blob.ref_count <= 0)  # type: ignore[attr-defined]
+        .returning(Blob.s3_key)
+    )
+    s3_keys = list(result.scalars().all())
+    enqueue_storage_deletes(session, s3_keys)
+    return s3_keys
+
 
+# Storage outbox CRUD helpers (S3 deletes recorded with the DB change)
+def enqueue_storage_deletes(
+    session: AsyncSession, s3_keys: list[str], *, not_before: datetime | None = None
+) -> None:
+    """
+    Queue S3 objects for deletion in the session's transaction, so they are
+    deleted exactly when the change making them unreferenced commits. Does
+    not commit.
+    """
+    not_before = not_before or datetime.utcnow()
+    session.add_all(
+        StorageOutbox(s3_key=s3_key, not_before=not_before) for s3_key in s3_keys)
 
-def delete_file_for_user(
-    session: Session, *, owner_id: uuid.UUID, file_id: uuid.UUID
-) -> bool:
-    file = get_file_by_id_for_user(session, owner_id=owner_id, file_id=file_id)
-    if not file:
-        return False
-    session.delete(file)
-    session.commit()
-    return True
+
+async def cancel_storage_deletes(session: AsyncSession, *, s3_key: str) -> None:
+    """Drop the queued deletes of an object a row now references. Does not commit."""
+    await session.exec(  # type: ignore[call-overload]
+        delete(StorageOutbox).where(StorageOutbox.s3_key == s3_key)  # type: ignore[arg-type]
+    )
+
+
+async def claim_storage_deletes(
+    session: AsyncSession, *, limit: int, lease: timedelta
+) -> list[Any]:
+    """
+    Claim up to ``limit`` due deletes by pushing them back by ``lease``, so
+    other sweepers skip them and a sweeper dying mid-batch only delays them.
+    Returns (id, s3_key, attempts) rows.
+    """
+    now = datetime.utcnow()
+    due = (
+        select(StorageOutbox.id)
+        .where(StorageOutbox.not_before <= now)
+        .order_by(StorageOutbox.not_before)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    statement = (
+        update(StorageOutbox)
+        .where(StorageOutbox.id.in_(due))  # type: ignore[attr-defined]
+        .values(not_before=now + lease, attempts=StorageOutbox.attempts + 1)
+        .returning(StorageOutbox.id, StorageOutbox.s3_key, StorageOutbox.attempts)
+    )
+    rows = list((await session.exec(statement)).all())  # type: ignore[call-overload]
+    await session.commit()
+    return rows
+
+
+async def finish_storage_deletes(
+    session: AsyncSession,
+    *,
+    deleted: list[uuid.UUID],
+    failed: dict[uuid.UUID, tuple[str, datetime]],
+) -> None:
+    """Remove the rows of deleted objects; record the error and retry time of failed ones."""
+    if deleted:
+        await session.exec(  # type: ignore[call-overload]
+            delete(StorageOutbox).where(StorageOutbox.id.in_(deleted))  # type: ignore[attr-defined]
+        )
+    for outbox_id, (error, retry_at) in failed.items():
+        await session.exec(  # type: ignore[call-overload]
+            update(StorageOutbox)
+            .where(StorageOutbox.id == outbox_id)  # type: ignore[arg-type]
+            .values(last_error=error, not_before=retry_at)
+        )
+    await session.commit()
+
+
+# Upload session CRUD helpers (resumable chunked uploads)
+async def create_upload_session(
+    session: AsyncSession,
+    *,
+    owner_id: uuid.UUID,
+    filename: str,
+    mime_type: str | None,
+    s3_key: str,
+    upload_id: str,
+    part_size: int,
+    total_size: int | None = None,
+) -> UploadSession:
+    upload_session = UploadSession(
+        owner_id=owner_id,
+        filename=filename,
+        mime_type=mime_type,
+        s3_key=s3_key,
+        upload_id=upload_id,
+        part_size=part_size,
+        total_size=total_size,
+    )
+    session.add(upload_session)
+    await session.commit()
+    await session.refresh(upload_session)
+    return upload_session
+
+
+async def get_upload_session_for_user(
+    session: AsyncSession, *, owner_id: uuid.UUID, session_id: uuid.UUID
+) -> UploadSession | None:
+    statement = select(UploadSession).where(
+        UploadSession.owner_id == owner_id, UploadSession.id == session_id)
+    return (await session.exec(statement)).first()
+
+
+async def record_upload_part(
+    session: AsyncSession,
+    *,
+    session_id: uuid.UUID,
+    part_number: int,
+    etag: str,
+    size: int,
+) -> None:
+    """Upsert a received part so retried and parallel PUTs are idempotent."""
+    statement = insert(UploadSessionPart).values(
+        session_id=session_id, part_number=part_number, etag=etag, size=size
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=["session_id", "part_number"],
+        set_={"etag": statement.excluded.etag,
+              "size": statement.excluded.size},
+    )
+    await session.exec(statement)  # type: ignore[call-overload]
+    await session.commit()
+
+
+async def get_upload_parts(
+    session: AsyncSession, *, session_id: uuid.UUID
+) -> list[UploadSessionPart]:
+    statement = select(UploadSessionPart).where(
+        UploadSessionPart.session_id == session_id
+    ).order_by(UploadSessionPart.part_number)
+    return list((await session.exec(statement)).all())
+
+
+async def delete_upload_session(session: AsyncSession, *, session_id: uuid.UUID) -> None:
+    upload_session = await session.get(UploadSession, session_id)
+    if upload_session:
+        await session.delete(upload_session)
+        await session.commit()
+
+
+async def claim_upload_session(session: AsyncSession, *, session_id: uuid.UUID) -> bool:
+    """
+    Delete an upload session in the caller's transaction. False if it is
+    already gone (completed or aborted concurrently), so only one caller
+    ever finishes a session.
+    """
+    statement = (
+        delete(UploadSession)
+        .where(UploadSession.id == session_id)  # type: ignore[arg-type]
+        .returning(UploadSession.id)  # type: ignore[arg-type]
+    )
+    return (await session.exec(statement)).first() is not None  # type: ignore[call-overload]
+
+
+async def lock_expired_upload_sessions(
+    session: AsyncSession, *, created_before: datetime, limit: int
+) -> list[UploadSession]:
+    """
+    Lock up to ``limit`` sessions started before ``created_before``; locked
+    rows are skipped, so concurrent sweepers never abort the same upload.
+    Delete them in the same transaction once their S3 upload is aborted.
+    """
+    statement = (
+        select(UploadSession)
+        .where(UploadSession.created_at < created_before)
+        .order_by(UploadSession.created_at)  # type: ignore[arg-type]
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return list((await session.exec(statement)).all())
+
+
+# Conversion job CRUD helpers
+async def create_conversion_job(
+    session: AsyncSession, *, file_id: uuid.UUID, owner_id: uuid.UUID, kind: str
+) -> ConversionJob:
+    job = add_conversion_job(
+        session, file_id=file_id, owner_id=owner_id, kind=kind)
+    await session.commit()
+    await session.refresh(job)
+    return job
+
+
+def add_conversion_job(
+    session: AsyncSession, *, file_id: uuid.UUID, owner_id: uuid.UUID, kind: str
+) -> ConversionJob:
+    """Stage a job in the session's transaction; the caller commits."""
+    job = ConversionJob(file_id=file_id, owner_id=owner_id, kind=kind)
+    session.add(job)
+    return job
+
+
+async def get_latest_conversion_job(
+    session: AsyncSession, *, owner_id: uuid.UUID, file_id: uuid.UUID
+) -> ConversionJob | None:
+    statement = select(ConversionJob).where(
+        ConversionJob.owner_id == owner_id, ConversionJob.file_id == file_id
+    ).order_by(ConversionJob.created_at.desc())  # type: ignore[attr-defined]
+    return (await session.exec(statement)).first()
+
+
+async def update_conversion_job(
+    session: AsyncSession, job: ConversionJob, **values: Any
+) -> ConversionJob:
+    for key, value in values.items():
+        setattr(job, key, value)
+    session.add(job)
+    await session.commit()
+    await session.refresh(job)
+    return job
+
+
+async def renew_conversion_job_leases(
+    session: AsyncSession, *, worker_id: str, job_ids: list[uuid.UUID], lease: timedelta
+) -> None:
+    """Take or extend the lease of a worker's unfinished jobs."""
+    if not job_ids:
+        return
+    await session.exec(  # type: ignore[call-overload]
+        update(ConversionJob)
+        .where(
+            ConversionJob.id.in_(job_ids),  # type: ignore[attr-defined]
+            ConversionJob.status.in_(("pending", "running")),  # type: ignore[attr-defined]
+        )
+        .values(worker_id=worker_id, lease_expires_at=datetime.utcnow() + lease)
+    )
+    await session.commit()
+
+
+async def fail_expired_conversion_jobs(
+    session: AsyncSession, *, lease: timedelta, error: str
+) -> int:
+    """
+    Mark pending or running jobs whose lease ran out as failed; returns how
+    many there were. A job not leased yet counts from its creation.
+    """
+    now = datetime.utcnow()
+    statement = (
+        update(ConversionJob)
+        .where(
+            ConversionJob.status.in_(("pending", "running")),  # type: ignore[attr-defined]
+            func.coalesce(
+                ConversionJob.lease_expires_at, ConversionJob.created_at + lease
+            ) < now,
+        )
+        .values(status="failed", error=error, finished_at=now)
+    )
+    result = await session.exec(statement)  # type: ignore[call-overload]
+    await session.commit()
+    return result.rowcount
+
+
+# File revision CRUD helpers (document history)
+async def add_file_revision(session: AsyncSession, revision: FileRevision) -> None:
+    """
+    Add a revision, taking a blob reference for its content_sha256.
+    Does not commit: the revision belongs to the caller's transaction.
+    """
+    session.add(revision)
+    if revision.content_sha256:
+        await session.exec(  # type: ignore[call-overload]
+            update(Blob)
+            .where(Blob.sha256 == revision.content_sha256)  # type: ignore[arg-type]
+            .values(ref_count=Blob.ref_count + 1)
+        )
+
+
+async def get_file_revisions(
+    session: AsyncSession, *, file_id: uuid.UUID, before: int | None = None, limit: int = 50
+) -> list[Any]:
+    """Revision metadata, newest first; ``before`` is a version to page from."""
+    statement = select(
+        FileRevision.version,
+        FileRevision.author_id,
+        FileRevision.snapshot.is_not(None).label("is_snapshot"),  # type: ignore[union-attr]
+        func.coalesce(
+            func.length(FileRevision.snapshot), func.length(FileRevision.delta), 0
+        ).label("size"),
+        FileRevision.content_sha256,
+        FileRevision.created_at,
+    ).where(FileRevision.file_id == file_id)
+    if before is not None:
+        statement = statement.where(FileRevision.version < before)
+    statement = statement.order_by(
+        FileRevision.version.desc()).limit(limit)  # type: ignore[attr-defined]
+    return list((await session.exec(statement)).all())  # type: ignore[call-overload]
+
+
+async def get_file_revision_chain(
+    session: AsyncSession, *, file_id: uuid.UUID, version: int
+) -> list[FileRevision]:
+    """
+    The revisions needed to rebuild ``version``: the nearest snapshot at or
+    before it followed by every delta up to it, oldest first. Empty if the
+    version is not in the history.
+    """
+    base = select(func.max(FileRevision.version)).where(
+        FileRevision.file_id == file_id,
+        FileRevision.version <= version,
+        FileRevision.snapshot.is_not(None),  # type: ignore[union-attr]
+    ).scalar_subquery()
+    statement = select(FileRevision).where(
+        FileRevision.file_id == file_id,
+        FileRevision.version >= base,
+        FileRevision.version <= version,
+    ).order_by(FileRevision.version)
+    chain = list((await session.exec(statement)).all())
+    if not chain or chain[-1].version != version:
+        return []
+    return chain
+
+
+async def get_file_revision_digests(
+    session: AsyncSession, *, file_ids: list[uuid.UUID], owner_id: uuid.UUID
+) -> list[str]:
+    """Blob digests referenced by the user's files' revisions, one per reference."""
+    statement = select(FileRevision.content_sha256).join(
+        File, File.id == FileRevision.file_id  # type: ignore[arg-type]
+    ).where(
+        File.owner_id == owner_id,
+        FileRevision.file_id.in_(file_ids),  # type: ignore[attr-defined]
+        FileRevision.content_sha256.is_not(None),  # type: ignore[union-attr]
+    )
+    return list((await session.exec(statement)).all())
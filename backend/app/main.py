@@ -1,16 +1,44 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 import sentry_sdk
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
 from app.core.config import settings
+from app.core.db import async_engine
+from app.services.conversion_worker import conversion_worker
+from app.services.object_cache import object_cache
+from app.services.password_hasher import password_hasher
+from app.services.s3_service import async_s3_service
+from app.services.storage_sweeper import storage_sweeper
+from app.services.websocket_manager import file_connection_manager
 
 
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    conversion_worker.start()
+    storage_sweeper.start()
+    file_connection_manager.start()
+    yield
+    await file_connection_manager.shutdown()
+    # Stop background worker processes and threads
+    await storage_sweeper.shutdown()
+    conversion_worker.shutdown()
+    password_hasher.shutdown()
+    async_s3_service.shutdown()
+    object_cache.clear()
+    await async_engine.dispose()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
+    lifespan=lifespan,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     redirect_slashes=False,  # Prevent redirects that lose auth headers
 )
@@ -1,9 +1,16 @@
 import uuid
 from datetime import datetime
+from typing import Literal
 
 from pydantic import BaseModel, EmailStr
+from sqlalchemy import DDL, Index, event, text
 from sqlmodel import Field, Relationship, SQLModel
 
+# Text search configuration of the file.search_vector column
+SEARCH_CONFIG = "english"
+# quill_content as plain text, for indexing and search snippets
+QUILL_TEXT_SQL = "regexp_replace(coalesce(quill_content, ''), '<[^>]*>', ' ', 'g')"
+
 
 class UserBase(SQLModel):
     email: EmailStr = Field(unique=True, index=True, max_length=255)
@@ -19,10 +26,66 @@ class User(UserBase, table=True):
         back_populates="owner", cascade_delete=True)
 
 
+class Blob(SQLModel, table=True):
+    """Content-addressed S3 object shared by every file with the same bytes"""
+    sha256: str = Field(primary_key=True, max_length=64)  # Hex digest
+    s3_key: str = Field(max_length=500)
+    size: int
+    ref_count: int = Field(default=1)  # Number of files pointing at the blob
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class StorageOutbox(SQLModel, table=True):
+    """
+    An S3 object to delete, recorded in the transaction that made it
+    unreferenced and removed later by the storage sweeper
+    """
+    __tablename__ = "storage_outbox"
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    s3_key: str = Field(max_length=500, index=True)
+    # Not deleted before this time: the retry backoff, or the grace period of
+    # an object still being uploaded (cancelled once a row references it)
+    not_before: datetime = Field(default_factory=datetime.utcnow, index=True)
+    attempts: int = Field(default=0)
+    last_error: str | None = Field(default=None)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 class File(SQLModel, table=True):
+    # Keyset pagination of file lists, one per sort order
+    __table_args__ = (
+        Index("ix_file_owner_id_updated_at_id", "owner_id", "updated_at", "id"),
+        Index("ix_file_owner_id_filename_id", "owner_id", "filename", "id"),
+        # Substring matching on a user's filenames (needs the pg_trgm and
+        # btree_gin extensions)
+        Index(
+            "ix_file_owner_id_filename_trgm", "owner_id", "filename",
+            postgresql_using="gin",
+            postgresql_ops={"filename": "gin_trgm_ops"}
+        ),
+        # Prefix matching on a user's filenames, for fragments too short
+        # for trigrams
+        Index(
+            "ix_file_owner_id_lower_filename",
+            "owner_id", text("lower(filename) text_pattern_ops")
+        ),
+        # An object not deduplicated (uploaded straight to S3, or stored
+        # before deduplication) belongs to exactly one file; blob keys are
+        # shared by every file with the same content
+        Index(
+            "ix_file_s3_key_unshared", "s3_key",
+            unique=True,
+            postgresql_where=text("content_sha256 IS NULL")
+        ),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     filename: str = Field(max_length=255, index=True)
     s3_key: str | None = Field(default=None, max_length=500)  # S3 object key
+    # SHA-256 of the content; None for objects stored before deduplication
+    content_sha256: str | None = Field(
+        default=None, max_length=64, foreign_key="blob.sha256", index=True)
     file_size: int | None = Field(default=None)  # File size in bytes
     mime_type: str | None = Field(default=None, max_length=100)  # File type
     # Original file format (docx, html, etc.)
@@ -33,6 +96,96 @@ class File(SQLModel, table=True):
     owner: User | None = Relationship(back_populates="files")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    # Bumped on every write; part of the ETag served for the file
+    version: int = Field(default=1)
+    # The table also has search_vector: the full-text index of quill_content
+    # with the HTML tags stripped, recomputed by Postgres whenever a write
+    # changes quill_content. It is left off the model so loading a File never
+    # reads it; search_files_for_user refers to it by name.
+
+
+# Tables made by create_all (init_database.py) get search_vector as well;
+# migrations add it in add_file_search_vector
+event.listen(File.__table__, "after_create", DDL(
+    "ALTER TABLE file ADD COLUMN search_vector tsvector GENERATED ALWAYS AS "
+    f"(to_tsvector('{SEARCH_CONFIG}', {QUILL_TEXT_SQL})) STORED"
+))
+event.listen(File.__table__, "after_create", DDL(
+    "CREATE INDEX ix_file_search_vector ON file USING gin (search_vector)"
+))
+
+
+class UploadSession(SQLModel, table=True):
+    """Resumable chunked upload backed by an S3 multipart upload"""
+    __tablename__ = "upload_session"
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    owner_id: uuid.UUID = Field(
+        foreign_key="user.id", index=True, ondelete="CASCADE")
+    filename: str = Field(max_length=255)
+    mime_type: str | None = Field(default=None, max_length=100)
+    s3_key: str = Field(max_length=500)
+    upload_id: str = Field(max_length=1024)  # S3 multipart upload id
+    part_size: int  # Maximum bytes accepted per part
+    total_size: int | None = Field(default=None)  # Declared by the client
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class UploadSessionPart(SQLModel, table=True):
+    """A chunk of an upload session already stored in S3"""
+    __tablename__ = "upload_session_part"
+
+    session_id: uuid.UUID = Field(
+        foreign_key="upload_session.id", primary_key=True, ondelete="CASCADE")
+    part_number: int = Field(primary_key=True)
+    etag: str = Field(max_length=255)
+    size: int
+
+
+class ConversionJob(SQLModel, table=True):
+    """Document conversion running in the background conversion pool"""
+    __tablename__ = "conversion_job"
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    file_id: uuid.UUID = Field(
+        foreign_key="file.id", index=True, ondelete="CASCADE")
+    owner_id: uuid.UUID = Field(
+        foreign_key="user.id", index=True, ondelete="CASCADE")
+    kind: str = Field(max_length=20)  # "to_quill" or "to_docx"
+    # pending -> running -> succeeded | failed
+    status: str = Field(default="pending", max_length=20)
+    error: str | None = Field(default=None)
+    # File created by the job (the exported DOCX for "to_docx")
+    result_file_id: uuid.UUID | None = Field(default=None)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: datetime | None = Field(default=None)
+    # Process the job runs in, and until when it holds the job; the lease is
+    # renewed while that process is alive, so others only fail lost jobs
+    worker_id: str | None = Field(default=None, max_length=100, index=True)
+    lease_expires_at: datetime | None = Field(default=None)
+
+
+class FileRevision(SQLModel, table=True):
+    """
+    A saved state of a file. Rows hold either a full snapshot of
+    quill_content or a delta against the previous revision's text.
+    """
+    __tablename__ = "file_revision"
+
+    file_id: uuid.UUID = Field(
+        foreign_key="file.id", primary_key=True, ondelete="CASCADE")
+    version: int = Field(primary_key=True)  # File.version the save produced
+    author_id: uuid.UUID | None = Field(
+        default=None, foreign_key="user.id", ondelete="SET NULL")
+    snapshot: str | None = Field(default=None)  # Full quill_content
+    delta: str | None = Field(default=None)  # JSON edit ops, see revision_history
+    # Deltas since the last snapshot and their total size in characters
+    chain_length: int = Field(default=0)
+    chain_bytes: int = Field(default=0)
+    # Set on snapshots and when the S3 content changed; holds a blob reference
+    content_sha256: str | None = Field(
+        default=None, max_length=64, foreign_key="blob.sha256")
+    created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
 class UserRegister(SQLModel):
@@ -73,6 +226,7 @@ class FileBase(SQLModel):
 
 class FileCreate(FileBase):
     s3_key: str | None = Field(default=None, max_length=500)
+    content_sha256: str | None = Field(default=None, max_length=64)
     file_size: int | None = Field(default=None)
     original_format: str | None = Field(default=None, max_length=20)
     quill_content: str | None = Field(default=None)
@@ -81,12 +235,15 @@ class FileCreate(FileBase):
 class FileUpdate(SQLModel):
     filename: str | None = Field(default=None, max_length=255)
     mime_type: str | None = Field(default=None, max_length=100)
+    s3_key: str | None = Field(default=None, max_length=500)
+    content_sha256: str | None = Field(default=None, max_length=64)
+    file_size: int | None = Field(default=None)
+    quill_content: str | None = Field(default=None)
 
 
 class FilePublic(BaseModel):
     id: uuid.UUID
     filename: str
-    s3_key: str | None
     file_size: int | None
     mime_type: str | None
     original_format: str | None
@@ -94,3 +251,125 @@ class FilePublic(BaseModel):
     owner_id: uuid.UUID
     created_at: datetime
     updated_at: datetime
+
+
+class FileSummary(BaseModel):
+    """File list entry: metadata only, without the document body"""
+    id: uuid.UUID
+    filename: str
+    file_size: int | None
+    mime_type: str | None
+    original_format: str | None
+    has_quill_content: bool
+    owner_id: uuid.UUID
+    created_at: datetime
+    updated_at: datetime
+
+
+class FileSearchHit(FileSummary):
+    rank: float
+    # Matching fragments of the document text, terms wrapped in <mark>
+    snippet: str
+
+
+class FileSearchResults(BaseModel):
+    data: list[FileSearchHit]
+
+
+class FileSuggestion(BaseModel):
+    id: uuid.UUID
+    filename: str
+    mime_type: str | None
+
+
+class FileSuggestions(BaseModel):
+    data: list[FileSuggestion]
+
+
+class FilesPublic(BaseModel):
+    # FilePublic entries only when the content was asked for
+    data: list[FilePublic | FileSummary]
+    # Opaque cursor for the next page; None on the last page
+    next_cursor: str | None = None
+
+
+class FileBulkDelete(SQLModel):
+    ids: list[uuid.UUID]
+
+
+class FileBulkDeleteResult(BaseModel):
+    id: uuid.UUID
+    status: Literal["deleted", "not_found"]
+
+
+class FileBulkDeletePublic(BaseModel):
+    data: list[FileBulkDeleteResult]
+    deleted: int
+
+
+class UploadSessionCreate(SQLModel):
+    filename: str = Field(max_length=255)
+    mime_type: str | None = Field(default=None, max_length=100)
+    total_size: int | None = Field(default=None, ge=0)
+
+
+class UploadSessionPublic(BaseModel):
+    id: uuid.UUID
+    filename: str
+    mime_type: str | None
+    part_size: int
+    total_size: int | None
+    received_parts: list[int]
+    received_bytes: int
+    created_at: datetime
+
+
+class ConversionJobPublic(BaseModel):
+    id: uuid.UUID
+    file_id: uuid.UUID
+    kind: str
+    status: str
+    error: str | None
+    result_file_id: uuid.UUID | None
+    created_at: datetime
+    finished_at: datetime | None
+
+
+class FileRevisionPublic(BaseModel):
+    version: int
+    author_id: uuid.UUID | None
+    is_snapshot: bool
+    size: int  # Characters stored for this revision
+    content_sha256: str | None
+    created_at: datetime
+
+
+class FileRevisionsPublic(BaseModel):
+    data: list[FileRevisionPublic]
+
+
+class FileRevisionContent(BaseModel):
+    version: int
+    author_id: uuid.UUID | None
+    quill_content: str
+    content_sha256: str | None  # S3 content at this revision, when known
+    created_at: datetime
+
+
+class DirectUploadCreate(SQLModel):
+    filename: str = Field(max_length=255)
+    mime_type: str | None = Field(default=None, max_length=100)
+    file_size: int = Field(ge=0)
+
+
+class DirectUploadPublic(BaseModel):
+    url: str
+    fields: dict[str, str]
+    s3_key: str
+    upload_token: str
+    expires_in: int
+
+
+class DirectUploadComplete(SQLModel):
+    upload_token: str
+    etag: str | None = None  # ETag returned by S3 to the client, if known
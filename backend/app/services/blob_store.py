@@ -0,0 +1,177 @@
+"""Content-addressed, deduplicating storage for file contents"""
+
+import hashlib
+import uuid
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Callable, Optional
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.crud import (
+    acquire_blob,
+    add_blob_reference,
+    cancel_storage_deletes,
+    enqueue_storage_deletes,
+    get_blob,
+    release_blob,
+)
+from app.models import Blob
+from app.services.multipart_upload import stream_to_s3
+from app.services.s3_service import async_s3_service
+from app.services.storage_sweeper import storage_sweeper
+
+# Prefix of blob object keys; their content never changes once written
+BLOB_KEY_PREFIX = "blobs/"
+
+# Bytes read at a time when hashing an object already in S3
+_READ_CHUNK_SIZE = 1024 * 1024
+
+
+def new_blob_key() -> str:
+    return f"{BLOB_KEY_PREFIX}{uuid.uuid4()}"
+
+
+class BlobStoreError(Exception):
+    """Raised when content could not be stored or referenced"""
+
+
+class BlobStore:
+    """
+    Stores file contents once per SHA-256 digest.
+
+    Every File pointing at the same bytes shares one S3 object, tracked by a
+    reference-counted row in the ``blob`` table. The digest is computed while
+    the content streams in, so a hit is only known at the end: a body smaller
+    than one part is then never written, while the parts of a larger one are
+    already uploaded and get aborted.
+
+    Blobs live under neutral keys (``blobs/<uuid>``), never under a user's
+    prefix, since whoever stored the content first is no business of the
+    others sharing it. Keys are random rather than derived from the digest
+    so a key queued for deletion is never reused by a later upload.
+    """
+
+    async def store_stream(
+        self,
+        session: AsyncSession,
+        chunks: AsyncIterator[bytes],
+        *,
+        content_type: Optional[str] = None,
+        on_chunk: Optional[Callable[[bytes], None]] = None,
+    ) -> Blob:
+        """
+        Stream content to S3 unless identical content is already stored, and
+        take a reference on the resulting blob.
+
+        Returns:
+            The blob holding the content
+        """
+        s3_key = new_blob_key()
+        await self._expect_upload(session, s3_key)
+        hasher = hashlib.sha256()
+        existing: Optional[Blob] = None
+
+        def update(chunk: bytes) -> None:
+            hasher.update(chunk)
+            if on_chunk:
+                on_chunk(chunk)
+
+        async def before_commit() -> bool:
+            nonlocal existing
+            existing = await get_blob(session, sha256=hasher.hexdigest())
+            return existing is None
+
+        size = await stream_to_s3(
+            chunks,
+            s3_key,
+            content_type,
+            on_chunk=update,
+            before_commit=before_commit
+        )
+        return await self._register(
+            session, hasher.hexdigest(), s3_key, size, existing is None)
+
+    async def store_bytes(
+        self,
+        session: AsyncSession,
+        data: bytes,
+        *,
+        content_type: Optional[str] = None,
+    ) -> Blob:
+        """Store in-memory content, skipping the PUT if it already exists"""
+        s3_key = new_blob_key()
+        sha256 = hashlib.sha256(data).hexdigest()
+        stored = False
+        if await get_blob(session, sha256=sha256) is None:
+            await self._expect_upload(session, s3_key)
+            if not await async_s3_service.put_object(s3_key, data, content_type):
+                raise BlobStoreError("Failed to upload content to S3")
+            stored = True
+        return await self._register(session, sha256, s3_key, len(data), stored)
+
+    async def adopt(
+        self,
+        session: AsyncSession,
+        s3_key: str,
+        *,
+        on_chunk: Optional[Callable[[bytes], None]] = None,
+    ) -> Blob:
+        """
+        Take over an object already written under ``s3_key`` (e.g. assembled
+        from a resumable upload's parts): it is read back to compute its
+        digest and, when identical content is already stored, queued for
+        deletion in favour of that blob. Nothing is committed, so the
+        reference only holds once the caller's transaction does.
+        """
+        response = await async_s3_service.get_object(s3_key)
+        if response is None:
+            raise BlobStoreError("Uploaded object not found in S3")
+        hasher = hashlib.sha256()
+        size = 0
+        async for chunk in async_s3_service.iter_body(response["Body"], _READ_CHUNK_SIZE):
+            hasher.update(chunk)
+            size += len(chunk)
+            if on_chunk:
+                on_chunk(chunk)
+        return await acquire_blob(
+            session, sha256=hasher.hexdigest(), s3_key=s3_key, size=size, commit=False)
+
+    async def release(self, session: AsyncSession, sha256: str) -> None:
+        """Drop a file's reference; the last one queues the object for deletion"""
+        if await release_blob(session, sha256=sha256):
+            storage_sweeper.wake()
+
+    async def _expect_upload(self, session: AsyncSession, s3_key: str) -> None:
+        # Deleted after the grace period unless a blob takes it over first,
+        # so a crash between the write and the commit leaves no orphan
+        enqueue_storage_deletes(
+            session,
+            [s3_key],
+            not_before=datetime.utcnow() + timedelta(
+                seconds=settings.STORAGE_UPLOAD_GRACE_SECONDS)
+        )
+        await session.commit()
+
+    async def _register(
+        self, session: AsyncSession, sha256: str, s3_key: str, size: int, stored: bool
+    ) -> Blob:
+        if not stored:
+            # Nothing was written under s3_key
+            await cancel_storage_deletes(session, s3_key=s3_key)
+            blob = await add_blob_reference(session, sha256=sha256)
+            if blob is None:
+                # The blob was released between the lookup and now
+                raise BlobStoreError("Content was removed while uploading, retry")
+            return blob
+
+        blob = await acquire_blob(session, sha256=sha256, s3_key=s3_key, size=size)
+        if blob.s3_key != s3_key:
+            # A concurrent upload registered the same content first; ours
+            # was queued for deletion
+            storage_sweeper.wake()
+        return blob
+
+
+# Global blob store instance
+blob_store = BlobStore()
@@ -0,0 +1,270 @@
+"""Background document conversion on a bounded process pool"""
+
+import asyncio
+import multiprocessing
+import os
+import socket
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional, Set
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.db import async_session
+from app.crud import (
+    create_file_for_user,
+    fail_expired_conversion_jobs,
+    get_file_by_id,
+    mark_file_modified,
+    renew_conversion_job_leases,
+    update_conversion_job,
+)
+from app.models import ConversionJob, FileCreate
+from app.services.blob_store import blob_store
+from app.services.document_converter import convert_quill_to_docx, convert_to_quill
+from app.services.object_cache import object_cache
+from app.services.s3_service import async_s3_service
+from app.services.websocket_manager import FileConnectionManager
+
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+class ConversionWorker:
+    """
+    Runs mammoth/html2docx conversions in worker processes so they never
+    block the event loop. Jobs are persisted in the conversion_job table; at
+    most ``max_workers`` run at once and the rest wait as "pending".
+
+    Jobs only run in the app process that accepted them. That process holds
+    a lease on each of its unfinished jobs and renews it every third of
+    ``lease_seconds``; every process periodically fails the jobs whose lease
+    ran out, i.e. the ones a crashed or restarted process left behind.
+    """
+
+    def __init__(self, max_workers: int, lease_seconds: int) -> None:
+        self.max_workers = max_workers
+        self.lease = timedelta(seconds=lease_seconds)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = asyncio.Semaphore(max_workers)
+        # Running job tasks (the event loop only keeps weak references)
+        self._tasks: Set["asyncio.Task[ConversionJob]"] = set()
+        self._job_ids: Set[uuid.UUID] = set()
+        self._heartbeat: Optional["asyncio.Task[None]"] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned workers only import the converter module, not the app
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def start(self) -> None:
+        """Start renewing leases and failing lost jobs (called on startup)"""
+        if self._heartbeat is None:
+            self._heartbeat = asyncio.create_task(self._keep_leases())
+
+    def shutdown(self) -> None:
+        """Stop the worker processes (called on application shutdown)"""
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def recover(self) -> None:
+        """Fail the jobs whose process stopped renewing their lease"""
+        async with async_session() as session:
+            count = await fail_expired_conversion_jobs(
+                session, lease=self.lease, error="Interrupted by a server restart")
+        if count:
+            print(f"Marked {count} interrupted conversion jobs as failed")
+
+    async def _keep_leases(self) -> None:
+        while True:
+            try:
+                async with async_session() as session:
+                    await renew_conversion_job_leases(
+                        session,
+                        worker_id=self.worker_id,
+                        job_ids=list(self._job_ids),
+                        lease=self.lease
+                    )
+                await self.recover()
+            except Exception as e:
+                print(f"Conversion lease renewal failed: {e}")
+            await asyncio.sleep(self.lease.total_seconds() / 3)
+
+    def submit(
+        self,
+        job: ConversionJob,
+        *,
+        content: Optional[bytes] = None,
+        manager: Optional[FileConnectionManager] = None
+    ) -> "asyncio.Task[ConversionJob]":
+        """
+        Schedule a job and return the task resolving to the finished job.
+        Callers awaiting it should shield it, so a cancelled request does not
+        leave the job stuck in "running".
+
+        Args:
+            job: Persisted job to run
+            content: Source bytes when already in memory (skips the S3 read)
+            manager: Connection manager notified when the job finishes
+        """
+        task = asyncio.create_task(self._run(job.id, content, manager))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _in_pool(self, fn: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed while converting a huge document):
+            # this job fails, later ones get a fresh pool
+            if self._executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            raise
+
+    async def _run(
+        self,
+        job_id: uuid.UUID,
+        content: Optional[bytes],
+        manager: Optional[FileConnectionManager]
+    ) -> ConversionJob:
+        self._job_ids.add(job_id)
+        try:
+            return await self._run_leased(job_id, content, manager)
+        finally:
+            self._job_ids.discard(job_id)
+
+    async def _run_leased(
+        self,
+        job_id: uuid.UUID,
+        content: Optional[bytes],
+        manager: Optional[FileConnectionManager]
+    ) -> ConversionJob:
+        async with async_session() as session:
+            # Held (and renewed) while the job waits for a slot as well
+            await renew_conversion_job_leases(
+                session, worker_id=self.worker_id, job_ids=[job_id], lease=self.lease)
+
+        async with self._slots:
+            async with async_session() as session:
+                job = await session.get(ConversionJob, job_id)
+                job = await update_conversion_job(session, job, status="running")
+                try:
+                    if job.kind == "to_docx":
+                        result_file_id = await self._to_docx(session, job)
+                        job = await update_conversion_job(
+                            session, job, result_file_id=result_file_id)
+                    else:
+                        await self._to_quill(session, job, content)
+                    job = await update_conversion_job(
+                        session, job,
+                        status="succeeded",
+                        finished_at=datetime.utcnow()
+                    )
+                except Exception as e:
+                    print(f"Conversion job {job_id} failed: {e}")
+                    await session.rollback()
+                    job = await update_conversion_job(
+                        session, job,
+                        status="failed",
+                        error=str(e),
+                        finished_at=datetime.utcnow()
+                    )
+
+        if manager is not None:
+            await manager.broadcast_to_file(
+                str(job.file_id),
+                {
+                    "type": "conversion_finished",
+                    "job_id": str(job.id),
+                    "file_id": str(job.file_id),
+                    "kind": job.kind,
+                    "status": job.status,
+                    "result_file_id": str(job.result_file_id) if job.result_file_id else None,
+                },
+            )
+        return job
+
+    async def _to_quill(
+        self, session: AsyncSession, job: ConversionJob, content: Optional[bytes]
+    ) -> None:
+        file = await get_file_by_id(session, file_id=job.file_id)
+        if not file or not file.s3_key:
+            raise ValueError("No S3 content available for conversion")
+
+        if content is None and object_cache.cacheable(file.file_size):
+            content = await object_cache.get_bytes(file.s3_key)
+        elif content is None:
+            content = await async_s3_service.get_object_bytes(file.s3_key)
+        if content is None:
+            raise ValueError("Failed to download file from S3")
+
+        quill_content, original_format = await self._in_pool(
+            convert_to_quill, file.filename, content, file.file_size)
+        print(
+            f"Converted {file.filename} for Quill: {len(quill_content)} characters")
+
+        file.quill_content = quill_content
+        file.original_format = original_format
+        mark_file_modified(file)
+        session.add(file)
+        await session.commit()
+
+    async def _to_docx(self, session: AsyncSession, job: ConversionJob) -> uuid.UUID:
+        file = await get_file_by_id(session, file_id=job.file_id)
+        if not file or not file.quill_content:
+            raise ValueError("No Quill content available for conversion")
+
+        filename = file.filename.replace('.docx', '_converted.docx')
+        docx_content = await self._in_pool(
+            convert_quill_to_docx, file.quill_content, filename)
+
+        # Reuse an identical earlier export if there is one
+        blob = await blob_store.store_bytes(
+            session,
+            docx_content,
+            content_type=DOCX_MIME_TYPE
+        )
+
+        try:
+            converted_file = await create_file_for_user(
+                session=session,
+                owner_id=job.owner_id,
+                file_in=FileCreate(
+                    filename=filename,
+                    s3_key=blob.s3_key,
+                    content_sha256=blob.sha256,
+                    file_size=blob.size,
+                    mime_type=DOCX_MIME_TYPE,
+                    original_format="docx",
+                    quill_content=file.quill_content  # Keep the original Quill content
+                )
+            )
+        except Exception:
+            sha256 = blob.sha256  # Rolling back expires loaded objects
+            await session.rollback()
+            await blob_store.release(session, sha256)
+            raise
+        return converted_file.id
+
+
+# Global conversion worker instance
+conversion_worker = ConversionWorker(
+    max_workers=settings.CONVERSION_MAX_WORKERS,
+    lease_seconds=settings.CONVERSION_LEASE_SECONDS
+)
@@ -124,3 +124,33 @@ class DocumentConverter:
 
 # Global instance
 document_converter = DocumentConverter() if CONVERSION_AVAILABLE else None
+
+
+# Process-pool entry points. These are module-level so they can be pickled
+# and run in conversion worker processes (see conversion_worker).
+
+def convert_to_quill(
+    filename: str, content: bytes, file_size: Optional[int] = None
+) -> Tuple[str, str]:
+    """
+    Build Quill editor content for a stored file
+
+    Returns:
+        Tuple of (quill_content, original_format)
+    """
+    if document_converter and document_converter.is_docx_file(filename):
+        html_content, plain_text = document_converter.docx_to_html(content)
+        return document_converter.get_quill_content(html_content), "docx"
+
+    if document_converter and document_converter.is_html_file(filename):
+        return document_converter.get_quill_content(content.decode('utf-8')), "html"
+
+    # For other file types, create a basic Quill content
+    return f"<p>File: {filename}</p><p>Size: {file_size} bytes</p>", "other"
+
+
+def convert_quill_to_docx(html_content: str, filename: str) -> bytes:
+    """Render Quill HTML content as a DOCX document"""
+    if not document_converter:
+        raise ImportError("Document conversion packages not available")
+    return document_converter.html_to_docx(html_content, filename=filename)
@@ -0,0 +1,69 @@
+"""Recording finished uploads as files"""
+
+import uuid
+from typing import Optional
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.crud import add_conversion_job, add_file_for_user
+from app.models import File, FileCreate
+from app.services.conversion_worker import conversion_worker
+from app.services.document_converter import document_converter
+from app.services.websocket_manager import FileConnectionManager
+
+
+class FileRegistry:
+    """
+    Records an uploaded object as a File, the same way for every upload path.
+
+    The File row and, for documents the editor converts (DOCX/HTML), its
+    Quill conversion job are committed in one transaction together with
+    whatever the caller already staged in the session (a blob reference, a
+    claimed upload session, a cancelled pending delete), so a failure leaves
+    all of it or none. The conversion is only scheduled once committed.
+    """
+
+    def original_format(self, filename: str) -> Optional[str]:
+        """Format converted for the Quill editor, None if not convertible"""
+        if document_converter is None:
+            return None
+        if document_converter.is_docx_file(filename):
+            return "docx"
+        if document_converter.is_html_file(filename):
+            return "html"
+        return None
+
+    async def register(
+        self,
+        session: AsyncSession,
+        *,
+        owner_id: uuid.UUID,
+        file_in: FileCreate,
+        content: Optional[bytes] = None,
+        manager: Optional[FileConnectionManager] = None
+    ) -> File:
+        """
+        Commit the file (and its conversion job) and schedule the conversion.
+
+        Args:
+            content: Source bytes when already in memory (skips the S3 read)
+            manager: Connection manager notified when the conversion finishes
+        """
+        file_in.original_format = self.original_format(file_in.filename)
+        print(
+            f"Upload: Creating file record for {file_in.filename} "
+            f"with original_format={file_in.original_format}")
+        file = add_file_for_user(session, owner_id=owner_id, file_in=file_in)
+        job = None
+        if file_in.original_format:
+            job = add_conversion_job(
+                session, file_id=file.id, owner_id=owner_id, kind="to_quill")
+        await session.commit()
+
+        if job is not None:
+            conversion_worker.submit(job, content=content, manager=manager)
+        return file
+
+
+# Global file registry instance
+file_registry = FileRegistry()
@@ -0,0 +1,130 @@
+"""Filename typeahead with a short-lived per-process cache of recent prefixes"""
+
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.crud import FILENAME_SUBSTRING_MIN_CHARS, suggest_filenames_for_user
+from app.models import FileSuggestion
+
+_Key = Tuple[uuid.UUID, str]
+
+
+class FilenameAutocomplete:
+    """
+    Suggests a user's files by name fragment.
+
+    Answers are cached per (user, fragment) for ``ttl_seconds``. A cached
+    answer that was not cut off by the limit holds every match for that
+    fragment, so typing further is answered by filtering it in memory
+    without another query.
+    """
+
+    def __init__(self, max_results: int, ttl_seconds: float, max_entries: int) -> None:
+        self.max_results = max_results
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # (user, fragment) -> (stored at, suggestions, complete)
+        self._entries: "OrderedDict[_Key, Tuple[float, List[FileSuggestion], bool]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def suggest(
+        self, session: AsyncSession, owner_id: uuid.UUID, prefix: str, limit: int
+    ) -> List[FileSuggestion]:
+        limit = min(limit, self.max_results)
+        fragment = prefix.lower()
+
+        cached = self._cached(owner_id, fragment)
+        if cached is not None:
+            return cached[:limit]
+
+        rows = await suggest_filenames_for_user(
+            session, owner_id=owner_id, prefix=prefix, limit=self.max_results)
+        suggestions = [
+            FileSuggestion(id=row.id, filename=row.filename, mime_type=row.mime_type)
+            for row in rows
+        ]
+        self._store(owner_id, fragment, suggestions,
+                    len(suggestions) < self.max_results)
+        return suggestions[:limit]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+        }
+
+    def _cached(self, owner_id: uuid.UUID, fragment: str) -> List[FileSuggestion] | None:
+        now = time.monotonic()
+        entry = self._fresh((owner_id, fragment), now)
+        if entry is not None:
+            self.hits += 1
+            return entry[1]
+
+        # A complete answer for a shorter fragment contains every match, if
+        # it was matched the same way (at the start only, or anywhere)
+        anywhere = len(fragment) >= FILENAME_SUBSTRING_MIN_CHARS
+        for end in range(len(fragment) - 1, 0, -1):
+            if (end >= FILENAME_SUBSTRING_MIN_CHARS) != anywhere:
+                break
+            entry = self._fresh((owner_id, fragment[:end]), now)
+            if entry is not None and entry[2]:
+                self.hits += 1
+                return _rank(
+                    [s for s in entry[1] if _matches(s.filename.lower(), fragment, anywhere)],
+                    fragment)
+
+        self.misses += 1
+        return None
+
+    def _fresh(self, key: _Key, now: float) -> Tuple[float, List[FileSuggestion], bool] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now - entry[0] >= self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(
+        self, owner_id: uuid.UUID, fragment: str,
+        suggestions: List[FileSuggestion], complete: bool
+    ) -> None:
+        self._entries[(owner_id, fragment)] = (
+            time.monotonic(), suggestions, complete)
+        self._entries.move_to_end((owner_id, fragment))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+def _matches(filename: str, fragment: str, anywhere: bool) -> bool:
+    return fragment in filename if anywhere else filename.startswith(fragment)
+
+
+def _rank(suggestions: List[FileSuggestion], fragment: str) -> List[FileSuggestion]:
+    # Same order as suggest_filenames_for_user
+    return sorted(suggestions, key=lambda s: (
+        not s.filename.lower().startswith(fragment), len(s.filename), s.filename))
+
+
+# Global filename autocomplete instance
+filename_autocomplete = FilenameAutocomplete(
+    max_results=settings.AUTOCOMPLETE_MAX_RESULTS,
+    ttl_seconds=settings.AUTOCOMPLETE_CACHE_TTL_SECONDS,
+    max_entries=settings.AUTOCOMPLETE_CACHE_MAX_ENTRIES
+)
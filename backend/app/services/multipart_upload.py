@@ -0,0 +1,247 @@
+"""Streaming uploads from request bodies straight to S3 multipart uploads"""
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+
+from app.core.config import settings
+from app.services.s3_service import async_s3_service
+
+
+class MultipartUploadError(Exception):
+    """Raised when a streamed upload could not be stored in S3"""
+
+
+class MultipartFormError(Exception):
+    """Raised when a multipart/form-data request body is malformed"""
+
+
+class StreamedFormFile:
+    """
+    One file field of a multipart/form-data request, read as the body arrives.
+
+    Starlette's UploadFile spools the whole body to a temporary file before
+    the endpoint runs; this parses ``request.stream()`` incrementally instead,
+    so the file's bytes can be forwarded to S3 while the client is still
+    sending them. Other form fields are skipped.
+    """
+
+    def __init__(self, request: Request, field_name: str = "file"):
+        _, options = parse_options_header(request.headers.get("content-type", ""))
+        boundary = options.get(b"boundary")
+        if not boundary:
+            raise MultipartFormError("Missing multipart boundary")
+
+        self.field_name = field_name
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+
+        self._body = request.stream()
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._in_file = False
+        self._file_done = False
+        self._data: List[bytes] = []
+        self._parser = MultipartParser(boundary, callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        })
+
+    async def start(self) -> None:
+        """Read the body up to the file's headers, filling filename and content_type"""
+        while self.filename is None:
+            if not await self._feed():
+                raise MultipartFormError(f"Missing '{self.field_name}' file field")
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """Yield the file's bytes as they are received (call start() first)"""
+        while True:
+            if self._data:
+                data = b"".join(self._data)
+                self._data.clear()
+                yield data
+            if self._file_done:
+                return
+            if not await self._feed():
+                raise MultipartFormError("Request body ended inside the file field")
+
+    async def _feed(self) -> bool:
+        try:
+            chunk = await self._body.__anext__()
+        except StopAsyncIteration:
+            return False
+        try:
+            self._parser.write(chunk)
+        except MultipartParseError as e:
+            raise MultipartFormError(str(e)) from e
+        return True
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field.extend(data[start:end])
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value.extend(data[start:end])
+
+    def _on_header_end(self) -> None:
+        self._headers[bytes(self._header_field).lower()] = bytes(self._header_value)
+        self._header_field.clear()
+        self._header_value.clear()
+
+    def _on_headers_finished(self) -> None:
+        if self.filename is not None:
+            return
+        _, options = parse_options_header(
+            self._headers.get(b"content-disposition", b""))
+        filename = options.get(b"filename")
+        if filename is None or options.get(b"name", b"").decode("latin-1") != self.field_name:
+            return
+        self._in_file = True
+        self.filename = filename.decode("utf-8", "replace")
+        self.content_type = self._headers.get(
+            b"content-type", b"").decode("latin-1") or None
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self._data.append(data[start:end])
+
+    def _on_part_end(self) -> None:
+        if self._in_file:
+            self._in_file = False
+            self._file_done = True
+
+
+async def open_form_file(request: Request, field_name: str = "file") -> StreamedFormFile:
+    """Start reading a multipart/form-data request body up to its file field"""
+    form_file = StreamedFormFile(request, field_name)
+    await form_file.start()
+    return form_file
+
+
+async def stream_to_s3(
+    chunks: AsyncIterator[bytes],
+    s3_key: str,
+    content_type: Optional[str] = None,
+    *,
+    part_size: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+    on_chunk: Optional[Callable[[bytes], None]] = None,
+    before_commit: Optional[Callable[[], Awaitable[bool]]] = None,
+) -> int:
+    """
+    Stream chunks to S3 as multipart-upload parts and return the total size.
+
+    At most ``max_concurrency`` parts are in flight at a time, so memory use
+    stays around ``(max_concurrency + 1) * part_size`` regardless of the
+    object size. Bodies smaller than one part are stored with a single PUT.
+    On any failure the multipart upload is aborted and MultipartUploadError
+    is raised.
+
+    Args:
+        chunks: Async iterator over the body bytes
+        s3_key: Destination object key
+        content_type: Content-Type stored on the object
+        part_size: Bytes per part (defaults to S3_MULTIPART_PART_SIZE)
+        max_concurrency: Parts uploaded in parallel
+        on_chunk: Callback invoked with every chunk (e.g. for hashing)
+        before_commit: Awaited once the whole body has been read; returning
+            False discards the upload so no object is written
+
+    Returns:
+        Number of bytes stored
+    """
+    part_size = part_size or settings.S3_MULTIPART_PART_SIZE
+    max_concurrency = max_concurrency or settings.S3_MULTIPART_MAX_CONCURRENCY
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    tasks: List["asyncio.Task[Dict[str, Any]]"] = []
+    upload_id: Optional[str] = None
+    buffer = bytearray()
+    total_size = 0
+
+    async def send_part(part_number: int, data: bytes) -> Dict[str, Any]:
+        try:
+            etag = await async_s3_service.upload_part(
+                s3_key, upload_id, part_number, data
+            )
+        finally:
+            semaphore.release()
+        if not etag:
+            raise MultipartUploadError(f"Failed to upload part {part_number}")
+        return {"PartNumber": part_number, "ETag": etag}
+
+    async def discard(
+        pending: List["asyncio.Task[Dict[str, Any]]"], multipart_id: str
+    ) -> None:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        await async_s3_service.abort_multipart_upload(
+            s3_key, multipart_id
+        )
+
+    async def schedule_part(data: bytes) -> None:
+        nonlocal upload_id
+        if upload_id is None:
+            upload_id = await async_s3_service.create_multipart_upload(
+                s3_key, content_type
+            )
+            if not upload_id:
+                raise MultipartUploadError("Failed to start multipart upload")
+        # Wait for a free slot before reading further, bounding part buffers
+        await semaphore.acquire()
+        tasks.append(asyncio.create_task(send_part(len(tasks) + 1, data)))
+
+    try:
+        async for chunk in chunks:
+            total_size += len(chunk)
+            if on_chunk:
+                on_chunk(chunk)
+            buffer.extend(chunk)
+            while len(buffer) >= part_size:
+                await schedule_part(bytes(buffer[:part_size]))
+                del buffer[:part_size]
+
+        if before_commit is not None and not await before_commit():
+            if upload_id is not None:
+                await discard(tasks, upload_id)
+            return total_size
+
+        if upload_id is None:
+            # Whole body fits in one part: a plain PUT is cheaper
+            stored = await async_s3_service.put_object(
+                s3_key, bytes(buffer), content_type
+            )
+            if not stored:
+                raise MultipartUploadError("Failed to upload file to S3")
+            return total_size
+
+        if buffer:
+            await schedule_part(bytes(buffer))
+            buffer.clear()
+
+        parts = await asyncio.gather(*tasks)
+        completed = await async_s3_service.complete_multipart_upload(
+            s3_key, upload_id, parts
+        )
+        if not completed:
+            raise MultipartUploadError("Failed to complete multipart upload")
+        return total_size
+
+    except BaseException as e:
+        if upload_id is not None:
+            await discard(tasks, upload_id)
+        if isinstance(e, Exception) and not isinstance(e, MultipartUploadError):
+            raise MultipartUploadError(str(e)) from e
+        raise
@@ -0,0 +1,314 @@
+"""Local read-through cache for S3 object content"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, AsyncIterator, BinaryIO, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.services.blob_store import BLOB_KEY_PREFIX
+from app.services.s3_service import async_s3_service
+
+# Bytes read at a time when streaming a disk entry in or out
+_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class CachedObject:
+    etag: str
+    size: int
+    last_modified: Optional[datetime]
+    data: Optional[bytes] = None  # Memory tier
+    file: Optional[BinaryIO] = None  # Disk tier, opened for this reader
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+
+
+@dataclass
+class _Entry:
+    etag: str
+    size: int
+    last_modified: Optional[datetime]
+    checked_at: float
+    data: Optional[bytes] = None  # Memory tier
+    path: Optional[str] = None  # Disk tier
+
+
+class ObjectCache:
+    """
+    Size-bounded LRU cache of S3 objects keyed by s3_key.
+
+    Objects up to ``memory_entry_max_bytes`` are kept in memory, larger ones
+    (up to ``max_entry_bytes``) in files on local disk; each tier has its own
+    byte budget. Disk entries are written and served in chunks, so no object
+    beyond the memory tier is ever held in memory whole.
+
+    An entry older than ``revalidate_seconds`` is revalidated with a
+    conditional GET (If-None-Match on its ETag), which only transfers the
+    body when the object changed. Keys under ``immutable_prefixes`` are
+    never rewritten in place and are not revalidated.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str],
+        max_disk_bytes: int,
+        max_memory_bytes: int,
+        memory_entry_max_bytes: int,
+        max_entry_bytes: int,
+        revalidate_seconds: float,
+        immutable_prefixes: Tuple[str, ...] = ()
+    ) -> None:
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self.memory_entry_max_bytes = memory_entry_max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.revalidate_seconds = revalidate_seconds
+        self.immutable_prefixes = immutable_prefixes
+        self._base_directory = directory
+        self._directory: Optional[str] = None
+        self._memory: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._disk: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+    @property
+    def directory(self) -> str:
+        if self._directory is None:
+            # One directory per process: the index lives in memory
+            self._directory = tempfile.mkdtemp(
+                prefix="object-cache-", dir=self._base_directory)
+        return self._directory
+
+    def cacheable(self, size: Optional[int]) -> bool:
+        """Whether an object of this size is served through the cache"""
+        return size is not None and size <= self.max_entry_bytes
+
+    async def get(self, s3_key: str, *, fill: bool = True) -> Optional[CachedObject]:
+        """
+        Return an object from the cache when it is still current, or else
+        from S3, caching it. With ``fill=False`` a miss returns None instead
+        of reading the object. None also if S3 could not be read or the
+        object could not be cached.
+
+        A disk-tier result holds an open file: read it through iter_range()
+        or get_bytes(), or close() it.
+        """
+        entry = self._lookup(s3_key)
+        if entry is not None:
+            if s3_key.startswith(self.immutable_prefixes) or \
+                    time.monotonic() - entry.checked_at < self.revalidate_seconds:
+                cached = self._open(s3_key, entry)
+                if cached is not None:
+                    self.hits += 1
+                    return cached
+            else:
+                self.revalidations += 1
+                modified, response = await async_s3_service.get_object_if_modified(
+                    s3_key, entry.etag)
+                if not modified:
+                    cached = self._open(s3_key, entry)
+                    if cached is not None:
+                        entry.checked_at = time.monotonic()
+                        self.hits += 1
+                        return cached
+                    response = None
+                if response is not None:
+                    self.misses += 1
+                    return await self._store(s3_key, response)
+
+        self.misses += 1
+        if not fill:
+            return None
+        response = await async_s3_service.get_object(s3_key)
+        if response is None:
+            return None
+        return await self._store(s3_key, response)
+
+    async def get_bytes(self, s3_key: str) -> Optional[bytes]:
+        """An object's whole content, for callers that need it in memory"""
+        cached = await self.get(s3_key)
+        if cached is None:
+            return None
+        if cached.data is not None:
+            return cached.data
+        try:
+            return await asyncio.to_thread(cached.file.read)  # type: ignore[union-attr]
+        finally:
+            cached.close()
+
+    async def iter_range(
+        self, cached: CachedObject, start: int, end: int
+    ) -> AsyncIterator[bytes]:
+        """Yield bytes ``start`` to ``end`` (inclusive) of a cached object"""
+        if cached.data is not None:
+            if end >= start:
+                yield cached.data[start:end + 1]
+            return
+        try:
+            await asyncio.to_thread(cached.file.seek, start)  # type: ignore[union-attr]
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = await asyncio.to_thread(
+                    cached.file.read, min(_CHUNK_SIZE, remaining))  # type: ignore[union-attr]
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            cached.close()
+
+    def invalidate(self, s3_key: str) -> None:
+        """Drop an object, e.g. after it was overwritten or deleted"""
+        self._remove(s3_key)
+
+    def clear(self) -> None:
+        """Drop every entry and the disk tier directory"""
+        self._memory.clear()
+        self._disk.clear()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "revalidations": self.revalidations,
+            "evictions": self.evictions,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+        }
+
+    def _lookup(self, s3_key: str) -> Optional[_Entry]:
+        for tier in (self._memory, self._disk):
+            if s3_key in tier:
+                tier.move_to_end(s3_key)
+                return tier[s3_key]
+        return None
+
+    def _open(self, s3_key: str, entry: _Entry) -> Optional[CachedObject]:
+        cached = CachedObject(
+            etag=entry.etag, size=entry.size, last_modified=entry.last_modified)
+        if entry.data is not None:
+            cached.data = entry.data
+            return cached
+        # Opened right away (no await since the lookup), so eviction can
+        # unlink the file but never before this reader has it open
+        try:
+            cached.file = open(entry.path, 'rb')  # type: ignore[arg-type]
+        except OSError:
+            self._remove(s3_key)
+            return None
+        return cached
+
+    async def _store(self, s3_key: str, response: Dict[str, Any]) -> Optional[CachedObject]:
+        body = response["Body"]
+        size = response["ContentLength"]
+        if size > self.max_entry_bytes:
+            self._remove(s3_key)
+            body.close()
+            return None
+
+        entry = _Entry(
+            etag=response["ETag"],
+            size=size,
+            last_modified=response.get("LastModified"),
+            checked_at=time.monotonic()
+        )
+        # The previous entry is only replaced once the new content is in
+        # hand, with no await in between, so concurrent fills of one key
+        # never leave a stale entry or file behind
+        if size <= self.memory_entry_max_bytes:
+            entry.data = await async_s3_service.read_body(body)
+            self._remove(s3_key)
+            self._memory[s3_key] = entry
+            self._memory_bytes += entry.size
+        else:
+            path = os.path.join(
+                self.directory, hashlib.sha256(s3_key.encode()).hexdigest())
+            try:
+                temp_path = await _write_temp_file(
+                    path, async_s3_service.iter_body(body, _CHUNK_SIZE))
+            except Exception as e:
+                print(f"Object cache: failed to write {s3_key}: {e}")
+                return None
+            self._remove(s3_key)
+            os.replace(temp_path, path)
+            entry.path = path
+            self._disk[s3_key] = entry
+            self._disk_bytes += entry.size
+        cached = self._open(s3_key, entry)
+        self._evict()
+        return cached
+
+    def _remove(self, s3_key: str) -> None:
+        entry = self._memory.pop(s3_key, None)
+        if entry is not None:
+            self._memory_bytes -= entry.size
+        entry = self._disk.pop(s3_key, None)
+        if entry is not None:
+            self._disk_bytes -= entry.size
+            _unlink(entry.path)
+
+    def _evict(self) -> None:
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            _, entry = self._memory.popitem(last=False)
+            self._memory_bytes -= entry.size
+            self.evictions += 1
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            _, entry = self._disk.popitem(last=False)
+            self._disk_bytes -= entry.size
+            _unlink(entry.path)
+            self.evictions += 1
+
+
+async def _write_temp_file(path: str, chunks: AsyncIterator[bytes]) -> str:
+    # Written beside ``path`` and renamed by the caller, so readers never
+    # see a partial file
+    temp_path = f"{path}.{id(chunks)}.tmp"
+    f = await asyncio.to_thread(open, temp_path, 'wb')
+    try:
+        async for chunk in chunks:
+            await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        f.close()
+        _unlink(temp_path)
+        raise
+    f.close()
+    return temp_path
+
+
+def _unlink(path: Optional[str]) -> None:
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+# Global object cache instance
+object_cache = ObjectCache(
+    directory=settings.OBJECT_CACHE_DIR,
+    max_disk_bytes=settings.OBJECT_CACHE_MAX_BYTES,
+    max_memory_bytes=settings.OBJECT_CACHE_MEMORY_MAX_BYTES,
+    memory_entry_max_bytes=settings.OBJECT_CACHE_MEMORY_ENTRY_MAX_BYTES,
+    max_entry_bytes=settings.OBJECT_CACHE_MAX_ENTRY_BYTES,
+    revalidate_seconds=settings.OBJECT_CACHE_REVALIDATE_SECONDS,
+    immutable_prefixes=(BLOB_KEY_PREFIX,)
+)
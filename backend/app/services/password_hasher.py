@@ -0,0 +1,93 @@
+"""Password hashing and verification on a bounded process pool"""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Tuple
+
+from app.core.config import settings
+from app.core.security import get_password_hash, verify_and_update_password
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hashing jobs are already waiting"""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in worker processes so login and signup storms neither block
+    the event loop nor compete with other requests for threads.
+
+    At most ``max_workers`` hashes run at once and ``max_pending`` more may
+    wait; beyond that requests are refused with PasswordHasherBusy instead of
+    queueing without bound. If a worker process dies the pool is replaced
+    and the job retried once.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int) -> None:
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+        self.rejected = 0
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned workers only import the security module, not the app
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def shutdown(self) -> None:
+        """Stop the worker processes (called on application shutdown)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def hash(self, password: str) -> str:
+        return await self._in_pool(get_password_hash, password)
+
+    async def verify_and_update(
+        self, password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Check a password against its hash.
+
+        Returns:
+            (valid, new_hash): new_hash is set when the stored hash uses
+            outdated settings (e.g. another bcrypt cost) and should be replaced
+        """
+        return await self._in_pool(
+            verify_and_update_password, password, hashed_password)
+
+    async def _in_pool(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self._in_flight >= self.max_workers + self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            for _ in range(2):
+                executor = self.executor
+                try:
+                    return await loop.run_in_executor(executor, fn, *args)
+                except BrokenProcessPool:
+                    # Every later submit would fail too: start a fresh pool
+                    # (unless a concurrent job already did)
+                    if self._executor is executor:
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        self._executor = None
+            raise PasswordHasherBusy()
+        finally:
+            self._in_flight -= 1
+
+
+# Global password hasher instance
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_MAX_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
@@ -0,0 +1,235 @@
+"""Document revision history stored as snapshots plus deltas"""
+
+import asyncio
+import json
+import uuid
+from difflib import SequenceMatcher
+from typing import List, Optional, Tuple, Union
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.crud import (
+    add_file_revision,
+    get_file_revision_chain,
+    update_file_for_revision,
+)
+from app.models import File, FileRevision, FileUpdate
+
+# Delta ops: n > 0 copies n characters of the old text, n < 0 skips n of
+# them, a string is inserted
+DeltaOp = Union[int, str]
+
+# Above this many compared character pairs a changed region is replaced
+# wholesale instead of being diffed (SequenceMatcher is quadratic)
+_MAX_DIFF_WORK = 4_000_000
+# Characters compared per slice while trimming the common prefix and suffix
+_COMPARE_BLOCK = 4096
+# Documents up to this size are diffed on the event loop; larger ones in a
+# thread so an autosave never stalls other requests
+_INLINE_DIFF_CHARS = 65536
+
+
+def _common_prefix(a: str, b: str, limit: int) -> int:
+    # Whole blocks are compared as slices (in C); only the block holding the
+    # first difference is walked character by character
+    n = 0
+    while n < limit:
+        step = min(_COMPARE_BLOCK, limit - n)
+        if a[n:n + step] != b[n:n + step]:
+            while a[n] == b[n]:
+                n += 1
+            return n
+        n += step
+    return n
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    n = 0
+    while n < limit:
+        step = min(_COMPARE_BLOCK, limit - n)
+        if a[len(a) - n - step:len(a) - n] != b[len(b) - n - step:len(b) - n]:
+            while a[len(a) - 1 - n] == b[len(b) - 1 - n]:
+                n += 1
+            return n
+        n += step
+    return n
+
+
+def make_delta(old: str, new: str) -> List[DeltaOp]:
+    """Edit ops turning ``old`` into ``new``"""
+    # Edits are usually local: trim the common prefix and suffix first
+    limit = min(len(old), len(new))
+    prefix = _common_prefix(old, new, limit)
+    suffix = _common_suffix(old, new, limit - prefix)
+
+    old_mid = old[prefix:len(old) - suffix]
+    new_mid = new[prefix:len(new) - suffix]
+
+    ops: List[DeltaOp] = []
+    _append(ops, prefix)
+    if len(old_mid) * len(new_mid) > _MAX_DIFF_WORK:
+        _append(ops, -len(old_mid))
+        _append(ops, new_mid)
+    else:
+        matcher = SequenceMatcher(None, old_mid, new_mid, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                _append(ops, i2 - i1)
+                continue
+            _append(ops, -(i2 - i1))
+            _append(ops, new_mid[j1:j2])
+    _append(ops, suffix)
+    return ops
+
+
+def apply_delta(old: str, ops: List[DeltaOp]) -> str:
+    """Rebuild the new text from ``old`` and the ops of make_delta"""
+    parts = []
+    position = 0
+    for op in ops:
+        if isinstance(op, str):
+            parts.append(op)
+        elif op > 0:
+            parts.append(old[position:position + op])
+            position += op
+        else:
+            position -= op
+    return "".join(parts)
+
+
+def _append(ops: List[DeltaOp], op: DeltaOp) -> None:
+    if not op:
+        return
+    # Merge with the previous op of the same kind
+    if ops and type(ops[-1]) is type(op) and (
+        isinstance(op, str) or (ops[-1] > 0) == (op > 0)  # type: ignore[operator]
+    ):
+        ops[-1] += op  # type: ignore[operator]
+    else:
+        ops.append(op)
+
+
+class RevisionHistory:
+    """
+    Records a revision for every save of a file.
+
+    A revision normally stores only a delta against the one before it. A full
+    snapshot is stored every ``snapshot_interval`` revisions, or sooner once
+    the deltas since the last snapshot add up to more than the document, so
+    rebuilding a revision replays a bounded chain and storage grows with the
+    size of the edits. A save whose predecessor is missing from the history
+    (the file changed outside of it, or has no history yet) snapshots the
+    previous state first.
+    """
+
+    def __init__(self, snapshot_interval: int) -> None:
+        self.snapshot_interval = snapshot_interval
+
+    async def save(
+        self,
+        session: AsyncSession,
+        *,
+        owner_id: uuid.UUID,
+        file_id: uuid.UUID,
+        file_in: FileUpdate,
+        author_id: Optional[uuid.UUID] = None
+    ) -> Optional[File]:
+        """
+        Update a file and record the revision in the same transaction.
+
+        Returns:
+            The updated file (detached, without s3_key), or None if the user
+            has no such file
+        """
+        # One statement updates the file and reads the previous text and the
+        # state of the chain; the new text is file_in's own
+        row = await update_file_for_revision(
+            session, owner_id=owner_id, file_id=file_id, file_in=file_in)
+        if row is None:
+            await session.rollback()
+            return None
+
+        quill_content = file_in.quill_content
+        if quill_content is None:
+            quill_content = row.previous_quill_content
+        previous_text = row.previous_quill_content or ""
+        text = quill_content or ""
+        content_changed = row.content_sha256 != row.previous_sha256
+
+        if row.base_chain_length is None:
+            # Keep the state this save replaces as the base of the chain
+            await add_file_revision(session, FileRevision(
+                file_id=row.id,
+                version=row.version - 1,
+                snapshot=previous_text,
+                content_sha256=row.previous_sha256
+            ))
+            chain_length, chain_bytes = 0, 0
+        else:
+            chain_length, chain_bytes = row.base_chain_length, row.base_chain_bytes
+
+        delta = json.dumps(
+            await self._diff(previous_text, text), separators=(",", ":"))
+        revision = FileRevision(
+            file_id=row.id,
+            version=row.version,
+            author_id=author_id,
+            content_sha256=row.content_sha256 if content_changed else None
+        )
+        if chain_length + 1 >= self.snapshot_interval or \
+                chain_bytes + len(delta) > len(text):
+            revision.snapshot = text
+            revision.content_sha256 = row.content_sha256
+        else:
+            revision.delta = delta
+            revision.chain_length = chain_length + 1
+            revision.chain_bytes = chain_bytes + len(delta)
+        await add_file_revision(session, revision)
+
+        await session.commit()
+        return File(
+            id=row.id,
+            filename=row.filename,
+            content_sha256=row.content_sha256,
+            file_size=row.file_size,
+            mime_type=row.mime_type,
+            original_format=row.original_format,
+            quill_content=quill_content,
+            owner_id=row.owner_id,
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+            version=row.version
+        )
+
+    async def _diff(self, old: str, new: str) -> List[DeltaOp]:
+        if len(old) + len(new) <= _INLINE_DIFF_CHARS:
+            return make_delta(old, new)
+        return await asyncio.to_thread(make_delta, old, new)
+
+    async def rebuild(
+        self, session: AsyncSession, file_id: uuid.UUID, version: int
+    ) -> Optional[Tuple[FileRevision, str, Optional[str]]]:
+        """
+        Rebuild a revision from its nearest snapshot and the deltas after it.
+
+        Returns:
+            (revision, quill_content, content_sha256) or None if the version
+            is not in the history
+        """
+        chain = await get_file_revision_chain(
+            session, file_id=file_id, version=version)
+        if not chain:
+            return None
+
+        text = chain[0].snapshot or ""
+        content_sha256 = chain[0].content_sha256
+        for revision in chain[1:]:
+            text = apply_delta(text, json.loads(revision.delta or "[]"))
+            content_sha256 = revision.content_sha256 or content_sha256
+        return chain[-1], text, content_sha256
+
+
+# Global revision history instance
+revision_history = RevisionHistory(
+    snapshot_interval=settings.REVISION_SNAPSHOT_INTERVAL)
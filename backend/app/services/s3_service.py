@@ -1,9 +1,20 @@
+import asyncio
 import boto3
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from botocore.config import Config
 from botocore.exceptions import ClientError
-from typing import Optional, List
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
 from app.core.config import settings
 
+T = TypeVar("T")
+
+# Most keys S3 accepts in one DeleteObjects request, and returns per
+# ListObjectsV2 page
+DELETE_OBJECTS_BATCH_SIZE = 1000
+LIST_OBJECTS_PAGE_SIZE = 1000
+
 
 class S3Service:
     def __init__(self):
@@ -11,7 +22,8 @@ class S3Service:
             's3',
             aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
             aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_REGION
+            region_name=settings.AWS_REGION,
+            config=Config(max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS)
         )
         self.bucket_name = settings.S3_BUCKET_NAME
 
@@ -24,6 +36,80 @@ class S3Service:
             print(f"Error uploading file: {e}")
             return False
 
+    def put_object(
+        self, s3_key: str, data: bytes, content_type: Optional[str] = None
+    ) -> bool:
+        """Upload an in-memory object to S3 with a single PUT"""
+        params = {'Bucket': self.bucket_name, 'Key': s3_key, 'Body': data}
+        if content_type:
+            params['ContentType'] = content_type
+        try:
+            self.s3_client.put_object(**params)
+            return True
+        except ClientError as e:
+            print(f"Error putting object: {e}")
+            return False
+
+    def create_multipart_upload(
+        self, s3_key: str, content_type: Optional[str] = None
+    ) -> Optional[str]:
+        """Start a multipart upload and return its upload id"""
+        params = {'Bucket': self.bucket_name, 'Key': s3_key}
+        if content_type:
+            params['ContentType'] = content_type
+        try:
+            response = self.s3_client.create_multipart_upload(**params)
+            return response['UploadId']
+        except ClientError as e:
+            print(f"Error starting multipart upload: {e}")
+            return None
+
+    def upload_part(
+        self, s3_key: str, upload_id: str, part_number: int, data: bytes
+    ) -> Optional[str]:
+        """Upload a single part of a multipart upload and return its ETag"""
+        try:
+            response = self.s3_client.upload_part(
+                Bucket=self.bucket_name,
+                Key=s3_key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=data
+            )
+            return response['ETag']
+        except ClientError as e:
+            print(f"Error uploading part {part_number}: {e}")
+            return None
+
+    def complete_multipart_upload(
+        self, s3_key: str, upload_id: str, parts: List[Dict[str, Any]]
+    ) -> bool:
+        """Complete a multipart upload from a list of {PartNumber, ETag} dicts"""
+        try:
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=s3_key,
+                UploadId=upload_id,
+                MultipartUpload={
+                    'Parts': sorted(parts, key=lambda p: p['PartNumber'])}
+            )
+            return True
+        except ClientError as e:
+            print(f"Error completing multipart upload: {e}")
+            return False
+
+    def abort_multipart_upload(self, s3_key: str, upload_id: str) -> bool:
+        """Abort a multipart upload and discard its uploaded parts"""
+        try:
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.bucket_name, Key=s3_key, UploadId=upload_id)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "NoSuchUpload":
+                return True  # Already completed or aborted
+            print(f"Error aborting multipart upload: {e}")
+            return False
+
     def download_file(self, s3_key: str, local_path: str) -> bool:
         """Download a file from S3"""
         try:
@@ -33,6 +119,61 @@ class S3Service:
             print(f"Error downloading file: {e}")
             return False
 
+    def get_object_bytes(self, s3_key: str) -> Optional[bytes]:
+        """Read a whole object from S3 into memory"""
+        try:
+            response = self.s3_client.get_object(
+                Bucket=self.bucket_name, Key=s3_key)
+            return response['Body'].read()
+        except ClientError as e:
+            print(f"Error reading file: {e}")
+            return None
+
+    def get_object(
+        self,
+        s3_key: str,
+        byte_range: Optional[str] = None,
+        if_match: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Open an object for streaming. The returned response holds the
+        unread "Body" stream plus ContentLength, ContentRange, ETag, ...
+
+        Args:
+            s3_key: Object key
+            byte_range: HTTP Range value, e.g. "bytes=0-1023"
+            if_match: Only return the object if its ETag matches
+        """
+        params = {'Bucket': self.bucket_name, 'Key': s3_key}
+        if byte_range:
+            params['Range'] = byte_range
+        if if_match:
+            params['IfMatch'] = if_match
+        try:
+            return self.s3_client.get_object(**params)
+        except ClientError as e:
+            print(f"Error opening file: {e}")
+            return None
+
+    def get_object_if_modified(
+        self, s3_key: str, etag: str
+    ) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Conditionally open an object with If-None-Match.
+
+        Returns:
+            (False, None) when the object still has ``etag``, otherwise
+            (True, response) -- response is None if the request failed
+        """
+        try:
+            return True, self.s3_client.get_object(
+                Bucket=self.bucket_name, Key=s3_key, IfNoneMatch=etag)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('304', 'NotModified'):
+                return False, None
+            print(f"Error opening file: {e}")
+            return True, None
+
     def get_file_url(self, s3_key: str, expires_in: int = 3600) -> Optional[str]:
         """Generate a presigned URL for file access"""
         try:
@@ -46,16 +187,67 @@ class S3Service:
             print(f"Error generating URL: {e}")
             return None
 
-    def list_files(self, prefix: str = "") -> List[str]:
-        """List files in S3 bucket"""
+    def get_upload_post(
+        self,
+        s3_key: str,
+        content_type: str,
+        file_size: int,
+        expires_in: int = 3600
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Generate a presigned POST that lets a client upload exactly
+        ``file_size`` bytes of ``content_type`` to ``s3_key``.
+
+        Returns:
+            Dict with the form "url" and the "fields" to post with the file
+        """
         try:
-            response = self.s3_client.list_objects_v2(
+            return self.s3_client.generate_presigned_post(
                 Bucket=self.bucket_name,
-                Prefix=prefix
+                Key=s3_key,
+                Fields={'Content-Type': content_type},
+                Conditions=[
+                    {'Content-Type': content_type},
+                    ['content-length-range', file_size, file_size]
+                ],
+                ExpiresIn=expires_in
             )
-            if 'Contents' in response:
-                return [obj['Key'] for obj in response['Contents']]
-            return []
+        except ClientError as e:
+            print(f"Error generating upload form: {e}")
+            return None
+
+    def head_object(self, s3_key: str) -> Optional[Dict[str, Any]]:
+        """Get an object's metadata (ContentLength, ETag, ContentType, ...)"""
+        try:
+            return self.s3_client.head_object(
+                Bucket=self.bucket_name, Key=s3_key)
+        except ClientError as e:
+            print(f"Error reading object metadata: {e}")
+            return None
+
+    def iter_objects(
+        self, prefix: str = "", page_size: int = LIST_OBJECTS_PAGE_SIZE
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every object under a prefix (Key, Size, LastModified, ...) in
+        key order, fetching one page of ``page_size`` at a time.
+
+        Unlike list_files, errors are raised: a listing cut short must not
+        pass for a complete one.
+        """
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        pages = paginator.paginate(
+            Bucket=self.bucket_name,
+            Prefix=prefix,
+            PaginationConfig={'PageSize': page_size}
+        )
+        for page in pages:
+            yield from page.get('Contents', [])
+
+    def list_files(self, prefix: str = "") -> List[str]:
+        """List files in S3 bucket"""
+        try:
+            return [obj['Key'] for obj in self.iter_objects(prefix)]
         except ClientError as e:
             print(f"Error listing files: {e}")
             return []
@@ -69,6 +261,159 @@ class S3Service:
             print(f"Error deleting file: {e}")
             return False
 
+    def delete_files(self, s3_keys: List[str]) -> Dict[str, str]:
+        """
+        Delete many objects with DeleteObjects, up to 1000 keys per request.
+
+        Returns:
+            Error message per key that could not be deleted (empty if all were)
+        """
+        errors: Dict[str, str] = {}
+        for start in range(0, len(s3_keys), DELETE_OBJECTS_BATCH_SIZE):
+            batch = s3_keys[start:start + DELETE_OBJECTS_BATCH_SIZE]
+            try:
+                response = self.s3_client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={
+                        'Objects': [{'Key': key} for key in batch],
+                        'Quiet': True
+                    }
+                )
+            except ClientError as e:
+                print(f"Error deleting files: {e}")
+                errors.update((key, str(e)) for key in batch)
+                continue
+            for error in response.get('Errors', []):
+                errors[error['Key']] = error.get('Message') or error.get('Code', '')
+        return errors
+
+
+class AsyncS3Service:
+    """
+    Awaitable S3 operations for async routes.
+
+    boto3 is blocking, so every call runs on a dedicated bounded thread pool
+    sized to the client's connection pool. All calls share the single
+    S3Service client (boto3 clients are thread-safe) and therefore one pool
+    of HTTP connections, and never occupy the event loop or the default
+    threadpool used by sync routes.
+    """
+
+    def __init__(self, service: S3Service, max_workers: int):
+        self.service = service
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="s3")
+
+    async def _run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, partial(fn, *args, **kwargs))
+
+    def shutdown(self) -> None:
+        """Stop the executor threads (called on application shutdown)"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def upload_file(self, file_path: str, s3_key: str) -> bool:
+        return await self._run(self.service.upload_file, file_path, s3_key)
+
+    async def put_object(
+        self, s3_key: str, data: bytes, content_type: Optional[str] = None
+    ) -> bool:
+        return await self._run(
+            self.service.put_object, s3_key, data, content_type)
+
+    async def create_multipart_upload(
+        self, s3_key: str, content_type: Optional[str] = None
+    ) -> Optional[str]:
+        return await self._run(
+            self.service.create_multipart_upload, s3_key, content_type)
+
+    async def upload_part(
+        self, s3_key: str, upload_id: str, part_number: int, data: bytes
+    ) -> Optional[str]:
+        return await self._run(
+            self.service.upload_part, s3_key, upload_id, part_number, data)
+
+    async def complete_multipart_upload(
+        self, s3_key: str, upload_id: str, parts: List[Dict[str, Any]]
+    ) -> bool:
+        return await self._run(
+            self.service.complete_multipart_upload, s3_key, upload_id, parts)
+
+    async def abort_multipart_upload(self, s3_key: str, upload_id: str) -> bool:
+        return await self._run(
+            self.service.abort_multipart_upload, s3_key, upload_id)
+
+    async def download_file(self, s3_key: str, local_path: str) -> bool:
+        return await self._run(self.service.download_file, s3_key, local_path)
+
+    async def get_object_bytes(self, s3_key: str) -> Optional[bytes]:
+        return await self._run(self.service.get_object_bytes, s3_key)
+
+    async def get_object(
+        self,
+        s3_key: str,
+        byte_range: Optional[str] = None,
+        if_match: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        return await self._run(
+            self.service.get_object, s3_key, byte_range, if_match)
+
+    async def get_object_if_modified(
+        self, s3_key: str, etag: str
+    ) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        return await self._run(self.service.get_object_if_modified, s3_key, etag)
+
+    async def read_body(self, body: Any) -> bytes:
+        """Read a whole object body from get_object, closing it after"""
+        try:
+            return await self._run(body.read)
+        finally:
+            body.close()
+
+    async def iter_body(
+        self, body: Any, chunk_size: int = 64 * 1024
+    ) -> AsyncIterator[bytes]:
+        """Yield an object body from get_object in chunks, closing it after"""
+        try:
+            while True:
+                chunk = await self._run(body.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+    async def get_file_url(
+        self, s3_key: str, expires_in: int = 3600
+    ) -> Optional[str]:
+        return await self._run(self.service.get_file_url, s3_key, expires_in)
+
+    async def get_upload_post(
+        self,
+        s3_key: str,
+        content_type: str,
+        file_size: int,
+        expires_in: int = 3600
+    ) -> Optional[Dict[str, Any]]:
+        return await self._run(
+            self.service.get_upload_post, s3_key, content_type, file_size,
+            expires_in)
+
+    async def head_object(self, s3_key: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self.service.head_object, s3_key)
+
+    async def list_files(self, prefix: str = "") -> List[str]:
+        return await self._run(self.service.list_files, prefix)
+
+    async def delete_file(self, s3_key: str) -> bool:
+        return await self._run(self.service.delete_file, s3_key)
+
+    async def delete_files(self, s3_keys: List[str]) -> Dict[str, str]:
+        return await self._run(self.service.delete_files, s3_keys)
+
 
-# Global S3 service instance
+# Global S3 service instances
 s3_service = S3Service()
+async_s3_service = AsyncS3Service(
+    s3_service, max_workers=settings.S3_MAX_POOL_CONNECTIONS)
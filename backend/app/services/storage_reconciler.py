@@ -0,0 +1,138 @@
+"""Finds, and optionally purges, S3 objects no database row refers to"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import union
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.models import Blob, File, StorageOutbox, UploadSession
+from app.services.s3_service import DELETE_OBJECTS_BATCH_SIZE, S3Service, s3_service
+
+# Where the app stores objects: direct uploads per user, and shared blobs
+DEFAULT_PREFIXES = ("users/", "blobs/")
+
+
+@dataclass
+class ReconcileReport:
+    scanned: int = 0
+    scanned_bytes: int = 0
+    orphans: int = 0
+    orphan_bytes: int = 0
+    # Orphan candidates left alone because they may still be uploading
+    skipped_recent: int = 0
+    purged: int = 0
+    errors: Dict[str, str] = field(default_factory=dict)
+    sample: List[str] = field(default_factory=list)  # First orphan keys found
+
+
+class StorageReconciler:
+    """
+    Compares the bucket against every table holding S3 keys (files, blobs,
+    upload sessions and the storage outbox).
+
+    Both sides are streamed in key order and merged, so memory stays bounded
+    by one listing page plus one batch of rows however large the bucket is.
+    S3 lists keys in UTF-8 byte order; the database side is sorted with the
+    "C" collation to match.
+    """
+
+    def __init__(
+        self,
+        s3: S3Service,
+        *,
+        batch_size: int = DELETE_OBJECTS_BATCH_SIZE,
+        sample_size: int = 20,
+    ) -> None:
+        self.s3 = s3
+        self.batch_size = batch_size
+        self.sample_size = sample_size
+
+    def run(
+        self,
+        prefixes: Sequence[str] = DEFAULT_PREFIXES,
+        *,
+        purge: bool = False,
+        min_age: Optional[timedelta] = None,
+    ) -> ReconcileReport:
+        """
+        Scan the objects under each of ``prefixes``.
+
+        Args:
+            prefixes: Key prefixes to reconcile (must not overlap)
+            purge: Delete the orphans (in DeleteObjects batches) instead of
+                only reporting them
+            min_age: Objects modified more recently are never orphans, as
+                their row may not be committed yet (defaults to the upload
+                grace period)
+        """
+        if min_age is None:
+            min_age = timedelta(seconds=settings.STORAGE_UPLOAD_GRACE_SECONDS)
+        cutoff = datetime.now(timezone.utc) - min_age
+        report = ReconcileReport()
+        pending: List[str] = []
+
+        with Session(engine) as session:
+            for prefix in prefixes:
+                referenced = self._iter_referenced_keys(session, prefix)
+                objects = self.s3.iter_objects(prefix)
+                for obj in self._iter_orphans(objects, referenced, report):
+                    if obj["LastModified"] > cutoff:
+                        report.skipped_recent += 1
+                        continue
+                    report.orphans += 1
+                    report.orphan_bytes += obj["Size"]
+                    if len(report.sample) < self.sample_size:
+                        report.sample.append(obj["Key"])
+                    if purge:
+                        pending.append(obj["Key"])
+                        if len(pending) >= self.batch_size:
+                            self._purge(pending, report)
+                            pending = []
+        if pending:
+            self._purge(pending, report)
+        return report
+
+    def _iter_orphans(
+        self,
+        objects: Iterator[Dict[str, Any]],
+        referenced: Iterator[str],
+        report: ReconcileReport,
+    ) -> Iterator[Dict[str, Any]]:
+        # Merge of two sorted streams: advance the referenced keys up to
+        # each listed key
+        key = next(referenced, None)
+        for obj in objects:
+            report.scanned += 1
+            report.scanned_bytes += obj["Size"]
+            while key is not None and key < obj["Key"]:
+                key = next(referenced, None)
+            if key != obj["Key"]:
+                yield obj
+
+    def _iter_referenced_keys(self, session: Session, prefix: str) -> Iterator[str]:
+        columns = (File.s3_key, Blob.s3_key, UploadSession.s3_key, StorageOutbox.s3_key)
+        keys = union(*(
+            select(column.label("s3_key")).where(  # type: ignore[union-attr]
+                column.startswith(prefix, autoescape=True))  # type: ignore[union-attr]
+            for column in columns
+        )).subquery()
+        statement = (
+            select(keys.c.s3_key)
+            .order_by(keys.c.s3_key.collate("C"))
+            .execution_options(yield_per=self.batch_size)
+        )
+        # Server-side cursor: rows arrive in batches, never all at once
+        yield from session.exec(statement)
+
+    def _purge(self, s3_keys: List[str], report: ReconcileReport) -> None:
+        errors = self.s3.delete_files(s3_keys)
+        report.errors.update(errors)
+        report.purged += len(s3_keys) - len(errors)
+
+
+# Global storage reconciler instance
+storage_reconciler = StorageReconciler(s3_service)
@@ -0,0 +1,163 @@
+"""Background deletion of queued S3 objects and expired multipart uploads"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.db import async_session
+from app.crud import (
+    claim_storage_deletes,
+    enqueue_storage_deletes,
+    finish_storage_deletes,
+    lock_expired_upload_sessions,
+)
+from app.services.s3_service import async_s3_service
+
+# Expired upload sessions aborted per transaction (one S3 call each, made
+# while their rows are locked)
+UPLOAD_ABORT_BATCH_SIZE = 100
+
+
+class StorageSweeper:
+    """
+    Drains the storage_outbox table so requests never wait on S3 deletes,
+    and aborts resumable upload sessions left unfinished past their TTL.
+
+    Due rows are claimed in batches of up to ``batch_size`` and their objects
+    removed with one DeleteObjects call per batch. Failed deletes are retried
+    with exponential backoff from ``retry_base_seconds`` up to
+    ``retry_max_seconds``. Each app process runs a sweeper; claims are leased,
+    so concurrent sweepers never work on the same rows.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        interval_seconds: float,
+        lease_seconds: int,
+        retry_base_seconds: int,
+        retry_max_seconds: int,
+        upload_session_ttl_seconds: int,
+    ) -> None:
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.lease = timedelta(seconds=lease_seconds)
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.upload_session_ttl = timedelta(seconds=upload_session_ttl_seconds)
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.deleted = 0
+        self.failed = 0
+        self.aborted_uploads = 0
+
+    def start(self) -> None:
+        """Start sweeping in the background (called on application startup)"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def shutdown(self) -> None:
+        """Stop sweeping; claimed rows are picked up again once their lease ends"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def wake(self) -> None:
+        """Sweep now instead of at the next interval, e.g. after queueing deletes"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def sweep(self) -> int:
+        """Process one batch of due deletes and return how many were claimed"""
+        async with async_session() as session:
+            claimed = await claim_storage_deletes(
+                session, limit=self.batch_size, lease=self.lease)
+            if not claimed:
+                return 0
+
+            errors = await async_s3_service.delete_files(
+                list({row.s3_key for row in claimed}))
+            now = datetime.utcnow()
+            failed = {
+                row.id: (errors[row.s3_key], now + self._backoff(row.attempts))
+                for row in claimed
+                if row.s3_key in errors
+            }
+            deleted = [row.id for row in claimed if row.id not in failed]
+            await finish_storage_deletes(session, deleted=deleted, failed=failed)
+
+        self.deleted += len(deleted)
+        self.failed += len(failed)
+        return len(claimed)
+
+    async def abort_expired_uploads(self) -> int:
+        """Abort one batch of expired upload sessions and return how many"""
+        async with async_session() as session:
+            expired = await lock_expired_upload_sessions(
+                session,
+                created_before=datetime.utcnow() - self.upload_session_ttl,
+                limit=UPLOAD_ABORT_BATCH_SIZE
+            )
+            aborted = 0
+            for upload_session in expired:
+                # A failed abort keeps the row, so it is retried next time
+                if await async_s3_service.abort_multipart_upload(
+                    upload_session.s3_key, upload_session.upload_id
+                ):
+                    # The upload may have been assembled by a completion that
+                    # never committed; a completed session is gone, so no
+                    # file refers to the object
+                    enqueue_storage_deletes(session, [upload_session.s3_key])
+                    await session.delete(upload_session)
+                    aborted += 1
+            await session.commit()
+
+        self.aborted_uploads += aborted
+        return aborted
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "deleted": self.deleted,
+            "failed": self.failed,
+            "aborted_uploads": self.aborted_uploads,
+        }
+
+    def _backoff(self, attempts: int) -> timedelta:
+        seconds = self.retry_base_seconds * 2 ** min(attempts - 1, 30)
+        return timedelta(seconds=min(seconds, self.retry_max_seconds))
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            try:
+                claimed = await self.sweep()
+            except Exception as e:
+                # Database or S3 unavailable: the rows stay queued
+                print(f"Storage sweep failed: {e}")
+                claimed = 0
+            if claimed < self.batch_size:
+                try:
+                    await self.abort_expired_uploads()
+                except Exception as e:
+                    print(f"Upload session sweep failed: {e}")
+                # Caught up: wait for new deletes or the next interval
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), timeout=self.interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+
+# Global storage sweeper instance
+storage_sweeper = StorageSweeper(
+    batch_size=settings.STORAGE_SWEEP_BATCH_SIZE,
+    interval_seconds=settings.STORAGE_SWEEP_INTERVAL_SECONDS,
+    lease_seconds=settings.STORAGE_SWEEP_LEASE_SECONDS,
+    retry_base_seconds=settings.STORAGE_SWEEP_RETRY_BASE_SECONDS,
+    retry_max_seconds=settings.STORAGE_SWEEP_RETRY_MAX_SECONDS,
+    upload_session_ttl_seconds=settings.UPLOAD_SESSION_TTL_SECONDS
+)
@@ -0,0 +1,105 @@
+"""In-process cache of verified access tokens and their users"""
+
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Generic, Optional, Tuple, TypeVar
+
+from app.core.config import settings
+from app.models import User
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class _LRU(Generic[K, V]):
+    """Size-bounded LRU whose entries each carry their own expiry"""
+
+    def __init__(self, max_entries: Optional[int]) -> None:
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key: K, now: float) -> Optional[V]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: K, value: V, expires_at: float) -> None:
+        self.entries[key] = (expires_at, value)
+        self.entries.move_to_end(key)
+        if self.max_entries is not None:
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+
+class UserCache:
+    """
+    Caches what get_current_user works out for each request: the user id a
+    token was verified for (until the token expires) and active users by id
+    (for ``ttl_seconds``), so repeat requests skip both the JWT decoding and
+    the user lookup.
+
+    Call ``invalidate`` whenever a user is changed or deactivated. Entries
+    are per process, so other workers pick the change up within the TTL.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: Optional[int]) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._tokens: _LRU[str, uuid.UUID] = _LRU(max_entries)
+        self._users: _LRU[uuid.UUID, User] = _LRU(max_entries)
+        self.hits = 0
+        self.misses = 0
+
+    def get_token_subject(self, token: str) -> Optional[uuid.UUID]:
+        """User id of a token verified before, None if it must be decoded"""
+        return self._tokens.get(token, time.time())
+
+    def set_token_subject(self, token: str, user_id: uuid.UUID, expires_at: float) -> None:
+        """Remember a verified token until ``expires_at`` (a Unix time)"""
+        self._tokens.set(token, user_id, expires_at)
+
+    def get_user(self, user_id: uuid.UUID) -> Optional[User]:
+        user = self._users.get(user_id, time.time())
+        if user is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return user
+
+    def set_user(self, user: User) -> None:
+        """Cache a user; it must be detached from its session (it is shared)"""
+        if user.is_active:
+            self._users.set(user.id, user, time.time() + self.ttl_seconds)
+
+    def invalidate(self, user_id: uuid.UUID) -> None:
+        """Forget a user, e.g. after it was updated or deactivated"""
+        self._users.entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._tokens.entries.clear()
+        self._users.entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self._tokens.evictions + self._users.evictions,
+            "tokens": len(self._tokens.entries),
+            "users": len(self._users.entries),
+        }
+
+
+# Global user cache instance
+user_cache = UserCache(
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+    max_entries=settings.USER_CACHE_MAX_ENTRIES
+)
@@ -1,29 +1,138 @@
 import asyncio
-import json
-from typing import Dict, List, Any
+from collections import Counter, deque
+from typing import Deque, Dict, Literal, Optional, Set, Tuple, Any
 
 from fastapi import WebSocket
 
+from app.core import json_codec
+from app.core.config import settings
+
+# Messages a lagging client can lose without harm: a newer one supersedes them
+DROPPABLE_TYPES = frozenset({"cursor_move"})
+
+
+class _Connection:
+    """A collaborator's socket with its bounded outbound queue"""
+
+    def __init__(self, websocket: WebSocket, file_id: str, user_id: str) -> None:
+        self.websocket = websocket
+        self.file_id = file_id
+        self.user_id = user_id
+        # (droppable, frame) in send order
+        self.queue: Deque[Tuple[bool, str]] = deque()
+        self.ready = asyncio.Event()
+        self.sender: Optional["asyncio.Task[None]"] = None
+
+
+class _Room:
+    """The connections editing one file"""
 
-class FileConnectionManager:
     def __init__(self) -> None:
-        # Track connections per file: {file_id: [websocket_connections]}
-        self.file_connections: Dict[str, List[WebSocket]
-                                    ] = Dict[str, List[WebSocket]]()
-        # Track user info per connection: {websocket: {"user_id": str, "file_id": str}}
-        self.connection_info: Dict[WebSocket,
-                                   Dict[str, str]] = Dict[WebSocket, Dict[str, str]]()
-
-    async def connect_to_file(self, websocket: WebSocket, file_id: str, user_id: str) -> None:
-        """Connect a user to a specific file for collaboration"""
+        self.connections: Set[_Connection] = set()
+        # Connections per user: {user_id: count}
+        self.users: Counter[str] = Counter()
+        # Latest cursor_move of each connection since the last flush (a
+        # user editing in two tabs has two cursors), as encoded frames
+        self.cursors: Dict[_Connection, str] = {}
+        self.cursor_flush: Optional[asyncio.TimerHandle] = None
+
+
+class FileConnectionManager:
+    """
+    Process-wide registry of the WebSocket connections editing each file.
+
+    One instance (``file_connection_manager``) is shared by every request so
+    broadcasts reach all editors of a file connected to this process. Rooms
+    are sets, so joining and leaving are O(1) however large the room.
+
+    Every connection has a queue of at most ``queue_size`` outbound messages
+    drained by its own sender task, so broadcasting never waits on a client
+    and a slow one cannot hold up the rest of the room. When a queue is full,
+    ``full_queue_policy`` decides: "drop_oldest" drops the oldest queued
+    cursor update (the client is disconnected only once its queue holds
+    nothing droppable), "disconnect" closes the slow client right away.
+
+    cursor_move messages are not relayed as they arrive: a room keeps only
+    each connection's latest cursor and relays those once per tick, so a
+    client moving its cursor faster than the tick costs the room nothing
+    extra. Rooms of up to ``cursor_full_rate_users`` connections tick at
+    ``cursor_tick_hz``; larger rooms tick proportionally slower, down to
+    ``cursor_min_tick_hz``, so cursor traffic per client stays bounded
+    however many people move their cursor.
+    """
+
+    def __init__(
+        self,
+        queue_size: int,
+        full_queue_policy: Literal["drop_oldest", "disconnect"],
+        send_timeout: float,
+        cursor_tick_hz: float,
+        cursor_min_tick_hz: float,
+        cursor_full_rate_users: int,
+    ) -> None:
+        self.queue_size = queue_size
+        self.full_queue_policy = full_queue_policy
+        self.send_timeout = send_timeout
+        self.cursor_tick_hz = cursor_tick_hz
+        self.cursor_min_tick_hz = cursor_min_tick_hz
+        self.cursor_full_rate_users = cursor_full_rate_users
+        self.rooms: Dict[str, _Room] = {}
+        self.connections: Dict[WebSocket, _Connection] = {}
+        self.accepting = False
+        self.dropped = 0
+        self.slow_disconnects = 0
+        self.cursors_received = 0
+        self.cursor_flushes = 0
+
+    def start(self) -> None:
+        """Start accepting connections (called on application startup)"""
+        self.accepting = True
+
+    async def shutdown(self) -> None:
+        """Close every connection (called on application shutdown)"""
+        self.accepting = False
+        connections = list(self.connections.values())
+        for room in self.rooms.values():
+            if room.cursor_flush is not None:
+                room.cursor_flush.cancel()
+        self.rooms.clear()
+        self.connections.clear()
+        for connection in connections:
+            if connection.sender is not None:
+                connection.sender.cancel()
+            try:
+                await connection.websocket.close(code=1001, reason="Server shutting down")
+            except Exception:
+                pass
+
+    async def connect_to_file(self, websocket: WebSocket, file_id: str, user_id: str) -> bool:
+        """
+        Connect a user to a specific file for collaboration. Returns False if
+        the connection was refused because the server is shutting down.
+        """
+        if not self.accepting:
+            await websocket.close(code=1001, reason="Server shutting down")
+            return False
+
         await websocket.accept()
 
-        if file_id not in self.file_connections:
-            self.file_connections[file_id] = []
+        connection = _Connection(websocket, file_id, user_id)
+        connection.sender = asyncio.create_task(self._send_loop(connection))
+        self.connections[websocket] = connection
+        room = self.rooms.setdefault(file_id, _Room())
+        room.connections.add(connection)
+        room.users[user_id] += 1
 
-        self.file_connections[file_id].append(websocket)
-        self.connection_info[websocket] = {
-            "user_id": user_id, "file_id": file_id}
+        # Send confirmation to the user who just connected
+        await self.send_to_user(
+            websocket,
+            {
+                "type": "connected",
+                "message": f"Connected to file {file_id}",
+                "file_id": file_id,
+                "user_id": user_id,
+            }
+        )
 
         # Notify other users that someone joined this file
         await self.broadcast_to_file(
@@ -36,101 +145,124 @@ class FileConnectionManager:
             },
             exclude_websocket=websocket,
         )
+        return True
 
-        # Send confirmation to the user who just connected
-        await websocket.send_text(
-            json.dumps(
+    def disconnect_from_file(self, websocket: WebSocket) -> None:
+        """Disconnect a user from a file"""
+        connection = self.connections.pop(websocket, None)
+        if connection is None:
+            return
+        file_id = connection.file_id
+        user_id = connection.user_id
+        if connection.sender is not None and connection.sender is not asyncio.current_task():
+            connection.sender.cancel()
+
+        # Remove from file connections
+        room = self.rooms.get(file_id)
+        if room is not None:
+            room.connections.discard(connection)
+            room.cursors.pop(connection, None)
+            room.users[user_id] -= 1
+            if room.users[user_id] <= 0:
+                del room.users[user_id]
+            if not room.connections:
+                if room.cursor_flush is not None:
+                    room.cursor_flush.cancel()
+                del self.rooms[file_id]
+
+        # Notify other users that someone left
+        asyncio.create_task(
+            self.broadcast_to_file(
+                file_id,
                 {
-                    "type": "connected",
-                    "message": f"Connected to file {file_id}",
-                    "file_id": file_id,
+                    "type": "user_left",
                     "user_id": user_id,
-                }
+                    "file_id": file_id,
+                    "timestamp": asyncio.get_running_loop().time(),
+                },
             )
         )
 
-    def disconnect_from_file(self, websocket: WebSocket) -> None:
-        """Disconnect a user from a file"""
-        if websocket in self.connection_info:
-            info = self.connection_info[websocket]
-            file_id = info["file_id"]
-            user_id = info["user_id"]
-
-            # Remove from file connections
-            if file_id in self.file_connections:
-                self.file_connections[file_id].remove(websocket)
-                if not self.file_connections[file_id]:
-                    del self.file_connections[file_id]
-
-            # Remove connection info
-            del self.connection_info[websocket]
-
-            # Notify other users that someone left
-            asyncio.create_task(
-                self.broadcast_to_file(
-                    file_id,
-                    {
-                        "type": "user_left",
-                        "user_id": user_id,
-                        "file_id": file_id,
-                        "timestamp": asyncio.get_running_loop().time(),
-                    },
-                )
-            )
-
     async def broadcast_to_file(
         self, file_id: str, message: dict[str, Any], exclude_websocket: WebSocket | None = None
     ) -> None:
-        """Send message to all users connected to a specific file"""
-        if file_id in self.file_connections:
-            for connection in self.file_connections[file_id]:
-                if connection != exclude_websocket:
-                    try:
-                        await connection.send_text(json.dumps(message))
-                    except Exception as e:
-                        # Remove broken connection
-                        print(f"Error broadcasting to connection: {e}")
-                        self.disconnect_from_file(connection)
+        """Queue a message for all users connected to a specific file"""
+        self.broadcast_frame(
+            file_id,
+            json_codec.dumps(message),
+            droppable=message.get("type") in DROPPABLE_TYPES,
+            exclude_websocket=exclude_websocket,
+        )
+
+    def broadcast_frame(
+        self,
+        file_id: str,
+        frame: str,
+        *,
+        droppable: bool = False,
+        exclude_websocket: WebSocket | None = None,
+    ) -> None:
+        """
+        Queue an already encoded message for everyone in a file's room. The
+        same frame is shared by all recipients, so it is encoded only once.
+        """
+        room = self.rooms.get(file_id)
+        if room is None:
+            return
+        slow = []
+        for connection in room.connections:
+            if connection.websocket is not exclude_websocket:
+                if not self._enqueue(connection, frame, droppable):
+                    slow.append(connection)
+        # Disconnect after the loop: it changes the room
+        for connection in slow:
+            self._disconnect_slow(connection)
 
     async def send_to_user(self, websocket: WebSocket, message: dict[str, Any]) -> None:
-        """Send message to a specific user"""
+        """Send message to a specific user (queued behind earlier messages)"""
+        connection = self.connections.get(websocket)
+        if connection is not None:
+            droppable = message.get("type") in DROPPABLE_TYPES
+            if not self._enqueue(connection, json_codec.dumps(message), droppable):
+                self._disconnect_slow(connection)
+            return
+
         try:
-            await websocket.send_text(json.dumps(message))
+            await websocket.send_text(json_codec.dumps(message))
         except Exception as e:
             print(f"Error sending to user: {e}")
-            # Connection is broken, disconnect
-            if websocket in self.connection_info:
-                self.disconnect_from_file(websocket)
 
     def get_file_users(self, file_id: str) -> list[str]:
-        """Get list of user IDs currently editing a file"""
-        if file_id in self.file_connections:
-            return [
-                self.connection_info[conn]["user_id"]
-                for conn in self.file_connections[file_id]
-            ]
-        return []
-
-    async def handle_file_message(self, websocket: WebSocket, message: dict[str, Any]) -> None:
-        """Handle incoming messages from file collaborators"""
+        """Get the IDs of the users currently editing a file (once each)"""
+        room = self.rooms.get(file_id)
+        return list(room.users) if room is not None else []
+
+    async def handle_file_message(
+        self, websocket: WebSocket, message: dict[str, Any], raw: str | None = None
+    ) -> None:
+        """
+        Handle incoming messages from file collaborators. ``raw`` is the text
+        the message was parsed from; relayed messages are forwarded as is
+        instead of being encoded again.
+        """
         try:
             message_type = message.get("type")
 
             if message_type == "file_update":
                 # Broadcast file changes to other users
-                if websocket in self.connection_info:
-                    file_id = self.connection_info[websocket]["file_id"]
-                    await self.broadcast_to_file(
-                        file_id, message, exclude_websocket=websocket
+                if websocket in self.connections:
+                    file_id = self.connections[websocket].file_id
+                    self.broadcast_frame(
+                        file_id,
+                        raw if raw is not None else json_codec.dumps(message),
+                        exclude_websocket=websocket,
                     )
 
             elif message_type == "cursor_move":
-                # Broadcast cursor position updates
-                if websocket in self.connection_info:
-                    file_id = self.connection_info[websocket]["file_id"]
-                    await self.broadcast_to_file(
-                        file_id, message, exclude_websocket=websocket
-                    )
+                # Sent to the other users with the room's next cursor batch
+                connection = self.connections.get(websocket)
+                if connection is not None:
+                    self._queue_cursor(connection, message)
 
             elif message_type == "ping":
                 # Respond to ping with pong
@@ -142,3 +274,112 @@ class FileConnectionManager:
                 websocket, {"type": "error",
                             "message": "Failed to process message"}
             )
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "connections": len(self.connections),
+            "rooms": len(self.rooms),
+            "queued": sum(len(c.queue) for c in self.connections.values()),
+            "dropped": self.dropped,
+            "slow_disconnects": self.slow_disconnects,
+            "cursors_received": self.cursors_received,
+            "cursor_flushes": self.cursor_flushes,
+        }
+
+    def cursor_interval(self, room_size: int) -> float:
+        """Seconds between cursor batches in a room of ``room_size`` connections"""
+        hz = self.cursor_tick_hz
+        if room_size > self.cursor_full_rate_users:
+            hz = max(self.cursor_min_tick_hz,
+                     hz * self.cursor_full_rate_users / room_size)
+        return 1.0 / hz
+
+    def _queue_cursor(self, connection: _Connection, message: dict[str, Any]) -> None:
+        room = self.rooms.get(connection.file_id)
+        if room is None:
+            return
+        self.cursors_received += 1
+        # Attributed to the sending connection, whatever the client claimed;
+        # encoded once here, the frame is shared by every recipient
+        room.cursors[connection] = json_codec.dumps(
+            {**message, "user_id": connection.user_id})
+        if room.cursor_flush is None:
+            room.cursor_flush = asyncio.get_running_loop().call_later(
+                self.cursor_interval(len(room.connections)),
+                self._flush_cursors, connection.file_id)
+
+    def _flush_cursors(self, file_id: str) -> None:
+        room = self.rooms.get(file_id)
+        if room is None:
+            return
+        room.cursor_flush = None
+        cursors, room.cursors = room.cursors, {}
+        if not cursors:
+            return
+        self.cursor_flushes += 1
+        # Relayed as plain cursor_move frames, so clients see the same
+        # messages as before, only coalesced
+        for connection, frame in cursors.items():
+            self.broadcast_frame(
+                file_id, frame, droppable=True,
+                exclude_websocket=connection.websocket)
+
+    def _enqueue(self, connection: _Connection, frame: str, droppable: bool) -> bool:
+        """Queue a frame without waiting; False if the client must be dropped"""
+        queue = connection.queue
+        if len(queue) >= self.queue_size:
+            if self.full_queue_policy == "disconnect":
+                return False
+            # Make room by dropping the oldest cursor update
+            for index, (queued_droppable, _) in enumerate(queue):
+                if queued_droppable:
+                    del queue[index]
+                    self.dropped += 1
+                    break
+            else:
+                if not droppable:
+                    return False
+                self.dropped += 1
+                return True
+        queue.append((droppable, frame))
+        connection.ready.set()
+        return True
+
+    def _disconnect_slow(self, connection: _Connection) -> None:
+        self.slow_disconnects += 1
+        self.disconnect_from_file(connection.websocket)
+        asyncio.create_task(self._close(connection.websocket, 1008, "Client too slow"))
+
+    async def _close(self, websocket: WebSocket, code: int, reason: str) -> None:
+        try:
+            await websocket.close(code=code, reason=reason)
+        except Exception:
+            pass
+
+    async def _send_loop(self, connection: _Connection) -> None:
+        try:
+            while True:
+                while not connection.queue:
+                    connection.ready.clear()
+                    await connection.ready.wait()
+                _, frame = connection.queue.popleft()
+                await asyncio.wait_for(
+                    connection.websocket.send_text(frame), timeout=self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Broken or stalled connection
+            print(f"Error sending to connection: {e}")
+            self.disconnect_from_file(connection.websocket)
+            await self._close(connection.websocket, 1011, "Send failed")
+
+
+# Global connection manager shared by all requests
+file_connection_manager = FileConnectionManager(
+    queue_size=settings.WS_SEND_QUEUE_SIZE,
+    full_queue_policy=settings.WS_FULL_QUEUE_POLICY,
+    send_timeout=settings.WS_SEND_TIMEOUT_SECONDS,
+    cursor_tick_hz=settings.WS_CURSOR_TICK_HZ,
+    cursor_min_tick_hz=settings.WS_CURSOR_MIN_TICK_HZ,
+    cursor_full_rate_users=settings.WS_CURSOR_FULL_RATE_USERS
+)
@@ -1,27 +1,28 @@
 #!/usr/bin/env python3
 """Script to create a test user for testing document conversion"""
 
+import asyncio
 import os
 import sys
 
 # Add the app directory to the Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
 
-from app.api.deps import get_db
+from app.core.db import async_session
 from app.models import UserCreate
 from app.crud import create_user
 from app.core.security import get_password_hash
 
-def create_test_user():
+async def create_test_user():
     """Create a test user for testing"""
+    db = async_session()
     try:
-        db = next(get_db())
         
         # Check if test user already exists
         from app.models import User
         from sqlmodel import select
         
-        existing_user = db.exec(select(User).where(User.email == "test@example.com")).first()
+        existing_user = (await db.exec(select(User).where(User.email == "test@example.com"))).first()
         
         if existing_user:
             print("✅ Test user already exists:")
@@ -37,7 +38,7 @@ def create_test_user():
             full_name="Test User"
         )
         
-        test_user = create_user(db, test_user_data)
+        test_user = await create_user(db, test_user_data)
         
         print("✅ Test user created successfully:")
         print(f"  Email: {test_user.email}")
@@ -51,8 +52,7 @@ def create_test_user():
         print(f"❌ Error creating test user: {e}")
         return None
     finally:
-        if 'db' in locals():
-            db.close()
+        await db.close()
 
 if __name__ == "__main__":
-    create_test_user()
+    asyncio.run(create_test_user())
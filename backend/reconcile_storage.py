@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Report (or purge with --purge) S3 objects that no database row refers to.
+"""
+import argparse
+from datetime import timedelta
+
+from app.services.storage_reconciler import DEFAULT_PREFIXES, storage_reconciler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--prefix", action="append", dest="prefixes",
+                        help="Key prefix to reconcile, may be repeated "
+                             f"(default: {' '.join(DEFAULT_PREFIXES)})")
+    parser.add_argument("--purge", action="store_true",
+                        help="Delete the orphaned objects")
+    parser.add_argument("--min-age-hours", type=float, default=None,
+                        help="Ignore objects modified more recently "
+                             "(default: the upload grace period)")
+    args = parser.parse_args()
+
+    min_age = None
+    if args.min_age_hours is not None:
+        min_age = timedelta(hours=args.min_age_hours)
+    report = storage_reconciler.run(
+        args.prefixes or DEFAULT_PREFIXES, purge=args.purge, min_age=min_age)
+
+    print(f"📁 Scanned {report.scanned} objects ({report.scanned_bytes} bytes)")
+    print(f"🗑️  Orphaned: {report.orphans} objects ({report.orphan_bytes} bytes)")
+    for key in report.sample:
+        print(f"  - {key}")
+    if report.skipped_recent:
+        print(f"⏳ Skipped {report.skipped_recent} recent objects")
+    if args.purge:
+        print(f"✅ Purged {report.purged} objects")
+        for key, error in report.errors.items():
+            print(f"❌ {key}: {error}")
+
+
+if __name__ == "__main__":
+    main()
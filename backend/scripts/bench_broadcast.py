@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the per-message cost of a broadcast to one file's room.
+
+Compares encoding the message once per recipient (as broadcasts used to)
+with encoding it once per broadcast, for each available JSON encoder, and
+times a full FileConnectionManager.broadcast_to_file into the send queues.
+
+    python scripts/bench_broadcast.py --users 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core import json_codec  # noqa: E402
+from app.services.websocket_manager import FileConnectionManager  # noqa: E402
+
+
+class _Socket:
+    """Stand-in for a WebSocket that never completes a send"""
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await asyncio.Event().wait()
+
+
+def _messages(update_size):
+    paragraph = "<p>Lorem ipsum dolor sit amet, <strong>consectetur</strong> adipiscing elit.</p>"
+    content = (paragraph * (update_size // len(paragraph) + 1))[:update_size]
+    return {
+        "cursor_move": {"type": "cursor_move", "user_id": "3f2c8a4e-1b7d-4c1e-9a55-0d6f1e2b7c90",
+                        "range": {"index": 1204, "length": 0}},
+        "file_update": {"type": "file_update", "user_id": "3f2c8a4e-1b7d-4c1e-9a55-0d6f1e2b7c90",
+                        "content": content, "version": 42},
+    }
+
+
+def _report(label, seconds, number):
+    print(f"  {label:<34} {seconds / number * 1e6:10.1f} µs/message")
+
+
+async def _bench_manager(users, message, number):
+    manager = FileConnectionManager(
+        queue_size=number + 16,
+        full_queue_policy="drop_oldest",
+        send_timeout=10.0,
+        cursor_tick_hz=20.0,
+        cursor_min_tick_hz=5.0,
+        cursor_full_rate_users=10,
+    )
+    manager.start()
+    for i in range(users):
+        await manager.connect_to_file(_Socket(), "bench", f"user-{i}")
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for _ in range(number):
+        await manager.broadcast_to_file("bench", message)
+    elapsed = loop.time() - start
+    await manager.shutdown()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--update-size", type=int, default=50_000,
+                        help="Characters of content in a file_update")
+    parser.add_argument("--number", type=int, default=200,
+                        help="Broadcasts timed per case")
+    args = parser.parse_args()
+
+    encoders = {"json": json_codec.get_encoder("json")}
+    if json_codec.orjson is not None:
+        encoders["orjson"] = json_codec.get_encoder("orjson")
+
+    for name, message in _messages(args.update_size).items():
+        print(f"{name} ({len(json.dumps(message))} bytes) to {args.users} users:")
+        _report("json.dumps per recipient",
+                timeit.timeit(lambda: [json.dumps(message) for _ in range(args.users)],
+                              number=args.number), args.number)
+        for encoder_name, dumps in encoders.items():
+            _report(f"{encoder_name} once per broadcast",
+                    timeit.timeit(lambda: dumps(message), number=args.number), args.number)
+        _report("broadcast_to_file (encode + queue)",
+                asyncio.run(_bench_manager(args.users, message, args.number)), args.number)
+
+
+if __name__ == "__main__":
+    main()
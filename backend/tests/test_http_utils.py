@@ -0,0 +1,47 @@
+import pytest
+
+from app.api.http_utils import RangeNotSatisfiable, parse_byte_range
+
+
+@pytest.mark.parametrize("header, size, expected", [
+    ("bytes=0-99", 1000, (0, 99)),
+    ("bytes=100-100", 1000, (100, 100)),
+    # Open-ended
+    ("bytes=500-", 1000, (500, 999)),
+    # End past the resource is clamped
+    ("bytes=900-5000", 1000, (900, 999)),
+    # Suffix: the last N bytes, all of them when N exceeds the size
+    ("bytes=-100", 1000, (900, 999)),
+    ("bytes=-5000", 1000, (0, 999)),
+    (" bytes=0-0 ", 1, (0, 0)),
+])
+def test_satisfiable_ranges(header, size, expected):
+    assert parse_byte_range(header, size) == expected
+
+
+@pytest.mark.parametrize("header", [
+    None,
+    "",
+    "bytes=-",
+    "items=0-99",
+    "bytes=0-99,200-299",
+    "bytes=abc-",
+    # Reversed ranges are ignored rather than rejected
+    "bytes=99-0",
+])
+def test_whole_resource(header):
+    assert parse_byte_range(header, 1000) is None
+
+
+@pytest.mark.parametrize("header, size", [
+    ("bytes=1000-", 1000),
+    ("bytes=1000-2000", 1000),
+    ("bytes=-0", 1000),
+    # Nothing in an empty file can be selected
+    ("bytes=0-", 0),
+    ("bytes=0-0", 0),
+    ("bytes=-1", 0),
+])
+def test_unsatisfiable_ranges(header, size):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_byte_range(header, size)
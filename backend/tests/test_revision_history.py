@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from app.services.revision_history import apply_delta, make_delta
+
+ALPHABET = "ab <p></p>é\n"
+
+
+def _edit(rng: random.Random, text: str) -> str:
+    """A random insertion, deletion or replacement somewhere in ``text``"""
+    start = rng.randint(0, len(text))
+    end = rng.randint(start, min(len(text), start + rng.randint(0, 20)))
+    insert = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 20)))
+    return text[:start] + insert + text[end:]
+
+
+@pytest.mark.parametrize("old, new", [
+    ("", ""),
+    ("", "hello"),
+    ("hello", ""),
+    ("hello", "hello"),
+    ("hello world", "hello brave world"),
+    ("<p>one</p><p>two</p>", "<p>two</p><p>one</p>"),
+    ("aaaa", "aaaaa"),
+])
+def test_round_trip(old, new):
+    assert apply_delta(old, make_delta(old, new)) == new
+
+
+def test_round_trip_random_edits():
+    rng = random.Random(0)
+    for _ in range(500):
+        old = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 200)))
+        new = old
+        for _ in range(rng.randint(1, 5)):
+            new = _edit(rng, new)
+        assert apply_delta(old, make_delta(old, new)) == new
+
+
+def test_round_trip_large_documents():
+    rng = random.Random(1)
+    # Longer than a compare block, with edits near the block boundaries
+    old = "".join(rng.choice(ALPHABET) for _ in range(20_000))
+    for position in (0, 4095, 4096, 4097, 10_000, 19_999, 20_000):
+        new = old[:position] + "x" + old[position:]
+        assert apply_delta(old, make_delta(old, new)) == new
+    # A changed region too large to diff is replaced wholesale
+    new = "".join(rng.choice(ALPHABET) for _ in range(20_000))
+    assert apply_delta(old, make_delta(old, new)) == new
+
+
+def test_local_edit_keeps_delta_small():
+    old = "<p>" + "x" * 100_000 + "</p>"
+    new = old[:50_000] + "y" + old[50_000:]
+    delta = make_delta(old, new)
+    assert delta == [50_000, "y", len(old) - 50_000]
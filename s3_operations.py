@@ -55,16 +55,22 @@ class S3Manager:
             print(f"❌ Error downloading file: {e}")
             return False
 
+    def iter_files(self, prefix=""):
+        """Yield every object under a prefix, one listing page at a time"""
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            yield from page.get('Contents', [])
+
     def list_files(self, prefix=""):
         """List files in S3 bucket"""
         try:
-            response = self.s3_client.list_objects_v2(
-                Bucket=self.bucket_name, Prefix=prefix)
-            if 'Contents' in response:
-                print(f"📁 Files in s3://{self.bucket_name}/{prefix}:")
-                for obj in response['Contents']:
-                    print(f"  - {obj['Key']} ({obj['Size']} bytes)")
-            else:
+            found = False
+            for obj in self.iter_files(prefix):
+                if not found:
+                    print(f"📁 Files in s3://{self.bucket_name}/{prefix}:")
+                    found = True
+                print(f"  - {obj['Key']} ({obj['Size']} bytes)")
+            if not found:
                 print(f"📁 No files found in s3://{self.bucket_name}/{prefix}")
         except ClientError as e:
             print(f"❌ Error listing files: {e}")